@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     """Класс конфигурирующий приложение api."""
     name = 'api'
+
+    def ready(self):
+        """Подключение обработчиков сигналов приложения."""
+        import api.signals  # noqa: F401
@@ -0,0 +1,125 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_CACHE_KEY = 'auth-token:{key}'
+TOKEN_USER_CACHE_KEY = 'auth-token-user:{user}'
+
+
+class LocalTokenCache:
+    """
+    Кеш снимков пользователей по токенам в памяти процесса
+    с вытеснением давно не использованных записей (LRU).
+    Снимки хранятся сериализованными, поэтому каждый запрос
+    получает собственный экземпляр пользователя.
+    """
+    def __init__(self):
+        """Инициализация пустого кеша."""
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()
+        self._users = {}
+
+    def get(self, key):
+        """Возвращает пользователя токена key или None."""
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None:
+                return None
+            user_pk, snapshot, expires = entry
+            if expires <= time.monotonic():
+                self._remove(key)
+                return None
+            self._tokens.move_to_end(key)
+        return pickle.loads(snapshot)
+
+    def set(self, key, user):
+        """Сохранение снимка пользователя user токена key."""
+        size = settings.AUTH_TOKEN_LOCAL_CACHE_SIZE
+        if not size:
+            return
+        expires = time.monotonic() + settings.AUTH_TOKEN_LOCAL_CACHE_TTL
+        snapshot = pickle.dumps(user, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remove(key)
+            self._tokens[key] = (user.pk, snapshot, expires)
+            self._users[user.pk] = key
+            while len(self._tokens) > size:
+                self._remove(next(iter(self._tokens)))
+
+    def _remove(self, key):
+        """Удаление записи токена key."""
+        entry = self._tokens.pop(key, None)
+        if entry is not None and self._users.get(entry[0]) == key:
+            del self._users[entry[0]]
+
+    def delete(self, key=None, user_pk=None):
+        """Удаление записи по токену key или пользователю user_pk."""
+        with self._lock:
+            if key is None:
+                key = self._users.get(user_pk)
+            self._remove(key)
+
+    def clear(self):
+        """Очистка кеша."""
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+
+local_token_cache = LocalTokenCache()
+
+
+def invalidate_token(key=None, user_pk=None):
+    """
+    Сброс закешированного снимка пользователя по токену key
+    или пользователю user_pk в кеше процесса и общем кеше.
+    """
+    if key is None:
+        key = cache.get(TOKEN_USER_CACHE_KEY.format(user=user_pk))
+    local_token_cache.delete(key=key, user_pk=user_pk)
+    keys = [TOKEN_USER_CACHE_KEY.format(user=user_pk)]
+    if key is not None:
+        keys.append(TOKEN_CACHE_KEY.format(key=key))
+    cache.delete_many(keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кешированием пользователя токена.
+    Снимок пользователя хранится в кеше процесса
+    AUTH_TOKEN_LOCAL_CACHE_TTL секунд и в общем кеше
+    AUTH_TOKEN_CACHE_TTL секунд. Кеш сбрасывается при удалении
+    токена (выход) и сохранении пользователя (смена пароля,
+    деактивация). При AUTH_TOKEN_CACHE_TTL равном нулю
+    кеширование отключено.
+    """
+    def authenticate_credentials(self, key):
+        """Возвращает пользователя и токен по ключу key."""
+        ttl = settings.AUTH_TOKEN_CACHE_TTL
+        if not ttl:
+            return super().authenticate_credentials(key)
+        user = local_token_cache.get(key)
+        if user is None:
+            user = cache.get(TOKEN_CACHE_KEY.format(key=key))
+            if user is not None:
+                local_token_cache.set(key, user)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set_many({
+                TOKEN_CACHE_KEY.format(key=key): user,
+                TOKEN_USER_CACHE_KEY.format(user=user.pk): key,
+            }, ttl)
+            local_token_cache.set(key, user)
+            return user, token
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return user, self.get_model()(key=key, user=user)
@@ -1,16 +1,137 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.http import Http404
 from django.utils.translation import gettext_lazy as _
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 
 class PrimaryKey404RelatedField(serializers.PrimaryKeyRelatedField):
-    """Класс первичного ключа с обработкой ошибки 404."""
+    """
+    Класс первичного ключа с обработкой ошибки 404.
+    Объекты списка ключей (many=True) и ключей, предварительно
+    переданных в prefetch, загружаются одним запросом.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._objects = {}
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        """Создает поле списка первичных ключей."""
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManyPrimaryKey404RelatedField(**list_kwargs)
+
+    def to_pk(self, data):
+        """Приводит значение data к типу первичного ключа."""
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def get_objects(self, data):
+        """
+        Возвращает словарь объектов по первичным ключам списка data,
+        загруженных одним запросом. Некорректные ключи пропускаются,
+        при отсутствии объектов возвращается ошибка 404 со всеми
+        ненайденными ключами.
+        """
+        pks = set()
+        for value in data:
+            try:
+                pks.add(self.to_pk(value))
+            except ValidationError:
+                continue
+        objects = self.get_queryset().in_bulk(pks)
+        missing = pks.difference(objects)
+        if missing:
+            raise NotFound(
+                _('Objects not found: {pks}').format(
+                    pks=', '.join(str(pk) for pk in sorted(missing))
+                )
+            )
+        return objects
+
+    def prefetch(self, data):
+        """Загрузка объектов по первичным ключам списка data."""
+        self._objects = self.get_objects(data)
+
+    def clear_prefetched(self):
+        """Сброс загруженных объектов."""
+        self._objects = {}
+
     def to_internal_value(self, data):
+        pk = self.to_pk(data)
+        if pk in self._objects:
+            return self._objects[pk]
         try:
-            return super().to_internal_value(data)
-        except ValidationError as exc:
-            if 'does_not_exist' in exc.get_codes():
-                raise Http404(_('Object not found'))
-        except (TypeError, ValueError):
-            self.fail('incorrect_type', data_type=type(data))
+            return self.get_queryset().get(pk=pk)
+        except self.get_queryset().model.DoesNotExist:
+            raise Http404(_('Object not found'))
+
+
+class ManyPrimaryKey404RelatedField(serializers.ManyRelatedField):
+    """
+    Поле списка первичных ключей, объекты которого загружаются
+    одним запросом.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        objects = self.child_relation.get_objects(data)
+        return [
+            objects[self.child_relation.to_pk(item)] for item in data
+        ]
+
+
+class RecipeImageField(Base64ImageField):
+    """
+    Поле картинки в base64 с проверкой ограничений до декодирования
+    содержимого: размер данных проверяется по длине строки base64,
+    размеры картинки - по заголовку файла. Картинка всегда выводится
+    ссылкой, без кодирования содержимого в base64.
+    """
+    def to_internal_value(self, base64_data):
+        if isinstance(base64_data, str):
+            payload = base64_data.rpartition(';base64,')[2]
+            max_size = settings.RECIPE_IMAGE_MAX_SIZE
+            if len(payload) * 3 // 4 > max_size:
+                raise ValidationError(
+                    _('Image size must not exceed {size} bytes').format(
+                        size=max_size
+                    )
+                )
+        return super().to_internal_value(base64_data)
+
+    def get_file_extension(self, filename, decoded_file):
+        try:
+            with Image.open(BytesIO(decoded_file)) as image:
+                width, height = image.size
+                extension = image.format.lower()
+        except (OSError, Image.DecompressionBombError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        max_pixels = settings.RECIPE_IMAGE_MAX_PIXELS
+        if width * height > max_pixels:
+            raise ValidationError(
+                _('Image must not exceed {pixels} pixels').format(
+                    pixels=max_pixels
+                )
+            )
+        return 'jpg' if extension == 'jpeg' else extension
+
+    def to_representation(self, file):
+        return serializers.ImageField.to_representation(self, file)
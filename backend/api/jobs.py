@@ -0,0 +1,190 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile, File
+from django.db import connections, transaction
+from django.utils import timezone, translation
+
+from api.models import ReportJob
+from api.report import (DEFAULT_PAGESIZE, REPORT_CACHE_KEY, cache_report,
+                        get_pdf_print)
+
+THREAD_BACKEND = 'thread'
+DB_BACKEND = 'db'
+
+_executor = None
+_executor_lock = threading.Lock()
+_last_cleanup = None
+_cleanup_lock = threading.Lock()
+
+
+def _get_executor():
+    """Возвращает пул потоков формирования отчетов текущего процесса."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.REPORT_JOB_WORKERS,
+                thread_name_prefix='report'
+            )
+        return _executor
+
+
+def _process_in_thread(job_id):
+    """Выполнение задания в пуле потоков с закрытием соединений с БД."""
+    try:
+        process_job(job_id)
+    finally:
+        connections.close_all()
+
+
+def _get_stale_threshold():
+    """
+    Возвращает время создания, раньше которого невыполненные задания
+    считаются зависшими (REPORT_JOB_TIMEOUT секунд).
+    """
+    return timezone.now() - timedelta(seconds=settings.REPORT_JOB_TIMEOUT)
+
+
+def fail_stale_jobs():
+    """
+    Переводит в статус ошибки ожидающие и выполняемые задания старше
+    REPORT_JOB_TIMEOUT секунд: задания пула потоков теряются
+    при перезапуске процесса, а задания, взятые в работу, - при сбое
+    обработчика. Возвращает количество таких заданий.
+    """
+    return ReportJob.objects.filter(
+        status__in=(ReportJob.PENDING, ReportJob.RUNNING),
+        created__lt=_get_stale_threshold()
+    ).update(
+        status=ReportJob.FAILED,
+        error='Report job timed out',
+        finished=timezone.now()
+    )
+
+
+def cleanup_jobs():
+    """
+    Отмечает зависшие задания и удаляет просроченные не чаще одного раза
+    в REPORT_JOB_CLEANUP_INTERVAL секунд в процессе, так как вызывается
+    при каждой постановке задания, в том числе при бэкенде 'thread',
+    для которого обработчик run_report_worker не запускается.
+    """
+    global _last_cleanup
+    now = time.monotonic()
+    with _cleanup_lock:
+        if (_last_cleanup is not None and now - _last_cleanup
+                < settings.REPORT_JOB_CLEANUP_INTERVAL):
+            return
+        _last_cleanup = now
+    fail_stale_jobs()
+    delete_expired_jobs()
+
+
+def enqueue_report(user, shoping_data, digest, pagesize=DEFAULT_PAGESIZE):
+    """
+    Создает задание на формирование pdf файла списка покупок.
+    Если у пользователя уже есть выполненное или не зависшее
+    невыполненное задание с тем же содержимым, возвращает его.
+    При бэкенде REPORT_JOB_BACKEND 'thread' задание выполняется в пуле
+    потоков текущего процесса после фиксации транзакции, при бэкенде
+    'db' - командой run_report_worker.
+    """
+    cleanup_jobs()
+    job = ReportJob.objects.filter(
+        user=user, digest=digest, pagesize=pagesize
+    ).exclude(status=ReportJob.FAILED).exclude(
+        status__in=(ReportJob.PENDING, ReportJob.RUNNING),
+        created__lt=_get_stale_threshold()
+    ).first()
+    if job is not None:
+        return job
+    job = ReportJob.objects.create(
+        user=user,
+        digest=digest,
+        pagesize=pagesize,
+        language=translation.get_language() or '',
+        data=json.dumps(shoping_data, ensure_ascii=False, default=str)
+    )
+    if settings.REPORT_JOB_BACKEND == THREAD_BACKEND:
+        transaction.on_commit(
+            lambda: _get_executor().submit(_process_in_thread, job.pk)
+        )
+    return job
+
+
+def claim_job(job_id):
+    """
+    Переводит ожидающее задание в статус выполнения.
+    Возвращает False, если задание уже взято другим обработчиком.
+    """
+    return ReportJob.objects.filter(
+        pk=job_id, status=ReportJob.PENDING
+    ).update(status=ReportJob.RUNNING) == 1
+
+
+def process_job(job_id):
+    """
+    Формирует pdf файл задания на языке запроса, создавшего задание,
+    так как язык входит в хеш отчета и ключ кеша. Готовый файл также
+    сохраняется в кеш отчетов, если не превышает REPORT_CACHE_MAX_SIZE,
+    а при наличии в кеше берется из него.
+    Возвращает выполненное задание или None, если задание
+    уже взято другим обработчиком.
+    """
+    if not claim_job(job_id):
+        return None
+    job = ReportJob.objects.get(pk=job_id)
+    cache = caches[settings.REPORT_CACHE_ALIAS]
+    key = REPORT_CACHE_KEY.format(digest=job.digest)
+    try:
+        content = cache.get(key)
+        if content is None:
+            with translation.override(job.language or None):
+                buffer, size = get_pdf_print(job.pagesize).render(
+                    json.loads(job.data)
+                )
+            with buffer:
+                cache_report(cache, key, buffer, size)
+                job.file.save(f'{job.pk}.pdf', File(buffer), save=False)
+        else:
+            job.file.save(f'{job.pk}.pdf', ContentFile(content), save=False)
+        job.status = ReportJob.DONE
+        job.data = ''
+    except Exception as error:
+        job.status = ReportJob.FAILED
+        job.error = str(error)
+    job.finished = timezone.now()
+    job.save(update_fields=('status', 'file', 'data', 'error', 'finished'))
+    return job
+
+
+def process_pending_jobs(limit=None):
+    """
+    Выполняет ожидающие задания в порядке создания.
+    Возвращает количество выполненных заданий.
+    """
+    job_ids = list(
+        ReportJob.objects.filter(
+            status=ReportJob.PENDING
+        ).values_list('pk', flat=True)[:limit]
+    )
+    return sum(process_job(job_id) is not None for job_id in job_ids)
+
+
+def delete_expired_jobs():
+    """
+    Удаляет задания старше REPORT_JOB_TTL секунд вместе с файлами.
+    Возвращает количество удаленных заданий.
+    """
+    expired = ReportJob.objects.filter(
+        created__lt=timezone.now() - timedelta(seconds=settings.REPORT_JOB_TTL)
+    )
+    for job in expired.exclude(file=''):
+        job.file.delete(save=False)
+    return expired.delete()[0]
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], db_index=True, default='pending', max_length=10, verbose_name='status')),
+                ('digest', models.CharField(max_length=64, verbose_name='digest')),
+                ('pagesize', models.CharField(max_length=10, verbose_name='page size')),
+                ('data', models.TextField(help_text='Shopping list rows in JSON.', verbose_name='data')),
+                ('file', models.FileField(blank=True, upload_to='reports/', verbose_name='file')),
+                ('error', models.TextField(blank=True, verbose_name='error')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='created')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='finished')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'report job',
+                'verbose_name_plural': 'report jobs',
+                'ordering': ['created'],
+            },
+        ),
+    ]
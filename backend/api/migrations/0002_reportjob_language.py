@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='language',
+            field=models.CharField(blank=True, help_text='Language of the request the report is rendered in.', max_length=15, verbose_name='language'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class ReportJob(models.Model):
+    """Модель задания на формирование pdf файла списка покупок."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, _('pending')),
+        (RUNNING, _('running')),
+        (DONE, _('done')),
+        (FAILED, _('failed')),
+    )
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_('user'),
+        on_delete=models.CASCADE,
+        related_name='report_jobs',
+    )
+    status = models.CharField(
+        _('status'),
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+        db_index=True
+    )
+    digest = models.CharField(
+        _('digest'),
+        max_length=64
+    )
+    pagesize = models.CharField(
+        _('page size'),
+        max_length=10
+    )
+    language = models.CharField(
+        _('language'),
+        max_length=15,
+        blank=True,
+        help_text=_('Language of the request the report is rendered in.')
+    )
+    data = models.TextField(
+        _('data'),
+        help_text=_('Shopping list rows in JSON.')
+    )
+    file = models.FileField(
+        _('file'),
+        upload_to='reports/',
+        blank=True
+    )
+    error = models.TextField(
+        _('error'),
+        blank=True
+    )
+    created = models.DateTimeField(
+        _('created'),
+        auto_now_add=True,
+        db_index=True
+    )
+    finished = models.DateTimeField(
+        _('finished'),
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        """Метаданные модели заданий формирования списка покупок."""
+        ordering = ['created']
+        verbose_name = _('report job')
+        verbose_name_plural = _('report jobs')
+
+    def __str__(self):
+        """Вывод данных задания."""
+        return f'{self.pk} ({self.status})'
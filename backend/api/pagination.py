@@ -1,7 +1,197 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.paginator import CachedCountPaginator
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинатор по ключу сортировки (keyset). Страница выбирается условием
+    на значения полей сортировки последней записи предыдущей страницы,
+    поэтому не требует подсчета записей и смещения OFFSET.
+    Курсор содержит значения полей ordering граничной записи
+    и направление выборки.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def __init__(self, ordering, page_size):
+        """Инициализация пагинатора с полями сортировки ordering."""
+        self.ordering = ordering
+        self.page_size = page_size
+
+    def _get_fields(self, queryset):
+        """Возвращает поля модели и признаки сортировки по убыванию."""
+        return [
+            (queryset.model._meta.get_field(name.lstrip('-')),
+             name.startswith('-'))
+            for name in self.ordering
+        ]
+
+    def decode_cursor(self, request, fields):
+        """
+        Возвращает значения полей и признак обратного направления
+        из курсора запроса. Для первой страницы возвращает (None, False).
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')))
+            if (not isinstance(cursor['v'], list)
+                    or len(cursor['v']) != len(fields)):
+                raise ValueError
+            values = [
+                field.to_python(value)
+                for (field, descending), value in zip(fields, cursor['v'])
+            ]
+            if None in values:
+                raise ValueError
+            return values, bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        """Возвращает ссылку на страницу после или перед записью obj."""
+        cursor = {
+            'v': [
+                field.value_to_string(obj)
+                for field, descending in self.fields
+            ],
+            'r': int(reverse),
+        }
+        encoded = b64encode(json.dumps(cursor).encode()).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def _get_condition(self, values, reverse):
+        """
+        Возвращает условие выборки записей, следующих за значениями
+        полей сортировки values в заданном направлении.
+        """
+        condition = Q()
+        equal = {}
+        for (field, descending), value in zip(self.fields, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal, **{f'{field.attname}__{lookup}': value})
+            equal[field.attname] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Возвращает записи страницы, определенной курсором запроса."""
+        self.base_url = request.build_absolute_uri()
+        self.fields = self._get_fields(queryset)
+        values, reverse = self.decode_cursor(request, self.fields)
+        ordering = [
+            name.lstrip('-') if reverse == name.startswith('-')
+            else f'-{name.lstrip("-")}'
+            for name in self.ordering
+        ]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._get_condition(values, reverse))
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        self.next = (
+            self.encode_cursor(page[-1], False)
+            if has_next and page else None
+        )
+        self.previous = (
+            self.encode_cursor(page[0], True)
+            if has_previous and page else None
+        )
+        return page
+
+    def get_paginated_response(self, data):
+        """
+        Возвращает ответ в формате пагинации по номерам страниц.
+        Количество записей не вычисляется и возвращается как null.
+        """
+        return Response(OrderedDict([
+            ('count', None),
+            ('next', self.next),
+            ('previous', self.previous),
+            ('results', data)
+        ]))
 
 
 class CustomPagination(PageNumberPagination):
-    """Пагинатор проекта."""
+    """
+    Пагинатор проекта. Если задан keyset_ordering, то при наличии
+    в запросе параметра cursor (для первой страницы - пустого)
+    используется пагинация по ключу сортировки KeysetPagination.
+    Для выборок с сортировкой, отличной от keyset_ordering и сортировки
+    модели по умолчанию, используется пагинация по номерам страниц.
+    """
     page_size = 6
     page_size_query_param = 'limit'
+    keyset_ordering = None
+
+    def _use_keyset(self, queryset, request):
+        """Проверка применимости пагинации по ключу сортировки."""
+        if (not self.keyset_ordering
+                or KeysetPagination.cursor_query_param
+                not in request.query_params):
+            return False
+        order_by = tuple(queryset.query.order_by)
+        return not order_by or order_by == tuple(self.keyset_ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Возвращает записи страницы в выбранном режиме пагинации."""
+        self.keyset = None
+        if self._use_keyset(queryset, request):
+            self.keyset = KeysetPagination(
+                self.keyset_ordering, self.get_page_size(request)
+            )
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        """Возвращает ответ со страницей записей."""
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        """Ссылка на следующую страницу без параметра cursor."""
+        url = super().get_next_link()
+        return url and remove_query_param(
+            url, KeysetPagination.cursor_query_param
+        )
+
+    def get_previous_link(self):
+        """Ссылка на предыдущую страницу без параметра cursor."""
+        url = super().get_previous_link()
+        return url and remove_query_param(
+            url, KeysetPagination.cursor_query_param
+        )
+
+
+class RecipesPagination(CustomPagination):
+    """
+    Пагинатор рецептов. Количество рецептов при пагинации по номерам
+    страниц кешируется или оценивается по статистике PostgreSQL.
+    """
+    django_paginator_class = CachedCountPaginator
+    keyset_ordering = ('-pub_date', '-id')
+
+
+class SubscribePagination(CustomPagination):
+    """Пагинатор подписок."""
+    keyset_ordering = ('-date_subscriber', '-id')
@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Recipe
+from users.models import Subscriber
+
+FAVORITES = 'favorites'
+SHOPPING_CART = 'shopping_cart'
+SUBSCRIPTIONS = 'subscriptions'
+
+RELATIONS = {
+    FAVORITES: lambda user: Recipe.favorites.through.objects.filter(
+        customuser_id=user.pk
+    ).values_list('recipe_id', flat=True),
+    SHOPPING_CART: lambda user: Recipe.shopping_carts.through.objects.filter(
+        customuser_id=user.pk
+    ).values_list('recipe_id', flat=True),
+    SUBSCRIPTIONS: lambda user: Subscriber.objects.filter(
+        user_id=user.pk
+    ).values_list('author_id', flat=True),
+}
+
+RELATIONS_CACHE_KEY = 'user-relations:{user}:{relation}'
+
+
+class UserRelations:
+    """
+    Множества идентификаторов рецептов в избранном и списке покупок
+    пользователя и авторов, на которых он подписан. Каждое множество
+    загружается из БД одним запросом при первом обращении в рамках
+    запроса, а при USER_RELATIONS_CACHE_TTL больше нуля также хранится
+    в кеше между запросами. Кеш между запросами сбрасывается при изменении
+    связей через API, изменения через админку учитываются по истечении
+    USER_RELATIONS_CACHE_TTL, поэтому для нескольких процессов его следует
+    включать только с общим бэкендом кеша.
+    """
+    def __init__(self, user):
+        """Инициализация множеств связей пользователя user."""
+        self.user = user
+        self._relations = {}
+
+    def _get_cache_key(self, relation):
+        """Возвращает ключ кеша множества связей relation."""
+        return RELATIONS_CACHE_KEY.format(
+            user=self.user.pk, relation=relation
+        )
+
+    def get(self, relation):
+        """Возвращает множество идентификаторов связей relation."""
+        if self.user.is_anonymous:
+            return frozenset()
+        if relation not in self._relations:
+            ttl = settings.USER_RELATIONS_CACHE_TTL
+            key = self._get_cache_key(relation)
+            ids = cache.get(key) if ttl else None
+            if ids is None:
+                ids = frozenset(RELATIONS[relation](self.user))
+                if ttl:
+                    cache.set(key, ids, ttl)
+            self._relations[relation] = ids
+        return self._relations[relation]
+
+    def contains(self, relation, obj_id):
+        """Проверка наличия связи relation с объектом obj_id."""
+        return obj_id in self.get(relation)
+
+    def _update(self, relation, update):
+        """Изменение загруженного множества связей и сброс кеша."""
+        if relation in self._relations:
+            self._relations[relation] = update(self._relations[relation])
+        if settings.USER_RELATIONS_CACHE_TTL:
+            cache.delete(self._get_cache_key(relation))
+
+    def add(self, relation, obj_id):
+        """Добавление связи relation с объектом obj_id."""
+        self._update(relation, lambda ids: ids | {obj_id})
+
+    def discard(self, relation, obj_id):
+        """Удаление связи relation с объектом obj_id."""
+        self._update(relation, lambda ids: ids - {obj_id})
+
+
+def get_user_relations(request):
+    """Возвращает множества связей текущего пользователя запроса."""
+    relations = getattr(request, '_user_relations', None)
+    if relations is None or relations.user != request.user:
+        relations = UserRelations(request.user)
+        request._user_relations = relations
+    return relations
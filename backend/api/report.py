@@ -1,7 +1,16 @@
+import csv
+import hashlib
+import json
+import tempfile
+from functools import lru_cache
 from io import BytesIO
 
 from django.conf import settings
-from django.http import HttpResponse
+from django.core.cache import caches
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
@@ -11,7 +20,6 @@ from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import inch, mm
 from reportlab.pdfbase.pdfmetrics import registerFont
 from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from reportlab.platypus import Paragraph, SimpleDocTemplate
 from reportlab.platypus.flowables import Spacer
 from reportlab.platypus.tables import Table, TableStyle
@@ -25,10 +33,25 @@ addMapping('Times', 0, 1, 'Times-Italic')
 addMapping('Times', 1, 0, 'Times-Bold')
 addMapping('Times', 1, 1, 'Times-BoldItalic')
 
+TABLE_CHUNK_SIZE = 50
+DEFAULT_PAGESIZE = 'A4'
+REPORT_VERSION = 1
+REPORT_CACHE_KEY = 'shopping-report:{digest}'
+
+
+def get_table_header():
+    """Возвращает заголовок таблицы списка покупок."""
+    return (
+        '№',
+        _('name').capitalize(),
+        _('unit').capitalize(),
+        _('amount').capitalize()
+    )
+
 
 class PDFPrint:
     """Класс формирует pdf документ."""
-    def __init__(self, pagesize='A4'):
+    def __init__(self, pagesize=DEFAULT_PAGESIZE):
         """Инициализация отчета."""
         if pagesize == 'A4':
             self.pagesize = A4
@@ -83,10 +106,19 @@ class PDFPrint:
             ('BACKGROUND', (0, 0), (-1, 0), colors.springgreen)
         ]
         )
+        self.green_body_table_style = TableStyle([
+            ('FONT', (0, 0), (-1, -1), 'Times', 10),
+            ('ALIGN', (0, 0), (0, -1), 'CENTRE'),
+            ('GRID', (0, 0), (9, -1), 1, colors.springgreen)
+        ]
+        )
+        self.col_width_parts = (0.08, 0.52, 0.2, 0.2)
 
-    def _header_footer(self, canvas, doc):
-        """Формирует заголовок и подвал отчета."""
-        canvas.saveState()
+    def _get_header_footer(self, doc):
+        """
+        Возвращает функцию прорисовки заголовка, подвала и номера страницы.
+        Абзацы заголовка и подвала формируются один раз на документ.
+        """
         header = Paragraph(
             _(
                 'Foodgram is an online service '
@@ -94,21 +126,64 @@ class PDFPrint:
             ),
             self.styles['Header-footer']
         )
-        w, h = header.wrap(doc.width, doc.topMargin)
-        header.drawOn(canvas, doc.leftMargin, doc.height + doc.topMargin - h)
+        header_height = header.wrap(doc.width, doc.topMargin)[1]
         footer = Paragraph(
             settings.SITE_URL,
             self.styles['Header-footer']
         )
-        w, h = footer.wrap(doc.width, doc.bottomMargin)
-        footer.drawOn(canvas, doc.leftMargin, h)
-        canvas.restoreState()
+        footer_height = footer.wrap(doc.width, doc.bottomMargin)[1]
 
-    def create_pdf(self, shoping_data):
-        """Формирует pdf документ."""
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="shoping.pdf"'
-        buffer = BytesIO()
+        def draw(canvas, doc):
+            """Прорисовка заголовка, подвала и номера страницы."""
+            canvas.saveState()
+            header.drawOn(
+                canvas,
+                doc.leftMargin,
+                doc.height + doc.topMargin - header_height
+            )
+            footer.drawOn(canvas, doc.leftMargin, footer_height)
+            canvas.drawRightString(
+                200 * mm, 5 * mm + (0.2 * inch), f'{canvas.getPageNumber()}'
+            )
+            canvas.restoreState()
+
+        return draw
+
+    def _get_tables(self, shoping_data, width):
+        """
+        Формирует таблицу списка покупок частями по TABLE_CHUNK_SIZE строк,
+        что избавляет reportlab от многократного разбиения одной большой
+        таблицы при переносе на следующие страницы.
+        """
+        col_widths = [width * part for part in self.col_width_parts]
+        rows = [get_table_header()]
+        style = self.green_table_style
+        for number, ingredient in enumerate(shoping_data, start=1):
+            rows.append((
+                f'{number}',
+                f'{ingredient["ingredients__name"]}',
+                f'{ingredient["ingredients__measurement_unit"]}',
+                f'{ingredient["total"]}'
+            ))
+            if len(rows) == TABLE_CHUNK_SIZE:
+                yield Table(
+                    rows, colWidths=col_widths, rowHeights=15, style=style
+                )
+                rows = []
+                style = self.green_body_table_style
+        if rows:
+            yield Table(
+                rows, colWidths=col_widths, rowHeights=15, style=style
+            )
+
+    def render(self, shoping_data):
+        """
+        Формирует pdf документ во временном файле.
+        Возвращает файл, установленный на начало, и его размер.
+        """
+        buffer = tempfile.SpooledTemporaryFile(
+            max_size=settings.REPORT_SPOOL_MAX_SIZE
+        )
         doc = SimpleDocTemplate(buffer,
                                 rightMargin=15,
                                 leftMargin=15,
@@ -123,56 +198,235 @@ class PDFPrint:
             )
         )
         elements.append(Spacer(1, 15))
-        table_header = (
-            '№',
-            _('name').capitalize(),
-            _('unit').capitalize(),
-            _('amount').capitalize()
-        )
-        table = [table_header]
-        for number, ingredient in enumerate(shoping_data, start=1):
-            row = (
-                f'{number}',
-                f'{ingredient["ingredients__name"]}',
-                f'{ingredient["ingredients__measurement_unit"]}',
-                f'{ingredient["total"]}'
-            )
-            table.append(row)
-        table = Table(table, rowHeights=15, style=self.green_table_style)
-        elements.append(table)
+        elements.extend(self._get_tables(shoping_data, doc.width))
         elements.append(Spacer(1, 10))
+        header_footer = self._get_header_footer(doc)
         doc.build(
             elements,
-            onFirstPage=self._header_footer,
-            onLaterPages=self._header_footer,
-            canvasmaker=NumberedCanvas
+            onFirstPage=header_footer,
+            onLaterPages=header_footer
         )
-        response.write(buffer.getvalue())
-        buffer.close()
+        size = buffer.tell()
+        buffer.seek(0)
+        return buffer, size
+
+    def create_pdf(self, shoping_data):
+        """
+        Формирует pdf документ во временном файле и возвращает
+        потоковый ответ с его содержимым.
+        """
+        return get_pdf_response(*self.render(shoping_data))
+
+
+@lru_cache(maxsize=None)
+def get_pdf_print(pagesize=DEFAULT_PAGESIZE):
+    """
+    Возвращает общий для всех запросов экземпляр PDFPrint
+    с подготовленными стилями документа и таблиц.
+    """
+    return PDFPrint(pagesize)
+
+
+def get_pdf_response(buffer, size):
+    """Возвращает потоковый ответ с pdf документом из файла buffer."""
+    response = FileResponse(
+        buffer,
+        as_attachment=True,
+        filename='shoping.pdf',
+        content_type='application/pdf'
+    )
+    response['Content-Length'] = size
+    return response
+
+
+def get_report_digest(shoping_data, pagesize=DEFAULT_PAGESIZE):
+    """
+    Возвращает хеш содержимого отчета: строк списка покупок,
+    текущего языка, формата страницы и версии макета отчета.
+    """
+    digest = hashlib.sha256(
+        f'{REPORT_VERSION}:{get_language()}:{pagesize}'.encode()
+    )
+    for ingredient in shoping_data:
+        digest.update(
+            json.dumps(
+                (
+                    ingredient['ingredients__name'],
+                    ingredient['ingredients__measurement_unit'],
+                    ingredient['total'],
+                ),
+                ensure_ascii=False,
+                default=str
+            ).encode()
+        )
+    return digest.hexdigest()
+
+
+def cache_report(cache, key, buffer, size):
+    """
+    Сохраняет в кеш отчетов по ключу key документ из файла buffer
+    размера size, если он не больше REPORT_CACHE_MAX_SIZE байт:
+    документы в кеше хранятся целиком в памяти или в одном файле.
+    Файл buffer после сохранения устанавливается на начало.
+    """
+    if size > settings.REPORT_CACHE_MAX_SIZE:
+        return
+    cache.set(key, buffer.read())
+    buffer.seek(0)
+
+
+def create_cached_pdf(shoping_data, digest, pagesize=DEFAULT_PAGESIZE):
+    """
+    Возвращает потоковый ответ с pdf документом из кеша отчетов.
+    При отсутствии документа в кеше формирует его во временном файле,
+    сохраняет в кеш по ключу digest небольшие документы и отдает
+    ответ из временного файла. Вытеснение записей определяется
+    настройками кеша REPORT_CACHE_ALIAS (время жизни и максимальное
+    число записей).
+    """
+    cache = caches[settings.REPORT_CACHE_ALIAS]
+    key = REPORT_CACHE_KEY.format(digest=digest)
+    content = cache.get(key)
+    if content is not None:
+        return get_pdf_response(BytesIO(content), len(content))
+    buffer, size = get_pdf_print(pagesize).render(shoping_data)
+    cache_report(cache, key, buffer, size)
+    return get_pdf_response(buffer, size)
+
+
+class Echo:
+    """Псевдо-файл, возвращающий записанную строку, для csv.writer."""
+    def write(self, value):
+        """Возвращает записанное значение."""
+        return value
+
+
+class ReportRenderer:
+    """
+    Базовый класс формирования файла списка покупок.
+    Атрибуты media_type и format используются при согласовании
+    формата ответа по заголовку Accept и параметру запроса format.
+    Наследники реализуют метод render, возвращающий итератор
+    фрагментов файла, которые отдаются клиенту потоковым ответом
+    по мере выборки строк списка покупок из БД. Признак background
+    разрешает фоновое формирование файла через задания ReportJob.
+    """
+    media_type = None
+    format = None
+    charset = 'utf-8'
+    background = False
+
+    def get_filename(self):
+        """Возвращает имя файла списка покупок."""
+        return f'shoping.{self.format}'
+
+    def render(self, shoping_data):
+        """Возвращает итератор фрагментов файла списка покупок."""
+        raise NotImplementedError(
+            'Метод render должен быть реализован в наследнике.'
+        )
+
+    def get_response(self, request, shoping_data):
+        """Возвращает потоковый ответ с файлом списка покупок."""
+        response = StreamingHttpResponse(
+            (
+                chunk.encode(self.charset)
+                for chunk in self.render(shoping_data.iterator())
+            ),
+            content_type=f'{self.media_type}; charset={self.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.get_filename()}"'
+        )
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class PDFReportRenderer(ReportRenderer):
+    """
+    Формирование списка покупок в pdf. Сформированные файлы кешируются
+    по хешу содержимого, который также передается в заголовке ETag.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    background = True
+    pagesize = DEFAULT_PAGESIZE
+
+    def get_response(self, request, shoping_data):
+        """Возвращает ответ с pdf файлом из кеша отчетов."""
+        shoping_data = list(shoping_data)
+        digest = get_report_digest(shoping_data, self.pagesize)
+        etag = quote_etag(digest)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = create_cached_pdf(
+                shoping_data, digest, self.pagesize
+            )
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
         return response
 
 
-class NumberedCanvas(canvas.Canvas):
-    """Класс номерации строк в отчете."""
-    def __init__(self, *args, **kwargs):
-        """Инициализация канвы."""
-        canvas.Canvas.__init__(self, *args, **kwargs)
-        self._saved_page_states = []
-
-    def showPage(self):  # noqa: N802
-        self._saved_page_states.append(dict(self.__dict__))
-        self._startPage()
-
-    def save(self):
-        """Добавляет на каждую нумерацию страницу."""
-        num_pages = len(self._saved_page_states)
-        for state in self._saved_page_states:
-            self.__dict__.update(state)
-            self.draw_page_number(num_pages)
-            canvas.Canvas.showPage(self)
-        canvas.Canvas.save(self)
-
-    def draw_page_number(self, page_count):
-        """Прорисовка нумерации."""
-        self.drawRightString(200 * mm, 5 * mm + (0.2 * inch),
-                             f'{self._pageNumber}')
+class CSVReportRenderer(ReportRenderer):
+    """Формирование списка покупок в csv."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render(self, shoping_data):
+        """Возвращает строки csv файла списка покупок."""
+        writer = csv.writer(Echo())
+        yield writer.writerow(get_table_header())
+        for number, ingredient in enumerate(shoping_data, start=1):
+            yield writer.writerow((
+                number,
+                ingredient['ingredients__name'],
+                ingredient['ingredients__measurement_unit'],
+                ingredient['total']
+            ))
+
+
+class TextReportRenderer(ReportRenderer):
+    """Формирование списка покупок в виде текста."""
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def render(self, shoping_data):
+        """Возвращает строки текстового файла списка покупок."""
+        yield f'{_("Shopping list")}\n\n'
+        for number, ingredient in enumerate(shoping_data, start=1):
+            yield (
+                f'{number}. {ingredient["ingredients__name"]} '
+                f'({ingredient["ingredients__measurement_unit"]}) '
+                f'- {ingredient["total"]}\n'
+            )
+
+
+class JSONReportRenderer(ReportRenderer):
+    """Формирование списка покупок в json."""
+    media_type = 'application/json'
+    format = 'json'
+
+    def render(self, shoping_data):
+        """Возвращает фрагменты json массива списка покупок."""
+        separator = '['
+        for ingredient in shoping_data:
+            yield separator + json.dumps(
+                {
+                    'name': ingredient['ingredients__name'],
+                    'measurement_unit': ingredient[
+                        'ingredients__measurement_unit'
+                    ],
+                    'amount': ingredient['total'],
+                },
+                ensure_ascii=False
+            )
+            separator = ','
+        yield ']' if separator == ',' else '[]'
+
+
+REPORT_RENDERERS = (
+    PDFReportRenderer,
+    CSVReportRenderer,
+    TextReportRenderer,
+    JSONReportRenderer,
+)
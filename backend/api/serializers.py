@@ -1,12 +1,19 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.utils.translation import gettext_lazy as _
 from djoser.serializers import UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
-from api.fields import PrimaryKey404RelatedField
-from core.utils import (create_ordered_dicts_from_objects,
+from api.fields import PrimaryKey404RelatedField, RecipeImageField
+from api.models import ReportJob
+from api.relations import (FAVORITES, SHOPPING_CART, SUBSCRIPTIONS,
+                           get_user_relations)
+from core.images import (THUMBNAIL, get_image_data_uri, get_image_url,
+                         set_recipe_image)
+from core.scores import ORDERINGS
+from core.utils import (create_ordered_dicts_from_objects, get_annotated_value,
                         get_field_values_from_dict,
                         get_from_dicts_field_values,
                         get_from_objects_field_values)
@@ -25,10 +32,16 @@ class CustomUserSerializer(UserSerializer):
 
     def get_is_subscribed(self, author):
         """Проверка наличия подписок у пользователя."""
-        user = self.context.get('request').user
-        if user.is_anonymous:
+        request = self.context.get('request')
+        if request.user.is_anonymous:
             return False
-        return user.is_subscribed(author)
+        return get_annotated_value(
+            author,
+            'followed_by_user',
+            get_user_relations(request).contains,
+            SUBSCRIPTIONS,
+            author.pk
+        )
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -58,9 +71,20 @@ class RecipeShortInfoSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    image_rendition = THUMBNAIL
+
     def get_image(self, obj):
-        """Возвращает абсолютный URL картинки."""
-        return self.context['request'].build_absolute_uri(obj.image.url)
+        """
+        Возвращает абсолютный URL уменьшенной копии картинки
+        image_rendition или заданной в контексте сериализатора,
+        а при embed_image в контексте - ее содержимое в base64.
+        """
+        rendition = self.context.get('image_rendition', self.image_rendition)
+        if self.context.get('embed_image'):
+            return get_image_data_uri(obj, rendition)
+        return self.context['request'].build_absolute_uri(
+            get_image_url(obj, rendition)
+        )
 
 
 class SubscribeParamsSerializer(serializers.Serializer):
@@ -68,6 +92,26 @@ class SubscribeParamsSerializer(serializers.Serializer):
     recipes_limit = serializers.IntegerField(required=False, min_value=1)
 
 
+class ShoppingCartParamsSerializer(serializers.Serializer):
+    """Сериализатор query параметров для выгрузки списка покупок."""
+    background = serializers.ChoiceField(
+        required=False, choices=[0, 1]
+    )
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """Сериализатор заданий формирования списка покупок."""
+    url = serializers.HyperlinkedIdentityField(
+        view_name='api:shopping-cart-job',
+        lookup_field='id'
+    )
+
+    class Meta:
+        model = ReportJob
+        fields = ('id', 'url', 'status', 'error', 'created', 'finished',)
+        read_only_fields = fields
+
+
 class SubscribeInfoSerializer(CustomUserSerializer):
     """Сериализатор информации по подпискам пользователей."""
     recipes = serializers.SerializerMethodField()
@@ -79,21 +123,27 @@ class SubscribeInfoSerializer(CustomUserSerializer):
             'recipes_count'
         )
 
-    def get_recipes(self, user):
-        """Список рецептов пользователя."""
+    def _get_recipes(self, user):
+        """Выборка последних рецептов пользователя."""
         recipes_limit = self.context.get('recipes_limit')
         recipes = user.author_recipes.all()
         if recipes_limit:
             recipes = recipes[:recipes_limit]
+        return recipes
+
+    def get_recipes(self, user):
+        """Список рецептов пользователя."""
         return RecipeShortInfoSerializer(
-            instance=recipes,
+            instance=get_annotated_value(
+                user, 'feed_recipes', self._get_recipes, user
+            ),
             many=True,
             context=self.context
         ).data
 
     def get_recipes_count(self, user):
-        """Возвращает количество рецептов."""
-        return user.author_recipes.count()
+        """Возвращает количество рецептов из счетчика пользователя."""
+        return user.recipes_count
 
 
 class SubscribeSerializer(serializers.ModelSerializer):
@@ -180,6 +230,43 @@ class RecipesParamsSerializer(serializers.Serializer):
         queryset=Tag.objects.all(),
         slug_field='slug'
     )
+    search = serializers.CharField(
+        required=False,
+        max_length=200,
+        trim_whitespace=True
+    )
+    embed_image = serializers.ChoiceField(
+        required=False, choices=[0, 1]
+    )
+    ordering = serializers.ChoiceField(
+        required=False, choices=ORDERINGS
+    )
+
+
+class PrefetchRelatedListSerializer(serializers.ListSerializer):
+    """
+    Сериализатор списка записей, объекты полей PrimaryKey404RelatedField
+    которых загружаются одним запросом на поле для всего списка.
+    """
+    def _get_prefetch_fields(self):
+        """Возвращает поля записи с загрузкой объектов списком."""
+        return [
+            field for field in self.child._writable_fields
+            if isinstance(field, PrimaryKey404RelatedField)
+        ]
+
+    def to_internal_value(self, data):
+        fields = self._get_prefetch_fields() if isinstance(data, list) else []
+        for field in fields:
+            field.prefetch(
+                item[field.field_name] for item in data
+                if isinstance(item, dict) and field.field_name in item
+            )
+        try:
+            return super().to_internal_value(data)
+        finally:
+            for field in fields:
+                field.clear_prefetched()
 
 
 class RecipesIngredientSerializer(serializers.ModelSerializer):
@@ -203,6 +290,7 @@ class RecipesIngredientSerializer(serializers.ModelSerializer):
             'measurement_unit',
             'amount',
         )
+        list_serializer_class = PrefetchRelatedListSerializer
 
 
 class RecipesReadSerializer(RecipeShortInfoSerializer):
@@ -215,10 +303,13 @@ class RecipesReadSerializer(RecipeShortInfoSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
+    image_rendition = None
 
     class Meta:
         model = Recipe
         fields = RecipeShortInfoSerializer.Meta.fields + (
+            'images',
             'tags',
             'author',
             'ingredients',
@@ -227,15 +318,35 @@ class RecipesReadSerializer(RecipeShortInfoSerializer):
             'text',
         )
 
+    def get_images(self, recipe):
+        """Возвращает абсолютные URL уменьшенных копий картинки."""
+        request = self.context['request']
+        return {
+            rendition: request.build_absolute_uri(
+                get_image_url(recipe, rendition)
+            )
+            for rendition in settings.RECIPE_IMAGE_RENDITIONS
+        }
+
     def get_is_favorited(self, recipe):
-        """Проверка наличия подписок у пользователя."""
-        user = self.context.get('request').user
-        return recipe.is_favorited(user)
+        """Проверка наличия рецепта в избранном у пользователя."""
+        return get_annotated_value(
+            recipe,
+            'favorited_by_user',
+            get_user_relations(self.context.get('request')).contains,
+            FAVORITES,
+            recipe.pk
+        )
 
     def get_is_in_shopping_cart(self, recipe):
-        """Проверка наличия подписок у пользователя."""
-        user = self.context.get('request').user
-        return recipe.is_in_shopping_cart(user)
+        """Проверка наличия рецепта в списке покупок у пользователя."""
+        return get_annotated_value(
+            recipe,
+            'in_user_shopping_cart',
+            get_user_relations(self.context.get('request')).contains,
+            SHOPPING_CART,
+            recipe.pk
+        )
 
 
 class RecipesWriteSerializer(serializers.ModelSerializer):
@@ -251,7 +362,7 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
     author = serializers.HiddenField(
         default=serializers.CurrentUserDefault()
     )
-    image = Base64ImageField(represent_in_base64=True)
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -330,47 +441,51 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
     def _update_recipe_m2m_data(
         self, recipe, queryset, data, obj_generator, *fields
     ):
-        """Обновление связанных с рецептом данных."""
+        """
+        Обновление связанных с рецептом данных по разнице между
+        текущими записями и данными data. Первое поле fields определяет
+        связанный объект, остальные - обновляемые значения связи.
+        Независимо от количества записей выполняется не больше четырех
+        запросов: выборка текущих записей, удаление, обновление
+        и добавление.
+        """
         if not fields:
             raise ValueError(
                 _('Recipe data cannot be set. Field list missing.')
             )
-        new_data_id = set(get_from_dicts_field_values(data, *fields))
-        db_values_id = set(
-            queryset.objects.filter(
+        key_field, *update_fields = fields
+        db_values = {
+            values[1]: values
+            for values in queryset.objects.filter(
                 recipe=recipe
-            ).values_list(*fields)
-        )
-        update_id = set()
-        if len(fields) > 1:
-            update_id = new_data_id - db_values_id
-            new_data_id = {(pk[0],) for pk in new_data_id}
-            db_values_id = {(pk[0],) for pk in db_values_id}
-        insert_id = new_data_id - db_values_id
-        delete_id = db_values_id - new_data_id
-        update_id = {id for id in update_id if (id[0],) not in insert_id}
-        if delete_id:
-            filter_id = {}
-            filter_id['recipe'] = recipe
-            filter_id[f'{fields[0]}__in'] = delete_id
-            queryset.objects.filter(**filter_id).delete()
-        if update_id:
-            filter_id = {}
-            update_fields = fields[1:]
-            filter_id['recipe'] = recipe
-            for data_id in update_id:
-                filter_id[f'{fields[0]}'] = data_id[0]
-                update_values = dict(zip(update_fields, data_id[1:]))
-                queryset.objects.filter(**filter_id).update(**update_values)
-        if insert_id:
-            insert_data = [
-                obj for obj in data if get_field_values_from_dict(
-                    obj, fields[0]
-                ) in insert_id
-            ]
-            self._create_recipe_m2m_data(
-                recipe, queryset, insert_data, obj_generator
+            ).values_list('pk', *fields)
+        }
+        new_objs = {}
+        for values, obj in zip(data, obj_generator(recipe, data)):
+            key = get_field_values_from_dict(
+                values, key_field, only_one_field=True
+            )
+            new_objs[key] = (
+                get_field_values_from_dict(values, *fields), obj
             )
+        delete_pks = [
+            values[0] for key, values in db_values.items()
+            if key not in new_objs
+        ]
+        update_objs = []
+        insert_objs = []
+        for key, (values, obj) in new_objs.items():
+            if key not in db_values:
+                insert_objs.append(obj)
+            elif values != db_values[key][1:]:
+                obj.pk = db_values[key][0]
+                update_objs.append(obj)
+        if delete_pks:
+            queryset.objects.filter(pk__in=delete_pks).delete()
+        if update_objs and update_fields:
+            queryset.objects.bulk_update(update_objs, update_fields)
+        if insert_objs:
+            queryset.objects.bulk_create(insert_objs)
 
     def create(self, validated_data):
         """Создает запись в БД по рецепту."""
@@ -388,7 +503,10 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
             ingredients = validated_data.pop('ingredients')
             tags = validated_data.pop('tags')
             tags = create_ordered_dicts_from_objects(tags, 'tag')
-            instance = Recipe.objects.create(**validated_data)
+            image = validated_data.pop('image')
+            instance = Recipe(**validated_data)
+            set_recipe_image(instance, image)
+            instance.save()
             self._create_recipe_m2m_data(
                 instance,
                 Recipe.ingredients.through,
@@ -419,8 +537,11 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
             ingredients = validated_data.pop('ingredients')
             tags = validated_data.pop('tags')
             tags = create_ordered_dicts_from_objects(tags, 'tag')
+            image = validated_data.pop('image', None)
             for attr, value in validated_data.items():
                 setattr(instance, attr, value)
+            if image is not None:
+                set_recipe_image(instance, image)
             instance.save()
             self._update_recipe_m2m_data(
                 instance,
@@ -441,6 +562,14 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         """Возвращает информацию по рецепту."""
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
         return RecipesReadSerializer(
             instance=instance,
             context=self.context
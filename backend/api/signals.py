@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_token, local_token_cache
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Сброс кеша аутентификации при удалении токена (выходе)."""
+    invalidate_token(key=instance.key, user_pk=instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_token(sender, instance, created, **kwargs):
+    """
+    Сброс кеша аутентификации при изменении пользователя,
+    в том числе при смене пароля и деактивации.
+    """
+    if not created:
+        invalidate_token(user_pk=instance.pk)
+
+
+@receiver(post_migrate)
+def clear_token_cache_after_migrate(sender, **kwargs):
+    """Очистка кеша аутентификации процесса после миграций и очистки БД."""
+    local_token_cache.clear()
@@ -4,8 +4,8 @@ from djoser.views import UserViewSet
 from rest_framework.routers import DefaultRouter
 
 from api.views import (FavoriteViewSet, IngredientViewSet, RecipesViewSet,
-                       ShoppingCartViewSet, SubscribeViewSet, TagViewSet,
-                       UserListViewSet)
+                       ReportJobViewSet, ShoppingCartViewSet, SubscribeViewSet,
+                       TagViewSet, UserListViewSet)
 
 app_name = 'api'
 
@@ -69,6 +69,11 @@ add_recipe_urlpatterns = [
         ShoppingCartViewSet.as_view({'get': 'download_shopping_cart'}),
         name='shopping-cart-download'
     ),
+    path(
+        'recipes/download_shopping_cart/<uuid:id>/',
+        ReportJobViewSet.as_view({'get': 'retrieve'}),
+        name='shopping-cart-job'
+    ),
 ]
 
 urlpatterns = [
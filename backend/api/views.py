@@ -1,20 +1,33 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
+from django.db.models import Prefetch, Sum
 from djoser.views import UserViewSet
-from rest_framework import mixins, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
 from api.filters import IngredientFilter
-from api.pagination import CustomPagination
+from api.jobs import enqueue_report
+from api.models import ReportJob
+from api.pagination import (CustomPagination, RecipesPagination,
+                            SubscribePagination)
 from api.permissions import IsAuthorOrAuthenticatedOrReadOnly
-from api.report import PDFPrint
+from api.relations import FAVORITES, SHOPPING_CART, SUBSCRIPTIONS
+from api.report import REPORT_RENDERERS, get_pdf_response, get_report_digest
 from api.serializers import (FavoriteSerializer, IngredientSerializer,
                              RecipesParamsSerializer, RecipesReadSerializer,
-                             RecipesWriteSerializer, ShoppingCartSerializer,
-                             SubscribeParamsSerializer, SubscribeSerializer,
-                             TagSerializer)
-from api.viewsets import UserDataViewSet
+                             RecipesWriteSerializer, ReportJobSerializer,
+                             ShoppingCartParamsSerializer,
+                             ShoppingCartSerializer, SubscribeParamsSerializer,
+                             SubscribeSerializer, TagSerializer)
+from api.viewsets import (CatalogueCacheMixin, CounterMixin, CountVersionMixin,
+                          UserDataViewSet, UserRelationsMixin)
+from core.counters import (FAVORITES_COUNT, FOLLOWERS_COUNT,
+                           SHOPPING_CARTS_COUNT)
+from core.images import CARD
+from core.scores import order_by_score
 from recipes.models import Ingredient, Recipe, Tag
 from users.models import Subscriber
 
@@ -26,29 +39,33 @@ class UserListViewSet(UserViewSet):
     pagination_class = CustomPagination
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(CatalogueCacheMixin, ReadOnlyModelViewSet):
     """ViewSet-класс для просмотра информации по тегам."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogueCacheMixin, ReadOnlyModelViewSet):
     """ViewSet-класс для просмотра информации по ингридиентам."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (IngredientFilter,)
 
 
-class SubscribeViewSet(mixins.ListModelMixin,
+class SubscribeViewSet(CounterMixin,
+                       UserRelationsMixin,
+                       mixins.ListModelMixin,
                        mixins.CreateModelMixin,
                        mixins.DestroyModelMixin,
                        UserDataViewSet):
     """ViewSet-класс для модели подписок пользователей."""
     serializer_class = SubscribeSerializer
-    pagination_class = CustomPagination
+    pagination_class = SubscribePagination
     user_field = 'user'
     obj_field = 'author'
     obj_model = User
+    relation = SUBSCRIPTIONS
+    counter = FOLLOWERS_COUNT
 
     def get_serializer_context(self):
         """Возвращает контекст сериализатора."""
@@ -60,11 +77,41 @@ class SubscribeViewSet(mixins.ListModelMixin,
         return context
 
     def get_queryset(self):
-        """Возвращает выборку данных по подпискам для текущего пользователя."""
-        return Subscriber.objects.filter(user=self.request.user)
+        """
+        Возвращает выборку данных по подпискам для текущего пользователя.
+        Для списка подписок авторы выбираются с признаком подписки
+        (количество рецептов хранится в счетчике автора), а последние
+        рецепты авторов - одним запросом,
+        поэтому число запросов к БД не зависит от размера страницы.
+        """
+        user = self.request.user
+        queryset = Subscriber.objects.filter(user=user)
+        if self.action != 'list':
+            return queryset
+        recipes = Recipe.objects.latest_by_author(
+            self.get_serializer_context()['recipes_limit']
+        ).only(
+            'id', 'name', 'image', 'renditions_ready', 'cooking_time',
+            'pub_date', 'author_id'
+        ).order_by('-pub_date', '-id')
+        return queryset.prefetch_related(
+            Prefetch(
+                'author',
+                queryset=User.objects.with_subscribed(user).prefetch_related(
+                    Prefetch(
+                        'author_recipes',
+                        queryset=recipes,
+                        to_attr='feed_recipes'
+                    )
+                )
+            )
+        )
 
 
-class FavoriteViewSet(mixins.CreateModelMixin,
+class FavoriteViewSet(CounterMixin,
+                      CountVersionMixin,
+                      UserRelationsMixin,
+                      mixins.CreateModelMixin,
                       mixins.DestroyModelMixin,
                       UserDataViewSet):
     """ViewSet-класс для избранного."""
@@ -72,6 +119,8 @@ class FavoriteViewSet(mixins.CreateModelMixin,
     user_field = 'customuser'
     obj_field = 'recipe'
     obj_model = Recipe
+    relation = FAVORITES
+    counter = FAVORITES_COUNT
 
     def get_queryset(self):
         """Возвращает выборку данных по избраному для текущего пользователя."""
@@ -80,7 +129,10 @@ class FavoriteViewSet(mixins.CreateModelMixin,
         )
 
 
-class ShoppingCartViewSet(mixins.CreateModelMixin,
+class ShoppingCartViewSet(CounterMixin,
+                          CountVersionMixin,
+                          UserRelationsMixin,
+                          mixins.CreateModelMixin,
                           mixins.DestroyModelMixin,
                           UserDataViewSet):
     """ViewSet-класс для избранного."""
@@ -88,6 +140,8 @@ class ShoppingCartViewSet(mixins.CreateModelMixin,
     user_field = 'customuser'
     obj_field = 'recipe'
     obj_model = Recipe
+    relation = SHOPPING_CART
+    counter = SHOPPING_CARTS_COUNT
 
     def get_queryset(self):
         """
@@ -98,23 +152,94 @@ class ShoppingCartViewSet(mixins.CreateModelMixin,
             customuser_id=self.request.user.pk
         )
 
+    def perform_content_negotiation(self, request, force=False):
+        """
+        Выбирает формат файла списка покупок по заголовку Accept
+        и параметру запроса format. Выбранный формат сохраняется
+        в request.report_renderer, а ответы с ошибками формируются в json.
+        """
+        if self.action != 'download_shopping_cart':
+            return super().perform_content_negotiation(request, force)
+        if not force:
+            request.report_renderer = (
+                self.get_content_negotiator().select_renderer(
+                    request,
+                    [renderer() for renderer in REPORT_RENDERERS],
+                    self.format_kwarg
+                )[0]
+            )
+        renderer = JSONRenderer()
+        return (renderer, renderer.media_type)
+
     @action(methods=['get'], detail=False)
     def download_shopping_cart(self, request):
-        """Формирует файл списка покупок."""
+        """
+        Формирует файл списка покупок в согласованном формате.
+        С параметром background=1 ставит формирование файла в очередь
+        и возвращает задание, по ссылке которого файл можно получить
+        после выполнения.
+        """
+        query = ShoppingCartParamsSerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
         user = self.request.user
         shopping_carts_ingredients = user.shopping_cart_recipes.values(
             'ingredients__name', 'ingredients__measurement_unit'
         ).annotate(
             total=Sum('recipe_ingredients__amount')
         ).order_by('ingredients__name')
-        return PDFPrint().create_pdf(shopping_carts_ingredients)
+        renderer = request.report_renderer
+        if not (query.validated_data.get('background')
+                and renderer.background):
+            return renderer.get_response(request, shopping_carts_ingredients)
+        shopping_carts_ingredients = list(shopping_carts_ingredients)
+        job = enqueue_report(
+            user,
+            shopping_carts_ingredients,
+            get_report_digest(shopping_carts_ingredients, renderer.pagesize),
+            renderer.pagesize
+        )
+        serializer = ReportJobSerializer(
+            job, context=self.get_serializer_context()
+        )
+        return Response(
+            serializer.data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': serializer.data['url']}
+        )
+
+
+class ReportJobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """ViewSet-класс заданий формирования списка покупок."""
+    serializer_class = ReportJobSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = 'id'
+
+    def get_queryset(self):
+        """Возвращает задания текущего пользователя."""
+        return ReportJob.objects.filter(user=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Возвращает pdf файл выполненного задания, иначе - состояние
+        задания со статусом 202 для ожидающих и выполняемых заданий.
+        """
+        job = self.get_object()
+        if job.status == ReportJob.DONE:
+            return get_pdf_response(job.file.open('rb'), job.file.size)
+        return Response(
+            self.get_serializer(job).data,
+            status=(
+                status.HTTP_200_OK if job.status == ReportJob.FAILED
+                else status.HTTP_202_ACCEPTED
+            )
+        )
 
 
 class RecipesViewSet(viewsets.ModelViewSet):
     """ViewSet-класс для модели рецептов."""
     permission_classes = [IsAuthorOrAuthenticatedOrReadOnly]
     queryset = Recipe.objects.all()
-    pagination_class = CustomPagination
+    pagination_class = RecipesPagination
     lookup_field = 'id'
 
     def get_serializer_context(self):
@@ -135,6 +260,11 @@ class RecipesViewSet(viewsets.ModelViewSet):
         context['tags'] = (
             [slug.pk for slug in tags_slug] if tags_slug else None
         )
+        context['search'] = query_params.get('search')
+        context['embed_image'] = query_params.get('embed_image')
+        context['ordering'] = query_params.get('ordering')
+        if self.action == 'list':
+            context['image_rendition'] = CARD
         return context
 
     def get_queryset(self):
@@ -142,6 +272,8 @@ class RecipesViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
         context = self.get_serializer_context()
         user = self.request.user
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.for_read(user)
         if context['is_favorited']:
             queryset = queryset.filter(favorites__id=user.pk)
         if context['is_in_shopping_cart']:
@@ -150,6 +282,10 @@ class RecipesViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(author__id=context['author'])
         if context['tags']:
             queryset = queryset.filter(tags__id__in=context['tags']).distinct()
+        if context['search']:
+            queryset = queryset.search(context['search'])
+        if context['ordering']:
+            queryset = order_by_score(queryset, context['ordering'])
         return queryset
 
     def get_serializer_class(self):
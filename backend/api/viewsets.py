@@ -1,9 +1,24 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from rest_framework import viewsets
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 
+from api.relations import get_user_relations
+from core.catalogue import RenderedResponse, get_catalogue_version
+from core.counters import change_counter
+from core.paginator import bump_count_version
 from core.utils import get_object_or_400
 
+CATALOGUE_KEY = 'catalogue:{label}:{version}:{signature}'
+
 
 class UserDataViewSet(viewsets.GenericViewSet):
     """Базовый viewSet-класс  пользователь."""
@@ -42,3 +57,131 @@ class UserDataViewSet(viewsets.GenericViewSet):
         obj_info = self._get_request_data()
         queryset = self.get_queryset()
         return get_object_or_400(queryset, **obj_info)
+
+
+class CounterMixin:
+    """
+    Миксин изменения счетчика counter объекта obj_model при создании
+    и удалении связи пользователя с объектом. Счетчик изменяется
+    выражением F в одной транзакции со связью.
+    """
+    counter = None
+
+    def perform_create(self, serializer):
+        """Создание связи с объектом."""
+        with transaction.atomic():
+            super().perform_create(serializer)
+            change_counter(self.counter, self._get_pk_values()[1], 1)
+
+    def perform_destroy(self, instance):
+        """Удаление связи с объектом."""
+        with transaction.atomic():
+            super().perform_destroy(instance)
+            change_counter(self.counter, self._get_pk_values()[1], -1)
+
+
+class CountVersionMixin:
+    """
+    Миксин сброса кешированных количеств объектов obj_model
+    при создании и удалении связи пользователя с объектом.
+    """
+    def perform_create(self, serializer):
+        """Создание связи с объектом."""
+        super().perform_create(serializer)
+        bump_count_version(self.obj_model)
+
+    def perform_destroy(self, instance):
+        """Удаление связи с объектом."""
+        super().perform_destroy(instance)
+        bump_count_version(self.obj_model)
+
+
+class UserRelationsMixin:
+    """
+    Миксин синхронизации множеств связей пользователя relation
+    при создании и удалении связи пользователя с объектом.
+    """
+    relation = None
+
+    def _get_obj_id(self):
+        """
+        Возвращает идентификатор объекта из запроса в виде числа,
+        как в множествах связей пользователя.
+        """
+        return int(self._get_pk_values()[1])
+
+    def perform_create(self, serializer):
+        """Создание связи с объектом."""
+        super().perform_create(serializer)
+        get_user_relations(self.request).add(
+            self.relation, self._get_obj_id()
+        )
+
+    def perform_destroy(self, instance):
+        """Удаление связи с объектом."""
+        super().perform_destroy(instance)
+        get_user_relations(self.request).discard(
+            self.relation, self._get_obj_id()
+        )
+
+
+class CatalogueCacheMixin:
+    """
+    Миксин кеширования ответов справочников. Ответ в json сохраняется
+    в кеше один раз для версии справочника, которая сбрасывается
+    сигналами изменения записей модели. Ответы содержат заголовки
+    ETag (хеш содержимого), Last-Modified (время создания версии)
+    и Cache-Control, повторные запросы с If-None-Match или
+    If-Modified-Since получают ответ 304.
+    """
+    def list(self, request, *args, **kwargs):
+        """Список записей справочника."""
+        return self._get_cached_response(super().list, request, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Запись справочника."""
+        return self._get_cached_response(
+            super().retrieve, request, **kwargs
+        )
+
+    def _get_cache_key(self, request, version, **kwargs):
+        """Возвращает ключ кеша ответа для версии справочника."""
+        signature = hashlib.sha1(
+            repr((
+                self.action,
+                sorted(kwargs.items()),
+                sorted(request.query_params.lists()),
+            )).encode()
+        ).hexdigest()
+        return CATALOGUE_KEY.format(
+            label=self.queryset.model._meta.label_lower,
+            version=version,
+            signature=signature
+        )
+
+    def _get_cached_response(self, action, request, **kwargs):
+        """Возвращает ответ из кеша, при отсутствии формирует его."""
+        version, last_modified = get_catalogue_version(self.queryset.model)
+        key = self._get_cache_key(request, version, **kwargs)
+        cached = cache.get(key)
+        if cached is None:
+            response = action(request, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            content = JSONRenderer().render(response.data)
+            cached = (hashlib.sha256(content).hexdigest(), content)
+            cache.set(key, cached, settings.CATALOGUE_CACHE_TTL)
+        etag = quote_etag(cached[0])
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        ) or RenderedResponse(cached[1])
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.CATALOGUE_MAX_AGE,
+            must_revalidate=True
+        )
+        patch_vary_headers(response, ('Accept',))
+        return response
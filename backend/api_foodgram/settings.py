@@ -20,6 +20,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -68,10 +69,35 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
-        'PORT': os.getenv('DB_PORT', '5432')
+        'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': (
+            os.getenv('DB_CONN_HEALTH_CHECKS', 'TRUE').upper() == 'TRUE'
+        ),
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'FALSE').upper()
+            == 'TRUE'
+        ),
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reports': {
+        'BACKEND': os.getenv(
+            'REPORT_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('REPORT_CACHE_LOCATION', 'reports'),
+        'TIMEOUT': int(os.getenv('REPORT_CACHE_TTL', 60 * 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('REPORT_CACHE_MAX_ENTRIES', 300)),
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,6 +140,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.TokenAuthentication',
     ],
     'DEFAULT_RENDERER_CLASSES': [
@@ -141,6 +168,98 @@ DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
 SITE_URL = os.getenv('SITE_URL', 'https://foodgram.com')
 
+RECIPE_SEARCH_CONFIG = os.getenv('RECIPE_SEARCH_CONFIG', 'russian')
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+REPORT_SPOOL_MAX_SIZE = int(os.getenv('REPORT_SPOOL_MAX_SIZE', 1024 * 1024))
+
+REPORT_CACHE_ALIAS = 'reports'
+
+REPORT_CACHE_MAX_SIZE = int(os.getenv('REPORT_CACHE_MAX_SIZE', 256 * 1024))
+
+CATALOGUE_CACHE_TTL = int(os.getenv('CATALOGUE_CACHE_TTL', 10 * 60))
+
+CATALOGUE_MAX_AGE = int(os.getenv('CATALOGUE_MAX_AGE', 0))
+
+# Кеш аутентификации включается только с общим для процессов бэкендом
+# кеша: при кеше в памяти процесса отозванный токен принимается другими
+# процессами до AUTH_TOKEN_CACHE_TTL секунд.
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 0))
+
+AUTH_TOKEN_LOCAL_CACHE_TTL = int(os.getenv('AUTH_TOKEN_LOCAL_CACHE_TTL', 5))
+
+AUTH_TOKEN_LOCAL_CACHE_SIZE = int(
+    os.getenv('AUTH_TOKEN_LOCAL_CACHE_SIZE', 1024)
+)
+
+USER_RELATIONS_CACHE_TTL = int(os.getenv('USER_RELATIONS_CACHE_TTL', 0))
+
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_CACHE_TTL', 60))
+
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD', 100000)
+)
+
+# db - задания выполняет команда run_report_worker вне процессов backend,
+# thread - пул потоков процесса backend, в котором формирование pdf
+# конкурирует с обработкой запросов за GIL.
+REPORT_JOB_BACKEND = os.getenv('REPORT_JOB_BACKEND', 'db')
+
+REPORT_JOB_WORKERS = int(os.getenv('REPORT_JOB_WORKERS', 2))
+
+REPORT_JOB_TTL = int(os.getenv('REPORT_JOB_TTL', 24 * 60 * 60))
+
+REPORT_JOB_POLL_INTERVAL = float(os.getenv('REPORT_JOB_POLL_INTERVAL', 1))
+
+REPORT_JOB_TIMEOUT = int(os.getenv('REPORT_JOB_TIMEOUT', 10 * 60))
+
+REPORT_JOB_CLEANUP_INTERVAL = int(
+    os.getenv('REPORT_JOB_CLEANUP_INTERVAL', 5 * 60)
+)
+
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', 5 * 1024 * 1024)
+)
+
+RECIPE_IMAGE_MAX_PIXELS = int(os.getenv('RECIPE_IMAGE_MAX_PIXELS', 25000000))
+
+RECIPE_IMAGE_RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+
+RECIPE_IMAGE_QUALITY = int(os.getenv('RECIPE_IMAGE_QUALITY', 80))
+
+RECIPE_IMAGE_BACKEND = os.getenv('RECIPE_IMAGE_BACKEND', 'thread')
+
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+
+RECIPE_IMAGE_POLL_INTERVAL = float(
+    os.getenv('RECIPE_IMAGE_POLL_INTERVAL', 1)
+)
+
+RECIPE_SCORE_FAVORITE_WEIGHT = float(
+    os.getenv('RECIPE_SCORE_FAVORITE_WEIGHT', 1)
+)
+
+RECIPE_SCORE_CART_WEIGHT = float(os.getenv('RECIPE_SCORE_CART_WEIGHT', 0.5))
+
+RECIPE_SCORE_POPULAR_HALF_LIFE = int(
+    os.getenv('RECIPE_SCORE_POPULAR_HALF_LIFE', 30 * 24 * 60 * 60)
+)
+
+RECIPE_SCORE_TRENDING_HALF_LIFE = int(
+    os.getenv('RECIPE_SCORE_TRENDING_HALF_LIFE', 24 * 60 * 60)
+)
+
+RECIPE_SCORE_REFRESH_INTERVAL = float(
+    os.getenv('RECIPE_SCORE_REFRESH_INTERVAL', 5 * 60)
+)
+
 if DEBUG:
     MIDDLEWARE += [
         'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -0,0 +1,436 @@
+import json
+import os
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.datasets import (DATASET_IMAGE, DATASET_PASSWORD,
+                           refresh_dataset_counters)
+from core.scores import refresh_recipe_scores
+from recipes.models import Recipe
+from users.models import Subscriber
+
+User = get_user_model()
+
+BASELINE_PATH = getattr(
+    settings,
+    'BENCHMARK_BASELINE_PATH',
+    os.path.join(settings.BASE_DIR, 'core', 'benchmark_baseline.json')
+)
+IMAGE_BASE64 = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAAC'
+    'VBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAg'
+    'gCByxOyYQAAAABJRU5ErkJggg=='
+)
+
+DATASET_IMAGE_SIZE = (1600, 1200)
+
+Endpoint = namedtuple(
+    'Endpoint',
+    ('name', 'method', 'url', 'auth', 'paginated', 'data', 'prepare')
+)
+Endpoint.__new__.__defaults__ = (True, False, None, None)
+
+
+def _recipe_data(context):
+    """Данные запроса на создание и изменение рецепта."""
+    return {
+        'name': 'Рецепт для замера',
+        'text': 'Текст рецепта для замера',
+        'cooking_time': 10,
+        'image': IMAGE_BASE64,
+        'tags': context['tags'][:2],
+        'ingredients': [
+            {'id': ingredient_id, 'amount': 10}
+            for ingredient_id in context['ingredients'][:5]
+        ],
+    }
+
+
+def _set_relation(through, present, **kwargs):
+    """Подготовка наличия или отсутствия связи пользователя с объектом."""
+    through.objects.filter(**kwargs).delete()
+    if present:
+        through.objects.create(**kwargs)
+
+
+ENDPOINTS = (
+    Endpoint('tags-list', 'get', '/api/tags/', auth=False),
+    Endpoint('tags-detail', 'get', '/api/tags/{tag}/', auth=False),
+    Endpoint('ingredients-list', 'get', '/api/ingredients/', auth=False),
+    Endpoint(
+        'ingredients-search', 'get', '/api/ingredients/', auth=False,
+        data=lambda context: {'name': 'Синт'}
+    ),
+    Endpoint(
+        'ingredients-detail', 'get', '/api/ingredients/{ingredient}/',
+        auth=False
+    ),
+    Endpoint('recipes-list', 'get', '/api/recipes/', paginated=True),
+    Endpoint(
+        'recipes-list-anonymous', 'get', '/api/recipes/', auth=False,
+        paginated=True
+    ),
+    Endpoint(
+        'recipes-list-cursor', 'get', '/api/recipes/', paginated=True,
+        data=lambda context: {'cursor': ''}
+    ),
+    Endpoint(
+        'recipes-list-embed-image', 'get', '/api/recipes/', paginated=True,
+        data=lambda context: {'embed_image': 1}
+    ),
+    Endpoint(
+        'recipes-list-trending', 'get', '/api/recipes/', paginated=True,
+        data=lambda context: {'ordering': 'trending'}
+    ),
+    Endpoint('recipes-detail', 'get', '/api/recipes/{recipe}/'),
+    Endpoint(
+        'recipes-detail-embed-image', 'get', '/api/recipes/{recipe}/',
+        data=lambda context: {'embed_image': 1}
+    ),
+    Endpoint('recipes-create', 'post', '/api/recipes/', data=_recipe_data),
+    Endpoint(
+        'recipes-update', 'patch', '/api/recipes/{own_recipe}/',
+        data=_recipe_data
+    ),
+    Endpoint('recipes-delete', 'delete', '/api/recipes/{own_recipe}/'),
+    Endpoint(
+        'favorite-create', 'post', '/api/recipes/{recipe}/favorite/',
+        prepare=lambda context: _set_relation(
+            Recipe.favorites.through, False,
+            customuser_id=context['user'], recipe_id=context['recipe']
+        )
+    ),
+    Endpoint(
+        'favorite-delete', 'delete', '/api/recipes/{recipe}/favorite/',
+        prepare=lambda context: _set_relation(
+            Recipe.favorites.through, True,
+            customuser_id=context['user'], recipe_id=context['recipe']
+        )
+    ),
+    Endpoint(
+        'shopping-cart-create', 'post',
+        '/api/recipes/{recipe}/shopping_cart/',
+        prepare=lambda context: _set_relation(
+            Recipe.shopping_carts.through, False,
+            customuser_id=context['user'], recipe_id=context['recipe']
+        )
+    ),
+    Endpoint(
+        'shopping-cart-delete', 'delete',
+        '/api/recipes/{recipe}/shopping_cart/',
+        prepare=lambda context: _set_relation(
+            Recipe.shopping_carts.through, True,
+            customuser_id=context['user'], recipe_id=context['recipe']
+        )
+    ),
+    Endpoint(
+        'shopping-cart-download', 'get',
+        '/api/recipes/download_shopping_cart/'
+    ),
+    Endpoint('users-list', 'get', '/api/users/', paginated=True),
+    Endpoint(
+        'users-create', 'post', '/api/users/', auth=False,
+        data=lambda context: {
+            'email': 'benchmark-new@example.com',
+            'username': 'benchmark_new',
+            'first_name': 'Имя',
+            'last_name': 'Фамилия',
+            'password': DATASET_PASSWORD,
+        }
+    ),
+    Endpoint('users-detail', 'get', '/api/users/{author}/'),
+    Endpoint('users-me', 'get', '/api/users/me/'),
+    Endpoint(
+        'users-set-password', 'post', '/api/users/set_password/',
+        data=lambda context: {
+            'current_password': DATASET_PASSWORD,
+            'new_password': f'{DATASET_PASSWORD}-new',
+        }
+    ),
+    Endpoint(
+        'subscriptions-list', 'get', '/api/users/subscriptions/',
+        paginated=True,
+        data=lambda context: {'recipes_limit': 3}
+    ),
+    Endpoint(
+        'subscriptions-list-cursor', 'get', '/api/users/subscriptions/',
+        paginated=True,
+        data=lambda context: {'recipes_limit': 3, 'cursor': ''}
+    ),
+    Endpoint(
+        'subscribe-create', 'post', '/api/users/{author}/subscribe/',
+        prepare=lambda context: _set_relation(
+            Subscriber, False,
+            user_id=context['user'], author_id=context['author']
+        )
+    ),
+    Endpoint(
+        'subscribe-delete', 'delete', '/api/users/{author}/subscribe/',
+        prepare=lambda context: _set_relation(
+            Subscriber, True,
+            user_id=context['user'], author_id=context['author']
+        )
+    ),
+    Endpoint(
+        'token-login', 'post', '/api/auth/token/login/', auth=False,
+        data=lambda context: {
+            'email': context['email'],
+            'password': DATASET_PASSWORD,
+        }
+    ),
+    Endpoint('token-logout', 'post', '/api/auth/token/logout/'),
+    Endpoint('docs', 'get', '/api/docs/', auth=False),
+)
+
+
+def _get_content_size(response):
+    """Возвращает размер содержимого ответа в байтах."""
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+@contextmanager
+def rollback():
+    """Выполнение блока кода в транзакции с последующим откатом."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def ensure_dataset_image(size=DATASET_IMAGE_SIZE):
+    """
+    Создает файл картинки синтетических рецептов из шума размера size,
+    который плохо сжимается, чтобы замеры с содержимым картинок
+    выполнялись на большом файле.
+    """
+    if default_storage.exists(DATASET_IMAGE):
+        return
+    buffer = BytesIO()
+    Image.effect_noise(size, 64).save(buffer, 'PNG')
+    default_storage.save(DATASET_IMAGE, ContentFile(buffer.getvalue()))
+
+
+def build_context(dataset, page_size):
+    """
+    Формирует контекст замеров на основании синтетического набора данных:
+    первый пользователь набора получает рецепт, если у него нет своих,
+    подписывается на авторов, добавляет рецепты в избранное и список
+    покупок, чтобы каждая страница содержала связанные с ним данные,
+    после чего пересчитываются счетчики и оценки популярности рецептов.
+    """
+    ensure_dataset_image()
+    user = User.objects.get(pk=dataset['users'][0])
+    authors = dataset['users'][1:page_size + 1]
+    if not Recipe.objects.filter(author=user).exists():
+        Recipe.objects.filter(pk=dataset['recipes'][-1]).update(author=user)
+    Subscriber.objects.filter(user=user).delete()
+    Subscriber.objects.bulk_create(
+        Subscriber(user_id=user.pk, author_id=author_id)
+        for author_id in authors
+    )
+    recipes = list(
+        Recipe.objects.exclude(author=user).filter(
+            pk__in=dataset['recipes']
+        ).values_list('pk', flat=True)[:page_size]
+    )
+    for through in (Recipe.favorites.through, Recipe.shopping_carts.through):
+        through.objects.filter(customuser_id=user.pk).delete()
+        through.objects.bulk_create(
+            through(customuser_id=user.pk, recipe_id=recipe_id)
+            for recipe_id in recipes
+        )
+    refresh_dataset_counters(dataset['users'], dataset['recipes'])
+    refresh_recipe_scores()
+    return {
+        'user': user.pk,
+        'email': user.email,
+        'token': Token.objects.get_or_create(user=user)[0].key,
+        'author': authors[0],
+        'recipe': recipes[0],
+        'own_recipe': Recipe.objects.filter(author=user).values_list(
+            'pk', flat=True
+        ).first(),
+        'tag': dataset['tags'][0],
+        'tags': dataset['tags'],
+        'ingredient': dataset['ingredients'][0],
+        'ingredients': dataset['ingredients'],
+    }
+
+
+class APIBenchmark:
+    """
+    Замер количества запросов к БД, времени выполнения, размера ответа
+    и выделенной памяти для эндпоинтов API. Каждый запрос выполняется
+    в транзакции с откатом, поэтому замеры не изменяют данные.
+    """
+    def __init__(self, context, page_size=10, **client_defaults):
+        """Инициализация замеров."""
+        self.context = context
+        self.page_size = page_size
+        self.client_defaults = client_defaults
+
+    def _get_client(self, endpoint):
+        """Возвращает клиент API с учетными данными при необходимости."""
+        client = APIClient(**self.client_defaults)
+        if endpoint.auth:
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Token {self.context["token"]}'
+            )
+        return client
+
+    def _request(self, endpoint, params):
+        """Выполняет запрос к эндпоинту в транзакции с откатом."""
+        with rollback():
+            if endpoint.prepare:
+                endpoint.prepare(self.context)
+            client = self._get_client(endpoint)
+            url = endpoint.url.format(**self.context)
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(client, endpoint.method)(
+                    url, data=params, format='json'
+                )
+                elapsed = time.perf_counter() - start
+        return response, len(queries.captured_queries), elapsed
+
+    def _memory(self, endpoint, params):
+        """Возвращает пиковый объем памяти при выполнении запроса (КБ)."""
+        tracemalloc.start()
+        try:
+            self._request(endpoint, params)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return round(peak / 1024, 1)
+
+    def _params(self, endpoint, limit=None):
+        """Возвращает параметры запроса к эндпоинту."""
+        params = dict(endpoint.data(self.context)) if endpoint.data else {}
+        if endpoint.paginated:
+            params['limit'] = limit or self.page_size
+        return params or None
+
+    def measure(self, endpoint):
+        """Замер показателей для одного эндпоинта."""
+        params = self._params(endpoint)
+        self._request(endpoint, params)
+        response, queries, elapsed = self._request(endpoint, params)
+        result = {
+            'status': response.status_code,
+            'queries': queries,
+            'time_ms': round(elapsed * 1000, 2),
+            'size_kb': round(_get_content_size(response) / 1024, 1),
+            'memory_kb': self._memory(endpoint, params),
+            'scales': False,
+        }
+        if endpoint.paginated:
+            _, single_queries, _ = self._request(
+                endpoint, self._params(endpoint, limit=1)
+            )
+            result['queries_single'] = single_queries
+            result['scales'] = queries != single_queries
+        return result
+
+    def run(self, endpoints=ENDPOINTS):
+        """
+        Замер показателей для списка эндпоинтов. Необработанная ошибка
+        при запросе к эндпоинту фиксируется как результат с кодом 500.
+        """
+        results = {}
+        for endpoint in endpoints:
+            try:
+                results[endpoint.name] = self.measure(endpoint)
+            except Exception as error:
+                results[endpoint.name] = {
+                    'status': 500,
+                    'error': str(error),
+                    'queries': 0,
+                    'time_ms': 0,
+                    'size_kb': 0,
+                    'memory_kb': 0,
+                    'scales': False,
+                }
+        return results
+
+
+def _baseline_queries(result):
+    """
+    Возвращает количество запросов для сравнения с базовым показателем:
+    для списков с пагинацией - при странице из одного объекта,
+    что не зависит от размера страницы замера.
+    """
+    return result.get('queries_single', result['queries'])
+
+
+def _is_failed(result):
+    """Проверяет, завершился ли запрос замера ошибкой."""
+    return 'error' in result or result['status'] >= 400
+
+
+def load_baseline(path=BASELINE_PATH):
+    """Загружает сохраненные базовые показатели замеров."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(results, path=BASELINE_PATH, baseline=None):
+    """
+    Сохраняет количество запросов к БД как базовые показатели,
+    результаты запросов, завершившихся ошибкой, пропускаются.
+    Признак допустимого роста запросов от размера страницы
+    переносится из предыдущих базовых показателей.
+    """
+    baseline = baseline if baseline is not None else load_baseline(path)
+    for name, result in results.items():
+        if _is_failed(result):
+            continue
+        entry = baseline.setdefault(name, {})
+        entry['queries'] = _baseline_queries(result)
+        entry.setdefault('allow_scaling', False)
+    with open(path, 'w', encoding='utf-8') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
+    return baseline
+
+
+def find_regressions(results, baseline):
+    """
+    Возвращает список описаний регрессий: ответ с кодом ошибки,
+    рост количества запросов от размера страницы и превышение базовых
+    показателей.
+    """
+    problems = []
+    for name, result in results.items():
+        if 'error' in result:
+            problems.append(f'{name}: {result["error"]}')
+            continue
+        if _is_failed(result):
+            problems.append(f'{name}: status {result["status"]}')
+            continue
+        expected = baseline.get(name, {})
+        if result['scales'] and not expected.get('allow_scaling'):
+            problems.append(
+                f'{name}: {result["queries_single"]} queries for one object, '
+                f'{result["queries"]} queries for a page'
+            )
+        limit = expected.get('queries')
+        queries = _baseline_queries(result)
+        if limit is not None and queries > limit:
+            problems.append(f'{name}: {queries} queries, baseline {limit}')
+    return problems
@@ -0,0 +1,72 @@
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+CATALOGUE_VERSION_KEY = 'catalogue-version:{label}'
+
+
+def get_catalogue_version(model):
+    """
+    Возвращает версию справочника модели и время ее создания.
+    Версия хранится в кеше CATALOGUE_CACHE_TTL секунд, после чего
+    создается новая, что ограничивает время рассинхронизации кешей
+    процессов, не использующих общий бэкенд кеша.
+    """
+    key = CATALOGUE_VERSION_KEY.format(label=model._meta.label_lower)
+    version = cache.get(key)
+    if version is None:
+        cache.add(
+            key,
+            (uuid.uuid4().hex, int(time.time())),
+            settings.CATALOGUE_CACHE_TTL
+        )
+        version = cache.get(key)
+    return version
+
+
+def bump_catalogue_version(model):
+    """Сброс версии справочника модели при изменении его записей."""
+    cache.delete(CATALOGUE_VERSION_KEY.format(label=model._meta.label_lower))
+
+
+class RenderedResponse(Response):
+    """
+    Ответ REST framework с заранее сформированным содержимым в json.
+    Содержимое отдается без повторной сериализации, а данные ответа
+    декодируются только при обращении к атрибуту data, например при
+    отображении в Browsable API.
+    """
+    def __init__(self, content, **kwargs):
+        """Инициализация ответа с содержимым content в json."""
+        self.json_content = content
+        super().__init__(**kwargs)
+
+    @property
+    def data(self):
+        """Данные ответа."""
+        if self._data is None:
+            self._data = json.loads(self.json_content)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        """Содержимое ответа для формата json без отступов."""
+        renderer = getattr(self, 'accepted_renderer', None)
+        if not isinstance(renderer, JSONRenderer):
+            return super().rendered_content
+        indent = renderer.get_indent(
+            self.accepted_media_type, self.renderer_context
+        )
+        if indent is not None:
+            return super().rendered_content
+        self['Content-Type'] = renderer.media_type
+        return self.json_content
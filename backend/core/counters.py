@@ -0,0 +1,160 @@
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.importers import batched
+from recipes.models import Recipe
+from users.models import Subscriber
+
+User = get_user_model()
+
+REFRESH_BATCH_SIZE = 500
+
+Counter = namedtuple(
+    'Counter', ('model', 'field', 'related', 'related_field', 'source_field')
+)
+
+FAVORITES_COUNT = Counter(
+    Recipe, 'favorites_count', Recipe.favorites.through, 'recipe', 'customuser'
+)
+SHOPPING_CARTS_COUNT = Counter(
+    Recipe, 'shopping_carts_count', Recipe.shopping_carts.through, 'recipe',
+    'customuser'
+)
+RECIPES_COUNT = Counter(User, 'recipes_count', Recipe, 'author', None)
+FOLLOWERS_COUNT = Counter(
+    User, 'followers_count', Subscriber, 'author', 'user'
+)
+COUNTERS = (
+    FAVORITES_COUNT, SHOPPING_CARTS_COUNT, RECIPES_COUNT, FOLLOWERS_COUNT
+)
+USER_RELATION_COUNTERS = (
+    FAVORITES_COUNT, SHOPPING_CARTS_COUNT, FOLLOWERS_COUNT
+)
+M2M_COUNTERS = {
+    Recipe.favorites.through: (
+        Recipe._meta.get_field('favorites'), FAVORITES_COUNT
+    ),
+    Recipe.shopping_carts.through: (
+        Recipe._meta.get_field('shopping_carts'), SHOPPING_CARTS_COUNT
+    ),
+    Subscriber: (User._meta.get_field('subscribed'), FOLLOWERS_COUNT),
+}
+
+
+def get_counter_label(counter):
+    """Возвращает название счетчика вида модель.поле."""
+    return f'{counter.model._meta.label_lower}.{counter.field}'
+
+
+def get_actual_count(counter):
+    """
+    Возвращает выражение фактического количества связанных записей
+    счетчика counter для каждой записи выборки его модели.
+    """
+    return Coalesce(
+        Subquery(
+            counter.related.objects.filter(
+                **{counter.related_field: OuterRef('pk')}
+            ).order_by().values(counter.related_field).annotate(
+                count=Count('pk')
+            ).values('count')
+        ),
+        0
+    )
+
+
+def change_counter(counter, pk, delta):
+    """
+    Изменяет счетчик counter записи pk на delta выражением F
+    без выборки записи. Счетчик не уменьшается ниже нуля.
+    """
+    queryset = counter.model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{counter.field}__gte': -delta})
+    queryset.update(**{counter.field: F(counter.field) + delta})
+
+
+def refresh_counters(counter, pks, batch_size=REFRESH_BATCH_SIZE):
+    """
+    Пересчитывает счетчик counter записей с первичными ключами pks
+    по фактическому количеству связанных записей, по одному запросу
+    на пакет из batch_size записей.
+    """
+    for batch in batched(pks, batch_size):
+        counter.model.objects.filter(pk__in=batch).update(
+            **{counter.field: get_actual_count(counter)}
+        )
+
+
+def get_user_relation_pks(user_pk):
+    """
+    Возвращает первичные ключи записей, счетчики которых зависят
+    от связей пользователя user_pk (избранное, списки покупок, подписки).
+    """
+    return {
+        counter: list(
+            counter.related.objects.filter(
+                **{counter.source_field: user_pk}
+            ).values_list(counter.related_field, flat=True)
+        )
+        for counter in USER_RELATION_COUNTERS
+    }
+
+
+def update_m2m_counter(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Обработчик сигнала m2m_changed промежуточной модели sender:
+    пересчет счетчиков записей, связи которых изменены методами add,
+    remove, set и clear. Если instance - запись модели счетчика,
+    пересчитывается ее счетчик, иначе счетчики записей pk_set,
+    а при очистке связей - записей, связанных с instance до очистки.
+    """
+    field, counter = M2M_COUNTERS[sender]
+    instance_field = (
+        field.m2m_reverse_field_name() if reverse else field.m2m_field_name()
+    )
+    if instance_field == counter.related_field:
+        pks = [instance.pk]
+    elif action == 'pre_clear':
+        pks = []
+        instance._cleared_counter_pks = list(
+            sender.objects.filter(
+                **{instance_field: instance.pk}
+            ).values_list(counter.related_field, flat=True)
+        )
+    elif action == 'post_clear':
+        pks = instance.__dict__.pop('_cleared_counter_pks', [])
+    else:
+        pks = pk_set or []
+    if action in ('post_add', 'post_remove', 'post_clear') and pks:
+        refresh_counters(counter, pks)
+
+
+def reconcile_counters(counters=COUNTERS, dry_run=False,
+                       batch_size=REFRESH_BATCH_SIZE):
+    """
+    Находит записи, значения счетчиков counters которых отличаются
+    от фактического количества связанных записей, и пересчитывает их
+    (при dry_run только находит). Расхождения возникают при массовых
+    операциях без сигналов: bulk_create, update, удалении запросами
+    и каскадном удалении. Возвращает словарь с количеством исправленных
+    записей по названиям счетчиков.
+    """
+    result = {}
+    for counter in counters:
+        pks = list(
+            counter.model.objects.annotate(
+                actual_count=get_actual_count(counter)
+            ).exclude(
+                **{counter.field: F('actual_count')}
+            ).order_by('pk').values_list('pk', flat=True)
+        )
+        if not dry_run:
+            with transaction.atomic():
+                refresh_counters(counter, pks, batch_size)
+        result[get_counter_label(counter)] = len(pks)
+    return result
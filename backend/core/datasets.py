@@ -0,0 +1,403 @@
+import random
+import zlib
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.catalogue import bump_catalogue_version
+from core.counters import COUNTERS, refresh_counters
+from core.paginator import bump_count_version
+from core.utils import bulk_create_batched
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, RecipeScore,
+                            Tag)
+from recipes.search_index import ingredient_index
+from users.models import Subscriber
+
+User = get_user_model()
+
+DATASET_PREFIX = 'synthetic'
+DATASET_PASSWORD = 'Synthetic-Password-1'
+DATASET_EMAIL_DOMAIN = 'dataset.invalid'
+DATASET_IMAGE = 'recipes/synthetic.png'
+MEASUREMENT_UNITS = ('г', 'кг', 'мл', 'л', 'шт')
+LOADGEN_PREFIX = 'loadgen'
+MAX_RECIPE_INGREDIENTS = 30
+
+
+class PowerLawSampler:
+    """
+    Выборка элементов с вероятностью, убывающей по степенному закону
+    от ранга элемента: вес элемента ранга r равен 1 / r ** exponent.
+    Ранги назначаются элементам в случайном порядке.
+    """
+    def __init__(self, population, exponent, rnd):
+        """Инициализация выборки из population."""
+        self.population = list(population)
+        rnd.shuffle(self.population)
+        self.rnd = rnd
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent
+            for rank in range(1, len(self.population) + 1)
+        ))
+
+    def choice(self):
+        """Возвращает один элемент."""
+        return self.rnd.choices(
+            self.population, cum_weights=self.cum_weights
+        )[0]
+
+    def sample(self, amount, exclude=None):
+        """Возвращает до amount различных элементов, кроме exclude."""
+        available = len(self.population) - (exclude is not None)
+        amount = min(amount, available)
+        result = set()
+        attempts = 0
+        while len(result) < amount and attempts < amount * 20:
+            attempts += 1
+            item = self.choice()
+            if item != exclude:
+                result.add(item)
+        return sorted(result)
+
+
+def _get_random(seed, stage):
+    """Возвращает генератор случайных чисел этапа генерации."""
+    return random.Random(f'{seed}:{stage}')
+
+
+def _get_amount(rnd, mean, limit):
+    """
+    Возвращает случайное количество связей со средним mean,
+    распределенное экспоненциально и ограниченное limit.
+    """
+    if mean <= 0:
+        return 0
+    return min(int(rnd.expovariate(1 / mean)), limit)
+
+
+def _get_tag_color(prefix, number):
+    """
+    Возвращает цвет тега number набора данных prefix, различный
+    для наборов с разными префиксами.
+    """
+    return f'#{(zlib.crc32(prefix.encode()) + number) & 0xFFFFFF:06X}'
+
+
+def _bulk_insert(model, objs, batch_size, progress=None):
+    """
+    Потоковое массовое создание записей: объекты objs создаются
+    пакетами размера batch_size, каждый пакет в отдельной транзакции.
+    Возвращает количество созданных записей.
+    """
+    total = 0
+    iterator = iter(objs)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            break
+        with transaction.atomic():
+            bulk_create_batched(model, batch, batch_size)
+        total += len(batch)
+        if progress is not None:
+            progress(model._meta.verbose_name_plural, total)
+    return total
+
+
+def _analyze(models):
+    """Обновление статистики планировщика PostgreSQL для таблиц models."""
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for model in models:
+            cursor.execute(
+                f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}'
+            )
+
+
+def _raw_delete(queryset):
+    """Удаление записей выборки одним запросом без сигналов и каскада."""
+    return queryset._raw_delete(queryset.db)
+
+
+def _delete_user_relations(users):
+    """
+    Удаление записей всех моделей, ссылающихся на пользователей
+    выборки users (токены, подписки, избранное, права и т.д.),
+    запросами без выборки записей.
+    """
+    for model in apps.get_models(include_auto_created=True):
+        if model._meta.proxy:
+            continue
+        for field in model._meta.concrete_fields:
+            if field.is_relation and field.related_model is User:
+                _raw_delete(
+                    model._base_manager.filter(**{f'{field.name}__in': users})
+                )
+
+
+def refresh_dataset_counters(user_ids, recipe_ids):
+    """
+    Пересчет счетчиков пользователей user_ids и рецептов recipe_ids
+    после массового создания записей без сигналов.
+    """
+    for counter in COUNTERS:
+        refresh_counters(
+            counter, recipe_ids if counter.model is Recipe else user_ids
+        )
+
+
+def get_dataset_email(prefix, number):
+    """
+    Возвращает адрес электронной почты пользователя набора данных
+    в зарезервированном домене .invalid, который не может
+    принадлежать реальному пользователю.
+    """
+    return f'{prefix}{number}@{prefix}.{DATASET_EMAIL_DOMAIN}'
+
+
+def get_dataset_users(prefix):
+    """Возвращает выборку пользователей набора данных с префиксом prefix."""
+    return User.objects.filter(
+        email__endswith=f'@{prefix}.{DATASET_EMAIL_DOMAIN}'
+    )
+
+
+def delete_dataset(prefix=LOADGEN_PREFIX):
+    """
+    Удаляет записи, созданные generate_dataset с префиксом prefix:
+    пользователей с адресами в домене набора данных и их рецепты.
+    Связи, рецепты и пользователи удаляются запросами без выборки
+    записей, каскадного сбора связанных объектов и сигналов (обработчики
+    m2m_changed и удаления пользователей отключают быстрое удаление),
+    поэтому удаление не загружает в память миллионы записей.
+    Счетчики записей вне набора от него не зависят.
+    """
+    with transaction.atomic():
+        users = get_dataset_users(prefix)
+        recipes = Recipe.objects.filter(author__in=users)
+        for model in (RecipeIngredient, Recipe.tags.through):
+            model.objects.filter(recipe__in=recipes).delete()
+        for through in (
+            Recipe.favorites.through, Recipe.shopping_carts.through
+        ):
+            _raw_delete(through.objects.filter(recipe__in=recipes))
+        _raw_delete(RecipeScore.objects.filter(recipe__in=recipes))
+        _raw_delete(recipes)
+        _delete_user_relations(users)
+        _raw_delete(users)
+        Tag.objects.filter(slug__startswith=prefix).delete()
+        Ingredient.objects.filter(name__startswith=f'{prefix} ').delete()
+    bump_count_version(Recipe)
+
+
+def create_dataset(users, recipes, ingredients, tags, follows, favorites,
+                   carts, ingredients_mean, exponent, seed, batch_size,
+                   prefix, progress=None):
+    """
+    Создает детерминированный синтетический набор данных с префиксом
+    prefix: популярность авторов, рецептов и ингредиентов подчиняется
+    степенному закону с показателем exponent (при нуле - равномерна),
+    число подписок, избранного и покупок пользователя распределено
+    экспоненциально со средними follows, favorites и carts, а число
+    ингредиентов рецепта - нормально со средним ingredients_mean.
+    Записи создаются потоково пакетами batch_size, поэтому объем
+    памяти определяется количеством пользователей и рецептов,
+    а не количеством связей. Возвращает словарь с первичными ключами
+    созданных записей и словарь с их количеством по моделям.
+    """
+    counts = {}
+    password = make_password(DATASET_PASSWORD)
+    counts['users'] = _bulk_insert(
+        User,
+        (
+            User(
+                username=f'{prefix}{number}',
+                email=get_dataset_email(prefix, number),
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password,
+            )
+            for number in range(users)
+        ),
+        batch_size, progress
+    )
+    user_ids = list(
+        get_dataset_users(prefix).order_by('pk').values_list('pk', flat=True)
+    )
+    counts['tags'] = _bulk_insert(
+        Tag,
+        (
+            Tag(
+                name=f'{prefix} {number}',
+                color=_get_tag_color(prefix, number),
+                slug=f'{prefix}{number}',
+            )
+            for number in range(tags)
+        ),
+        batch_size, progress
+    )
+    tag_ids = list(
+        Tag.objects.filter(slug__startswith=prefix).values_list(
+            'pk', flat=True
+        )
+    )
+    counts['ingredients'] = _bulk_insert(
+        Ingredient,
+        (
+            Ingredient(
+                name=f'{prefix} {number}',
+                measurement_unit=MEASUREMENT_UNITS[
+                    number % len(MEASUREMENT_UNITS)
+                ],
+            )
+            for number in range(ingredients)
+        ),
+        batch_size, progress
+    )
+    ingredient_ids = list(
+        Ingredient.objects.filter(name__startswith=f'{prefix} ').order_by(
+            'pk'
+        ).values_list('pk', flat=True)
+    )
+    rnd = _get_random(seed, 'recipes')
+    authors = PowerLawSampler(user_ids, exponent, rnd)
+    now = timezone.now()
+    counts['recipes'] = _bulk_insert(
+        Recipe,
+        (
+            Recipe(
+                name=f'{prefix} рецепт {number}',
+                pub_date=now - timedelta(seconds=rnd.randint(0, 3 * 10 ** 7)),
+                image=DATASET_IMAGE,
+                text=f'Текст рецепта {number}',
+                cooking_time=rnd.randint(1, 180),
+                author_id=authors.choice(),
+            )
+            for number in range(recipes)
+        ),
+        batch_size, progress
+    )
+    recipe_ids = list(
+        Recipe.objects.filter(
+            author__in=get_dataset_users(prefix)
+        ).order_by('pk').values_list('pk', flat=True)
+    )
+    rnd = _get_random(seed, 'ingredients')
+    popular_ingredients = PowerLawSampler(ingredient_ids, exponent, rnd)
+    counts['recipe ingredients'] = _bulk_insert(
+        RecipeIngredient,
+        (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rnd.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in popular_ingredients.sample(
+                max(1, min(
+                    MAX_RECIPE_INGREDIENTS,
+                    round(rnd.gauss(ingredients_mean, ingredients_mean / 3))
+                ))
+            )
+        ),
+        batch_size, progress
+    )
+    rnd = _get_random(seed, 'tags')
+    counts['recipe tags'] = _bulk_insert(
+        Recipe.tags.through,
+        (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rnd.sample(
+                tag_ids, rnd.randint(1, min(3, len(tag_ids)))
+            )
+        ),
+        batch_size, progress
+    )
+    rnd = _get_random(seed, 'follows')
+    popular_authors = PowerLawSampler(user_ids, exponent, rnd)
+    counts['subscriptions'] = _bulk_insert(
+        Subscriber,
+        (
+            Subscriber(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in popular_authors.sample(
+                _get_amount(rnd, follows, len(user_ids) - 1),
+                exclude=user_id
+            )
+        ),
+        batch_size, progress
+    )
+    rnd = _get_random(seed, 'favorites')
+    popular_recipes = PowerLawSampler(recipe_ids, exponent, rnd)
+    for name, through, mean in (
+        ('favorites', Recipe.favorites.through, favorites),
+        ('shopping carts', Recipe.shopping_carts.through, carts),
+    ):
+        counts[name] = _bulk_insert(
+            through,
+            (
+                through(customuser_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in popular_recipes.sample(
+                    _get_amount(rnd, mean, len(recipe_ids))
+                )
+            ),
+            batch_size, progress
+        )
+    refresh_dataset_counters(user_ids, recipe_ids)
+    ingredient_index.invalidate()
+    bump_catalogue_version(Tag)
+    bump_catalogue_version(Ingredient)
+    bump_count_version(Recipe)
+    _analyze((
+        User, Tag, Ingredient, Recipe, RecipeIngredient, Recipe.tags.through,
+        Subscriber, Recipe.favorites.through, Recipe.shopping_carts.through,
+    ))
+    ids = {
+        'users': user_ids,
+        'tags': tag_ids,
+        'ingredients': ingredient_ids,
+        'recipes': recipe_ids,
+    }
+    return ids, counts
+
+
+def generate_dataset(users=1000, recipes=10000, ingredients=2000, tags=10,
+                     follows=20, favorites=30, carts=5, ingredients_mean=8,
+                     exponent=1.1, seed=0, batch_size=5000,
+                     prefix=LOADGEN_PREFIX, progress=None):
+    """
+    Создает набор данных для нагрузочного тестирования
+    с распределениями, близкими к реальным (см. create_dataset).
+    Возвращает количество созданных записей по моделям.
+    """
+    return create_dataset(
+        users=users, recipes=recipes, ingredients=ingredients, tags=tags,
+        follows=follows, favorites=favorites, carts=carts,
+        ingredients_mean=ingredients_mean, exponent=exponent, seed=seed,
+        batch_size=batch_size, prefix=prefix, progress=progress
+    )[1]
+
+
+def seed_dataset(users=10, recipes=30, ingredients=50, tags=3,
+                 ingredients_per_recipe=5, subscriptions=20, favorites=30,
+                 carts=20, seed=0, batch_size=1000):
+    """
+    Создает небольшой набор данных для замеров API с равномерными
+    распределениями (см. create_dataset): subscriptions, favorites
+    и carts задают среднее общее количество связей.
+    Возвращает словарь с первичными ключами созданных записей.
+    """
+    users = max(users, 1)
+    return create_dataset(
+        users=users, recipes=recipes, ingredients=ingredients, tags=tags,
+        follows=subscriptions / users, favorites=favorites / users,
+        carts=carts / users, ingredients_mean=ingredients_per_recipe,
+        exponent=0, seed=seed, batch_size=batch_size, prefix=DATASET_PREFIX
+    )[0]
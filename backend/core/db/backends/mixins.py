@@ -0,0 +1,107 @@
+import logging
+import time
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionMetrics:
+    """
+    Статистика соединений с БД: количество новых и повторно
+    использованных соединений, закрытых проверкой работоспособности,
+    и суммарное и наибольшее время получения соединения в секундах.
+    """
+    def __init__(self):
+        """Инициализация нулевой статистики."""
+        self.connections = 0
+        self.reused = 0
+        self.health_check_failures = 0
+        self.acquire_time = 0.0
+        self.max_acquire_time = 0.0
+
+    def add_acquire_time(self, seconds):
+        """Учет времени получения соединения."""
+        self.acquire_time += seconds
+        self.max_acquire_time = max(self.max_acquire_time, seconds)
+
+    def as_dict(self):
+        """Возвращает статистику в виде словаря."""
+        return dict(vars(self))
+
+
+class PersistentConnectionMixin:
+    """
+    Примесь обертки соединения с БД для постоянных соединений
+    (CONN_MAX_AGE). При CONN_HEALTH_CHECKS в настройках БД соединение,
+    оставшееся от предыдущего запроса, проверяется при первом обращении
+    к БД в новом запросе и при неработоспособности заменяется новым.
+    Время получения соединения учитывается в статистике metrics.
+    """
+    def __init__(self, *args, **kwargs):
+        """Инициализация обертки соединения и статистики."""
+        super().__init__(*args, **kwargs)
+        self.health_check_enabled = self.settings_dict.get(
+            'CONN_HEALTH_CHECKS', False
+        )
+        self.health_check_done = False
+        self.metrics = ConnectionMetrics()
+
+    def connect(self):
+        """Открытие нового соединения с учетом времени подключения."""
+        self.health_check_done = True
+        started = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - started
+        self.metrics.connections += 1
+        self.metrics.add_acquire_time(elapsed)
+        logger.debug(
+            'New connection to database %r in %.2f ms',
+            self.alias, elapsed * 1000
+        )
+
+    def close_if_health_check_failed(self):
+        """
+        Закрывает повторно используемое соединение, если оно
+        не прошло проверку работоспособности.
+        """
+        if (self.connection is None or self.health_check_done
+                or self.in_atomic_block):
+            return
+        self.health_check_done = True
+        started = time.perf_counter()
+        usable = not self.health_check_enabled or self.is_usable()
+        self.metrics.add_acquire_time(time.perf_counter() - started)
+        if usable:
+            self.metrics.reused += 1
+            return
+        self.metrics.health_check_failures += 1
+        logger.warning(
+            'Closing unusable connection to database %r', self.alias
+        )
+        self.close()
+
+    def ensure_connection(self):
+        """Гарантирует наличие работоспособного соединения."""
+        self.close_if_health_check_failed()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        """
+        Закрывает устаревшее соединение в начале и конце запроса,
+        а оставшееся открытым отмечает для проверки работоспособности.
+        """
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+
+def get_connection_metrics():
+    """
+    Возвращает статистику соединений текущего потока
+    по псевдонимам БД с поддержкой статистики.
+    """
+    return {
+        connection.alias: connection.metrics.as_dict()
+        for connection in connections.all()
+        if isinstance(connection, PersistentConnectionMixin)
+    }
@@ -0,0 +1,10 @@
+from django.db.backends.postgresql import base
+
+from core.db.backends.mixins import PersistentConnectionMixin
+
+
+class DatabaseWrapper(PersistentConnectionMixin, base.DatabaseWrapper):
+    """
+    Бэкенд PostgreSQL с проверкой работоспособности постоянных
+    соединений и статистикой времени их получения.
+    """
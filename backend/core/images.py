@@ -0,0 +1,294 @@
+import base64
+import logging
+import mimetypes
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+THREAD_BACKEND = 'thread'
+DB_BACKEND = 'db'
+
+THUMBNAIL = 'thumbnail'
+CARD = 'card'
+DETAIL = 'detail'
+
+RENDITION_FORMAT = 'WEBP'
+RENDITION_EXTENSION = 'webp'
+
+ORPHAN_MIN_AGE = 60 * 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_rendition_name(name, rendition):
+    """Возвращает имя файла уменьшенной копии rendition картинки name."""
+    root = os.path.splitext(name)[0]
+    return f'{root}.{rendition}.{RENDITION_EXTENSION}'
+
+
+def get_image_root(name):
+    """
+    Возвращает имя файла картинки или ее уменьшенной копии
+    без расширения и названия копии.
+    """
+    root, extension = os.path.splitext(name)
+    base, rendition = os.path.splitext(root)
+    if (
+        extension == f'.{RENDITION_EXTENSION}'
+        and rendition[1:] in settings.RECIPE_IMAGE_RENDITIONS
+    ):
+        return base
+    return root
+
+
+def get_image_url(recipe, rendition=None):
+    """
+    Возвращает URL уменьшенной копии rendition картинки рецепта,
+    а если копия не задана или еще не создана - URL оригинала.
+    """
+    if rendition is None or not recipe.renditions_ready:
+        return recipe.image.url
+    return recipe.image.storage.url(
+        get_rendition_name(recipe.image.name, rendition)
+    )
+
+
+def get_image_data_uri(recipe, rendition=None):
+    """
+    Возвращает уменьшенную копию rendition картинки рецепта,
+    а если копия не задана или еще не создана - оригинал, в виде
+    data URI с содержимым в base64.
+    """
+    name = recipe.image.name
+    if rendition is not None and recipe.renditions_ready:
+        name = get_rendition_name(name, rendition)
+    with recipe.image.storage.open(name) as file:
+        content = base64.b64encode(file.read()).decode()
+    content_type = mimetypes.guess_type(name)[0] or 'image/png'
+    return f'data:{content_type};base64,{content}'
+
+
+def _open_image(file, size):
+    """
+    Открывает картинку для уменьшения до размера не больше size.
+    JPEG декодируется сразу в уменьшенном масштабе, поворот по EXIF
+    применяется к пикселям, палитра приводится к RGB или RGBA.
+    """
+    image = Image.open(file)
+    if image.format == 'JPEG':
+        image.draft('RGB', size)
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert(
+            'RGBA' if image.mode in ('LA', 'PA') or 'transparency'
+            in image.info else 'RGB'
+        )
+    return image
+
+
+def render_rendition(image, size, quality):
+    """Возвращает содержимое копии картинки image размера size в WebP."""
+    copy = image.copy()
+    copy.thumbnail(size, Image.LANCZOS)
+    buffer = BytesIO()
+    copy.save(buffer, RENDITION_FORMAT, quality=quality)
+    return buffer.getvalue()
+
+
+def renditions_exist(name, storage=default_storage):
+    """Проверка наличия всех уменьшенных копий картинки name."""
+    return all(
+        storage.exists(get_rendition_name(name, rendition))
+        for rendition in settings.RECIPE_IMAGE_RENDITIONS
+    )
+
+
+def create_renditions(name, storage=default_storage):
+    """
+    Создает уменьшенные копии RECIPE_IMAGE_RENDITIONS картинки name
+    в формате WebP. Картинка декодируется один раз, копии создаются
+    от большей к меньшей. Возвращает словарь имен файлов копий.
+    """
+    renditions = sorted(
+        settings.RECIPE_IMAGE_RENDITIONS.items(),
+        key=lambda item: item[1], reverse=True
+    )
+    names = {}
+    with storage.open(name) as file:
+        image = _open_image(file, renditions[0][1])
+        for rendition, size in renditions:
+            content = render_rendition(
+                image, size, settings.RECIPE_IMAGE_QUALITY
+            )
+            rendition_name = get_rendition_name(name, rendition)
+            storage.delete(rendition_name)
+            names[rendition] = storage.save(
+                rendition_name, ContentFile(content)
+            )
+    return names
+
+
+def process_recipe_image(recipe_id, rebuild=False):
+    """
+    Создает уменьшенные копии картинки рецепта recipe_id, если их нет
+    или задан rebuild, и отмечает их готовность, если картинка рецепта
+    за это время не изменилась. Возвращает True, если копии готовы.
+    """
+    name = Recipe.objects.filter(
+        pk=recipe_id
+    ).values_list('image', flat=True).first()
+    if not name:
+        return False
+    try:
+        if rebuild or not renditions_exist(name):
+            create_renditions(name)
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        logger.warning(
+            'Image renditions of recipe %s failed: %s', recipe_id, error
+        )
+        return False
+    return Recipe.objects.filter(
+        pk=recipe_id, image=name
+    ).update(renditions_ready=True) == 1
+
+
+def _get_executor():
+    """Возвращает пул потоков обработки картинок текущего процесса."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='image'
+            )
+        return _executor
+
+
+def _process_in_thread(recipe_id):
+    """Обработка картинки в пуле потоков с закрытием соединений с БД."""
+    try:
+        process_recipe_image(recipe_id)
+    finally:
+        connections.close_all()
+
+
+def set_recipe_image(recipe, content, previous_name=None):
+    """
+    Сохраняет картинку content рецепта recipe в хранилище без сохранения
+    рецепта. Если имя файла отличается от previous_name (по умолчанию
+    текущего), признак готовности копий обновляется, а при отсутствии
+    копий их создание ставится в очередь. В хранилище с адресацией
+    по содержимому неизмененная картинка не перезаписывается и сохраняет
+    созданные копии.
+    """
+    if previous_name is None:
+        previous_name = recipe.image.name
+    recipe.image.save(content.name, content, save=False)
+    if recipe.image.name != previous_name:
+        recipe.renditions_ready = renditions_exist(recipe.image.name)
+        if not recipe.renditions_ready:
+            schedule_renditions(recipe)
+
+
+def schedule_renditions(recipe):
+    """
+    Ставит в очередь создание уменьшенных копий картинки рецепта.
+    При бэкенде RECIPE_IMAGE_BACKEND 'thread' копии создаются в пуле
+    потоков текущего процесса после фиксации транзакции (Pillow
+    освобождает GIL при масштабировании и кодировании), при бэкенде
+    'db' - командой run_image_worker.
+    """
+    if settings.RECIPE_IMAGE_BACKEND == THREAD_BACKEND:
+        transaction.on_commit(
+            lambda: _get_executor().submit(_process_in_thread, recipe.pk)
+        )
+
+
+def process_pending_images(limit=None, after=0, rebuild=False):
+    """
+    Создает уменьшенные копии картинок рецептов с первичным ключом
+    больше after, для которых они еще не созданы. Возвращает количество
+    созданных копий и последний просмотренный первичный ключ, начиная
+    с которого продолжается обработка, чтобы картинки с ошибками
+    не задерживали остальные. При rebuild существующие копии
+    создаются заново.
+    """
+    recipe_ids = list(
+        Recipe.objects.filter(renditions_ready=False, pk__gt=after).exclude(
+            image=''
+        ).order_by('pk').values_list('pk', flat=True)[:limit]
+    )
+    processed = sum(
+        process_recipe_image(recipe_id, rebuild) for recipe_id in recipe_ids
+    )
+    return processed, recipe_ids[-1] if recipe_ids else None
+
+
+def _iter_files(storage, path):
+    """Возвращает имена всех файлов каталога path хранилища storage."""
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from _iter_files(storage, posixpath.join(path, directory))
+
+
+def delete_orphan_images(min_age=ORPHAN_MIN_AGE, dry_run=False):
+    """
+    Удаляет файлы картинок рецептов и их уменьшенных копий, на которые
+    не ссылается ни один рецепт. Количество ссылок на каждый файл
+    определяется одним запросом по рецептам. Файлы, измененные меньше
+    min_age секунд назад (в том числе при повторном сохранении того же
+    содержимого), не удаляются вместе с копиями той же картинки,
+    так как могут принадлежать рецептам незавершенных транзакций.
+    Возвращает словарь с количеством используемых файлов, из них общих
+    для нескольких рецептов, удаленных файлов и их размером в байтах.
+    """
+    field = Recipe._meta.get_field('image')
+    storage = field.storage
+    directory = field.upload_to.rstrip('/')
+    stats = {'referenced': 0, 'shared': 0, 'deleted': 0, 'size': 0}
+    roots = set()
+    references = Recipe.objects.exclude(image='').values(
+        'image'
+    ).annotate(references=Count('pk')).order_by()
+    for reference in references.iterator():
+        roots.add(get_image_root(reference['image']))
+        stats['referenced'] += 1
+        stats['shared'] += reference['references'] > 1
+    if not storage.exists(directory):
+        return stats
+    threshold = timezone.now() - timedelta(seconds=min_age)
+    orphans = []
+    for name in _iter_files(storage, directory):
+        root = get_image_root(name)
+        if root in roots:
+            continue
+        if storage.get_modified_time(name) > threshold:
+            roots.add(root)
+            continue
+        orphans.append(name)
+    for name in orphans:
+        if get_image_root(name) in roots:
+            continue
+        stats['deleted'] += 1
+        stats['size'] += storage.size(name)
+        if not dry_run:
+            storage.delete(name)
+    return stats
@@ -0,0 +1,261 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from core.utils import bulk_create_batched
+
+JSON_FORMAT = 'json'
+NDJSON_FORMAT = 'ndjson'
+CSV_FORMAT = 'csv'
+FORMATS = (JSON_FORMAT, NDJSON_FORMAT, CSV_FORMAT)
+FORMAT_EXTENSIONS = {
+    '.json': JSON_FORMAT,
+    '.ndjson': NDJSON_FORMAT,
+    '.jsonl': NDJSON_FORMAT,
+    '.csv': CSV_FORMAT,
+}
+
+CONFLICTS_ERROR = 'error'
+CONFLICTS_IGNORE = 'ignore'
+CONFLICTS_UPDATE = 'update'
+CONFLICTS = (CONFLICTS_ERROR, CONFLICTS_IGNORE, CONFLICTS_UPDATE)
+
+READ_CHUNK_SIZE = 64 * 1024
+LOOKUP_BATCH_SIZE = 200
+
+
+class DataImportError(ValueError):
+    """Ошибка формата или содержимого импортируемых данных."""
+
+
+def _skip_separators(buffer, position, in_array):
+    """Возвращает позицию первого символа после разделителей записей."""
+    while position < len(buffer) and (
+        buffer[position].isspace() or in_array and buffer[position] == ','
+    ):
+        position += 1
+    return position
+
+
+def iter_json(file, chunk_size=READ_CHUNK_SIZE):
+    """
+    Последовательно разбирает объекты json из файла file, читая его
+    частями размера chunk_size. Поддерживается массив объектов
+    и последовательность объектов, разделенных пробельными символами
+    (NDJSON).
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    chunk = None
+    while not buffer and chunk != '':
+        chunk = file.read(chunk_size)
+        buffer = chunk.lstrip()
+    in_array = buffer.startswith('[')
+    position = int(in_array)
+    while True:
+        position = _skip_separators(buffer, position, in_array)
+        if in_array and buffer[position:position + 1] == ']':
+            return
+        try:
+            record, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as error:
+            chunk = file.read(chunk_size)
+            if chunk:
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            if position >= len(buffer) and not in_array:
+                return
+            raise DataImportError(str(error))
+        if not isinstance(record, dict):
+            raise DataImportError(_('Records must be json objects'))
+        yield record
+        if position > chunk_size:
+            buffer, position = buffer[position:], 0
+
+
+def iter_csv(file):
+    """Последовательно разбирает записи csv файла с заголовком."""
+    return csv.DictReader(file)
+
+
+def get_format(path, file_format=None):
+    """Возвращает формат файла path по расширению, если он не задан."""
+    if file_format:
+        return file_format
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMAT_EXTENSIONS:
+        raise DataImportError(
+            _('Unable to detect format of file {path}').format(path=path)
+        )
+    return FORMAT_EXTENSIONS[extension]
+
+
+def iter_records(file, file_format):
+    """Возвращает итератор записей файла file в формате file_format."""
+    if file_format == CSV_FORMAT:
+        return iter_csv(file)
+    return iter_json(file)
+
+
+def batched(iterable, size):
+    """Разбивает итерируемый объект на списки не длиннее size."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def build_object(model, record):
+    """
+    Создает экземпляр модели model по записи record. Ключами записи
+    могут быть имена полей или их атрибутов (recipe или recipe_id).
+    Значения приводятся к типам полей, пустые строки полей,
+    допускающих null, заменяются на None.
+    Возвращает экземпляр и множество имен атрибутов заданных полей.
+    """
+    values = {}
+    for name, value in record.items():
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise DataImportError(
+                _('Unknown field {field} of model {model}').format(
+                    field=name, model=model.__name__
+                )
+            )
+        if not field.concrete or field.many_to_many:
+            raise DataImportError(
+                _('Field {field} of model {model} can not be imported').format(
+                    field=name, model=model.__name__
+                )
+            )
+        if value == '' and field.null:
+            value = None
+        elif value is not None:
+            try:
+                value = field.to_python(value)
+            except ValidationError as error:
+                raise DataImportError(f'{name}: {"; ".join(error.messages)}')
+        values[field.attname] = value
+    return model(**values), set(values)
+
+
+def get_conflict_fields(model):
+    """
+    Возвращает имена атрибутов полей, определяющих совпадение записей
+    при обновлении: поля первого ограничения уникальности модели
+    или первого уникального поля, иначе первичный ключ.
+    """
+    opts = model._meta
+    for constraint in opts.constraints:
+        if getattr(constraint, 'fields', None):
+            return [opts.get_field(name).attname for name in constraint.fields]
+    for fields in opts.unique_together:
+        return [opts.get_field(name).attname for name in fields]
+    for field in opts.concrete_fields:
+        if field.unique and not field.primary_key:
+            return [field.attname]
+    return [opts.pk.attname]
+
+
+def _get_key(obj, fields):
+    """Возвращает значения полей fields объекта obj."""
+    return tuple(getattr(obj, name) for name in fields)
+
+
+def bulk_update_or_create(model, objs, fields, batch_size):
+    """
+    Обновляет записи, совпадающие с объектами objs по ключевым полям,
+    и создает остальные. Обновляются только поля fields.
+    """
+    key_fields = get_conflict_fields(model)
+    unique = {}
+    to_create = []
+    for obj in objs:
+        key = _get_key(obj, key_fields)
+        if None in key:
+            to_create.append(obj)
+        else:
+            unique[key] = obj
+    existing = {}
+    for keys in batched(unique, LOOKUP_BATCH_SIZE):
+        condition = Q()
+        for key in keys:
+            condition |= Q(**dict(zip(key_fields, key)))
+        existing.update(
+            (_get_key(obj, key_fields), obj.pk)
+            for obj in model.objects.filter(condition).only(
+                'pk', *key_fields
+            )
+        )
+    to_update = []
+    for key, obj in unique.items():
+        if key in existing:
+            obj.pk = existing[key]
+            to_update.append(obj)
+        else:
+            to_create.append(obj)
+    update_fields = [
+        model._meta.get_field(name).name for name in fields
+        if name not in key_fields and name != model._meta.pk.attname
+    ]
+    if to_update and update_fields:
+        model.objects.bulk_update(to_update, update_fields, batch_size)
+    bulk_create_batched(model, to_create, batch_size)
+
+
+def import_batch(model, records, conflicts=CONFLICTS_ERROR, batch_size=None):
+    """
+    Импортирует записи records в модель model в одной транзакции.
+    При conflicts 'error' нарушение уникальности приводит к ошибке,
+    при 'ignore' совпадающие записи пропускаются, при 'update'
+    обновляются заданные в записях поля совпадающих записей.
+    """
+    objs = []
+    fields = set()
+    for record in records:
+        obj, record_fields = build_object(model, record)
+        objs.append(obj)
+        fields |= record_fields
+    with transaction.atomic():
+        if conflicts == CONFLICTS_UPDATE:
+            bulk_update_or_create(model, objs, fields, batch_size)
+        else:
+            bulk_create_batched(
+                model, objs, batch_size,
+                ignore_conflicts=conflicts == CONFLICTS_IGNORE
+            )
+    return len(objs)
+
+
+def import_records(model, records, batch_size=1000,
+                   conflicts=CONFLICTS_ERROR, progress=None):
+    """
+    Импортирует записи records в модель model пакетами размера
+    batch_size, каждый пакет в отдельной транзакции. После каждого
+    пакета вызывается progress(количество записей, время в секундах).
+    Возвращает количество обработанных записей и время импорта.
+    """
+    started = time.perf_counter()
+    total = 0
+    for batch in batched(records, batch_size):
+        try:
+            total += import_batch(model, batch, conflicts, batch_size)
+        except (DataImportError, IntegrityError) as error:
+            raise DataImportError(
+                _('Batch starting at record {number}: {error}').format(
+                    number=total + 1, error=error
+                )
+            )
+        if progress is not None:
+            progress(total, time.perf_counter() - started)
+    return total, time.perf_counter() - started
@@ -0,0 +1,404 @@
+import io
+import multiprocessing
+import os
+import time
+from collections import deque
+
+import django
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.utils.translation import gettext_lazy as _
+
+from core.importers import (CONFLICTS_ERROR, CONFLICTS_IGNORE,
+                            CONFLICTS_UPDATE, NDJSON_FORMAT, DataImportError,
+                            batched, build_object, bulk_update_or_create,
+                            get_conflict_fields, iter_json, iter_records)
+from core.utils import bulk_create_batched
+
+PARTITION_SIZE = 4 * 1024 * 1024
+STAGING_TABLE = 'import_staging'
+
+_converter = None
+
+
+def _get_natural_keys():
+    """
+    Возвращает функции естественных ключей моделей, на которые
+    ссылаются импортируемые записи: slug тега, имя пользователя
+    и строковое представление ингредиента «имя (единица)».
+    """
+    return {
+        'recipes.tag': ('slug', lambda slug: slug),
+        'recipes.ingredient': (
+            ('name', 'measurement_unit'),
+            lambda name, unit: f'{name} ({unit})'
+        ),
+        get_user_model()._meta.label_lower: (
+            'username', lambda username: username
+        ),
+    }
+
+
+def build_lookups(model):
+    """
+    Формирует таблицы соответствия естественных ключей первичным
+    ключам для внешних ключей модели model на теги, ингредиенты
+    и пользователей. Таблицы загружаются из БД одним запросом
+    на модель и передаются процессам разбора записей.
+    """
+    natural_keys = _get_natural_keys()
+    lookups = {}
+    for field in model._meta.concrete_fields:
+        if not field.is_relation:
+            continue
+        related = field.related_model
+        label = related._meta.label_lower
+        if label not in natural_keys:
+            continue
+        fields, make_key = natural_keys[label]
+        fields = (fields,) if isinstance(fields, str) else fields
+        keys = {
+            make_key(*values): pk
+            for pk, *values in related.objects.values_list('pk', *fields)
+        }
+        lookups[field.name] = (keys, set(keys.values()))
+    return lookups
+
+
+class RowConverter:
+    """
+    Преобразование записей в строки таблицы модели с проверкой
+    значений полей. Внешние ключи на теги, ингредиенты и пользователей
+    задаются первичным или естественным ключом и проверяются
+    по таблицам соответствия. Для COPY строки сразу кодируются
+    в текстовый формат PostgreSQL.
+    """
+    def __init__(self, model, lookups, copy):
+        """Инициализация преобразования для модели model."""
+        self.model = model
+        self.lookups = lookups
+        self.copy = copy
+        self.pk = model._meta.pk
+        self.fields = [
+            field for field in model._meta.concrete_fields
+            if field is not self.pk
+        ]
+        self.validated = [
+            field for field in self.fields if not field.is_relation
+        ]
+
+    def _resolve(self, record):
+        """Замена естественных ключей записи первичными ключами."""
+        record = dict(record)
+        for name, (keys, pks) in self.lookups.items():
+            attname = self.model._meta.get_field(name).attname
+            key = name if name in record else attname
+            value = record.get(key)
+            if value is None or value == '':
+                continue
+            if isinstance(value, (list, tuple)) and len(value) == 2:
+                value = f'{value[0]} ({value[1]})'
+            if isinstance(value, str) and value in keys:
+                record[key] = keys[value]
+            elif str(value).isdigit() and int(value) in pks:
+                record[key] = int(value)
+            else:
+                raise DataImportError(
+                    _('Unknown {field} {value}').format(
+                        field=name, value=value
+                    )
+                )
+        return record
+
+    def _validate(self, obj):
+        """
+        Проверка ограничений БД на значения полей объекта obj:
+        допустимость пустых значений, варианты и длина строк.
+        Валидаторы полей не применяются, так как при импорте
+        загружаются и данные, созданные до их введения.
+        """
+        errors = []
+        for field in self.validated:
+            value = getattr(obj, field.attname)
+            try:
+                field.validate(value, obj)
+                if (field.max_length and value is not None
+                        and len(str(value)) > field.max_length):
+                    raise ValidationError(
+                        _('Ensure this value has at most {max_length} '
+                          'characters').format(max_length=field.max_length)
+                    )
+            except ValidationError as error:
+                errors.extend(
+                    f'{field.name}: {message}' for message in error.messages
+                )
+        if errors:
+            raise ValidationError(errors)
+
+    def _encode(self, value):
+        """Возвращает значение в текстовом формате COPY."""
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        return str(value).replace('\\', '\\\\').replace(
+            '\t', '\\t'
+        ).replace('\n', '\\n').replace('\r', '\\r')
+
+    def convert(self, records, offset=0):
+        """
+        Преобразует записи records, нумерация которых начинается
+        с offset + 1. Возвращает список групп строк с одинаковым
+        набором столбцов: (атрибуты полей, строки, количество строк).
+        """
+        groups = {}
+        for number, record in enumerate(records, offset + 1):
+            try:
+                obj, fields = build_object(self.model, self._resolve(record))
+                self._validate(obj)
+            except ValidationError as error:
+                raise DataImportError(
+                    _('Record {number}: {error}').format(
+                        number=number, error='; '.join(error.messages)
+                    )
+                )
+            except DataImportError as error:
+                raise DataImportError(
+                    _('Record {number}: {error}').format(
+                        number=number, error=error
+                    )
+                )
+            fields = (
+                [self.pk, *self.fields] if self.pk.attname in fields
+                else self.fields
+            )
+            values = [
+                field.get_prep_value(getattr(obj, field.attname))
+                for field in fields
+            ]
+            groups.setdefault(
+                tuple(field.attname for field in fields), []
+            ).append(values)
+        return [
+            (columns, self._to_copy(rows) if self.copy else rows, len(rows))
+            for columns, rows in groups.items()
+        ]
+
+    def _to_copy(self, rows):
+        """Возвращает строки в текстовом формате COPY."""
+        return ''.join(
+            '\t'.join(self._encode(value) for value in row) + '\n'
+            for row in rows
+        )
+
+
+def _init_worker(label, lookups, copy):
+    """Инициализация процесса разбора записей."""
+    global _converter
+    if not apps.ready:
+        django.setup()
+    _converter = RowConverter(apps.get_model(label), lookups, copy)
+
+
+def _convert_records(records, offset):
+    """Преобразование пакета записей в процессе разбора."""
+    return _converter.convert(records, offset)
+
+
+def _convert_partition(path, start, end):
+    """
+    Разбор и преобразование строк NDJSON файла path, начинающихся
+    в диапазоне байтов [start, end).
+    """
+    with open(path, 'rb') as file:
+        if start:
+            file.seek(start - 1)
+            file.readline()
+        lines = []
+        while file.tell() < end:
+            line = file.readline()
+            if not line:
+                break
+            lines.append(line.decode('utf-8'))
+    try:
+        return _converter.convert(iter_json(io.StringIO(''.join(lines))))
+    except DataImportError as error:
+        raise DataImportError(
+            _('Bytes {start}-{end}: {error}').format(
+                start=start, end=end, error=error
+            )
+        )
+
+
+def partition_file(path, size=PARTITION_SIZE):
+    """Разбивает файл path на диапазоны байтов размера size."""
+    total = os.path.getsize(path)
+    return [
+        (start, min(start + size, total)) for start in range(0, total, size)
+    ]
+
+
+class ParallelLoader:
+    """
+    Загрузчик больших файлов данных в модель. Записи разбираются
+    и проверяются в пуле процессов, NDJSON файлы разбиваются
+    на диапазоны байтов, которые процессы читают самостоятельно.
+    Строки записываются в PostgreSQL командой COPY FROM STDIN,
+    для остальных БД используется bulk_create. Каждая часть
+    записывается в отдельной транзакции.
+    """
+    def __init__(self, model, workers=None, batch_size=1000,
+                 conflicts=CONFLICTS_ERROR, partition_size=PARTITION_SIZE):
+        """Инициализация загрузчика модели model."""
+        self.model = model
+        self.workers = workers or os.cpu_count()
+        self.batch_size = batch_size
+        self.conflicts = conflicts
+        self.partition_size = partition_size
+        self.copy = connection.vendor == 'postgresql'
+
+    def _get_tasks(self, path, file_format):
+        """Возвращает задания разбора частей файла."""
+        if file_format == NDJSON_FORMAT:
+            for start, end in partition_file(path, self.partition_size):
+                yield _convert_partition, (path, start, end)
+            return
+        with open(path, 'r', encoding='utf-8', newline='') as file:
+            offset = 0
+            for batch in batched(
+                iter_records(file, file_format), self.batch_size
+            ):
+                yield _convert_records, (batch, offset)
+                offset += len(batch)
+
+    def _run(self, tasks, lookups):
+        """
+        Выполняет задания и возвращает их результаты по порядку.
+        Одновременно в работе не более двух заданий на процесс,
+        поэтому файл не читается в память целиком.
+        """
+        label = self.model._meta.label_lower
+        if self.workers == 1:
+            _init_worker(label, lookups, self.copy)
+            for func, args in tasks:
+                yield func(*args)
+            return
+        connections.close_all()
+        with multiprocessing.get_context().Pool(
+            self.workers, _init_worker, (label, lookups, self.copy)
+        ) as pool:
+            pending = deque()
+            for func, args in tasks:
+                pending.append(pool.apply_async(func, args))
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+
+    def _get_column(self, attname):
+        """Возвращает экранированное имя столбца поля attname."""
+        return connection.ops.quote_name(
+            self.model._meta.get_field(attname).column
+        )
+
+    def _copy(self, cursor, table, columns, payload):
+        """Запись строк в таблицу командой COPY FROM STDIN."""
+        with connection.wrap_database_errors:
+            cursor.copy_expert(
+                f'COPY {table} ({", ".join(columns)}) FROM STDIN',
+                io.StringIO(payload)
+            )
+
+    def _write_copy(self, attnames, payload):
+        """
+        Запись строк в PostgreSQL. При обработке совпадающих записей
+        строки загружаются во временную таблицу и переносятся запросом
+        INSERT ... ON CONFLICT.
+        """
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        columns = [self._get_column(attname) for attname in attnames]
+        with connection.cursor() as cursor:
+            if self.conflicts == CONFLICTS_ERROR:
+                self._copy(cursor, table, columns, payload)
+                return
+            cursor.execute(f'DROP TABLE IF EXISTS {STAGING_TABLE}')
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {STAGING_TABLE} '
+                f'(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP'
+            )
+            self._copy(cursor, STAGING_TABLE, columns, payload)
+            select = f'SELECT {", ".join(columns)} FROM {STAGING_TABLE}'
+            conflict = 'ON CONFLICT DO NOTHING'
+            if self.conflicts == CONFLICTS_UPDATE:
+                keys = get_conflict_fields(self.model)
+                if not set(keys) <= set(attnames):
+                    raise DataImportError(
+                        _('Fields {fields} are required to update '
+                          'records').format(fields=', '.join(keys))
+                    )
+                key_columns = ', '.join(map(self._get_column, keys))
+                updates = ', '.join(
+                    f'{column} = EXCLUDED.{column}'
+                    for attname, column in zip(attnames, columns)
+                    if attname not in keys
+                )
+                select = select.replace(
+                    'SELECT', f'SELECT DISTINCT ON ({key_columns})', 1
+                )
+                conflict = (
+                    f'ON CONFLICT ({key_columns}) DO UPDATE SET {updates}'
+                    if updates else conflict
+                )
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(columns)}) '
+                f'{select} {conflict}'
+            )
+
+    def _write_objects(self, attnames, rows):
+        """Запись строк средствами ORM."""
+        objs = [self.model(**dict(zip(attnames, row))) for row in rows]
+        if self.conflicts == CONFLICTS_UPDATE:
+            bulk_update_or_create(self.model, objs, attnames, self.batch_size)
+            return
+        bulk_create_batched(
+            self.model, objs, self.batch_size,
+            ignore_conflicts=self.conflicts == CONFLICTS_IGNORE
+        )
+
+    def _reset_sequences(self):
+        """Синхронизация последовательностей первичных ключей."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [self.model]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def load(self, path, file_format, progress=None):
+        """
+        Загружает записи файла path в формате file_format. После записи
+        каждой части вызывается progress(количество записей, время).
+        Возвращает количество записей и время загрузки.
+        """
+        started = time.perf_counter()
+        lookups = build_lookups(self.model)
+        total = 0
+        pk_loaded = False
+        tasks = self._get_tasks(path, file_format)
+        for groups in self._run(tasks, lookups):
+            with transaction.atomic():
+                for attnames, payload, count in groups:
+                    if self.copy:
+                        self._write_copy(attnames, payload)
+                    else:
+                        self._write_objects(attnames, payload)
+                    pk_loaded |= self.model._meta.pk.attname in attnames
+                    total += count
+            if progress is not None:
+                progress(total, time.perf_counter() - started)
+        if pk_loaded:
+            self._reset_sequences()
+        return total, time.perf_counter() - started
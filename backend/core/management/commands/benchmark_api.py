@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from core.benchmark import (APIBenchmark, build_context, find_regressions,
+                            load_baseline, rollback, save_baseline)
+from core.datasets import seed_dataset
+
+RESULT_HEADER = (
+    f'{"endpoint":<28}{"status":>7}{"queries":>9}{"single":>8}'
+    f'{"time, ms":>11}{"size, KB":>11}{"memory, KB":>12}'
+)
+RESULT_ROW = (
+    '{name:<28}{status:>7}{queries:>9}{single:>8}'
+    '{time_ms:>11}{size_kb:>11}{memory_kb:>12}'
+)
+
+
+class Command(BaseCommand):
+    """
+    Команда замера количества запросов к БД, времени выполнения, размера
+    ответа и выделенной памяти для всех эндпоинтов API на синтетическом
+    наборе данных. Набор данных создается в транзакции, которая
+    откатывается после замеров.
+
+    Пример вызова:
+    python manage.py benchmark_api --recipes 1000 --page-size 50
+    """
+    help = (
+        'Measure queries, time and memory of every API endpoint '
+        'on a synthetic dataset.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--tags', type=int, default=5)
+        parser.add_argument('--subscriptions', type=int, default=100)
+        parser.add_argument('--favorites', type=int, default=200)
+        parser.add_argument('--carts', type=int, default=100)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--baseline', type=str, default=None)
+        parser.add_argument('--update-baseline', action='store_true')
+        parser.add_argument(
+            '--host', type=str, default=settings.ALLOWED_HOSTS[0]
+        )
+
+    def handle(self, *args, **kwargs):
+        baseline_kwargs = {}
+        if kwargs['baseline']:
+            baseline_kwargs['path'] = kwargs['baseline']
+        page_size = kwargs['page_size']
+        with rollback():
+            dataset = seed_dataset(
+                users=max(kwargs['users'], page_size + 2),
+                recipes=kwargs['recipes'],
+                ingredients=kwargs['ingredients'],
+                tags=kwargs['tags'],
+                subscriptions=kwargs['subscriptions'],
+                favorites=kwargs['favorites'],
+                carts=kwargs['carts'],
+                seed=kwargs['seed'],
+            )
+            benchmark = APIBenchmark(
+                build_context(dataset, page_size),
+                page_size=page_size,
+                HTTP_HOST=kwargs['host']
+            )
+            results = benchmark.run()
+        self.stdout.write(RESULT_HEADER)
+        for name, result in results.items():
+            self.stdout.write(
+                RESULT_ROW.format(
+                    name=name,
+                    single=result.get('queries_single', '-'),
+                    **result
+                )
+            )
+        if kwargs['update_baseline']:
+            baseline = save_baseline(results, **baseline_kwargs)
+            self.stdout.write(self.style.SUCCESS('Baseline updated'))
+        else:
+            baseline = load_baseline(**baseline_kwargs)
+        problems = find_regressions(results, baseline)
+        if problems:
+            raise CommandError(
+                'Performance regressions found:\n' + '\n'.join(problems)
+            )
+        self.stdout.write(self.style.SUCCESS('No regressions found'))
@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+
+from core.images import ORPHAN_MIN_AGE, delete_orphan_images
+
+
+class Command(BaseCommand):
+    """
+    Команда удаления файлов картинок рецептов и их уменьшенных копий,
+    на которые не ссылается ни один рецепт. Картинки хранятся
+    по хешу содержимого и могут быть общими для нескольких рецептов,
+    поэтому при изменении и удалении рецептов не удаляются.
+
+    Пример вызова:
+    python manage.py delete_orphan_images --min-age 3600 --dry-run
+    """
+    help = 'Delete recipe image files not referenced by any recipe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=ORPHAN_MIN_AGE)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **kwargs):
+        stats = delete_orphan_images(kwargs['min_age'], kwargs['dry_run'])
+        action = 'Would delete' if kwargs['dry_run'] else 'Deleted'
+        self.stdout.write(
+            f'Referenced images: {stats["referenced"]}, '
+            f'shared by several recipes: {stats["shared"]}. '
+            f'{action}: {stats["deleted"]} files, {stats["size"]} bytes'
+        )
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management import BaseCommand
+
+from core.datasets import LOADGEN_PREFIX, delete_dataset, generate_dataset
+
+
+class Command(BaseCommand):
+    """
+    Команда создания детерминированного набора данных для нагрузочного
+    тестирования: пользователей, подписок с популярностью авторов
+    по степенному закону, рецептов с ингредиентами и тегами, избранного
+    и списков покупок. Один и тот же --seed дает один и тот же набор.
+    Записи создаются пакетами, объем памяти не зависит от числа связей.
+
+    Пример вызова:
+    python manage.py generate_data --users 100000 --recipes 1000000
+    """
+    help = 'Generate a seeded synthetic dataset for capacity testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--follows', type=float, default=20)
+        parser.add_argument('--favorites', type=float, default=30)
+        parser.add_argument('--carts', type=float, default=5)
+        parser.add_argument('--ingredients-mean', type=float, default=8)
+        parser.add_argument('--exponent', type=float, default=1.1)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', type=str, default=LOADGEN_PREFIX)
+        parser.add_argument('--clear', action='store_true')
+
+    def handle(self, *args, **kwargs):
+        self.verbosity = kwargs['verbosity']
+        started = time.perf_counter()
+        if kwargs['clear']:
+            delete_dataset(kwargs['prefix'])
+        counts = generate_dataset(
+            users=kwargs['users'],
+            recipes=kwargs['recipes'],
+            ingredients=kwargs['ingredients'],
+            tags=kwargs['tags'],
+            follows=kwargs['follows'],
+            favorites=kwargs['favorites'],
+            carts=kwargs['carts'],
+            ingredients_mean=kwargs['ingredients_mean'],
+            exponent=kwargs['exponent'],
+            seed=kwargs['seed'],
+            batch_size=kwargs['batch_size'],
+            prefix=kwargs['prefix'],
+            progress=self.write_progress
+        )
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {sum(counts.values())} records '
+            f'in {time.perf_counter() - started:.1f} s'
+        ))
+
+    def write_progress(self, name, total):
+        """Вывод количества созданных записей модели."""
+        if self.verbosity > 1:
+            self.stdout.write(f'{name}: {total}')
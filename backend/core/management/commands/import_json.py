@@ -1,45 +1,132 @@
-import json
-
-from django.core.management import BaseCommand
+from django.apps import apps
+from django.core.management import BaseCommand, CommandError
+from django.db import IntegrityError
 
+from core.catalogue import bump_catalogue_version
+from core.counters import COUNTERS, reconcile_counters
+from core.importers import (CONFLICTS, CONFLICTS_ERROR, FORMATS,
+                            DataImportError, get_format, import_records,
+                            iter_records)
+from core.loaders import ParallelLoader
+from core.paginator import bump_count_version
 from recipes import models
+from recipes.search_index import ingredient_index
 
 EMPTY_ARGS_MESSAGE = '"--{arg}" argument was not provided'
 UNKNOW_MODEL_MESSAGE = 'Unknow model {model} was provided'
 
 
+def get_import_model(model_name):
+    """
+    Возвращает модель приложения recipes по имени, в том числе
+    промежуточную модель связи многие ко многим (например Recipe_tags).
+    """
+    for model in apps.get_app_config('recipes').get_models(
+        include_auto_created=True
+    ):
+        if model.__name__ == model_name:
+            return model
+    return None
+
+
 class Command(BaseCommand):
     """
-    Команда для импорта данных из json-файла в записи моделей Django.
-    Имеет два обязатлеьных параметра:
-    --path - полный путь до json-файла
-    --model - имя модели, в которую импортируем данные
+    Команда для импорта данных из файла в записи моделей Django.
+    Файл читается потоково и импортируется пакетами, каждый пакет
+    в отдельной транзакции. Поддерживаются форматы json (массив
+    объектов), ndjson (объект в каждой строке) и csv с заголовком.
+    Имеет два обязательных параметра:
+    --path - полный путь до файла
+    --model - имя модели приложения recipes, в которую импортируем
+    данные, включая промежуточные модели (RecipeIngredient, Recipe_tags)
+    Необязательные параметры:
+    --format - формат файла, по умолчанию определяется по расширению
+    --batch-size - количество записей в пакете
+    --conflicts - обработка совпадающих записей: error - ошибка,
+    ignore - пропуск, update - обновление полей из файла
+    --workers - количество процессов разбора записей. При значении
+    больше 1 используется параллельный загрузчик: записи проверяются
+    в пуле процессов, внешние ключи на теги, ингредиенты и пользователей
+    могут задаваться естественными ключами (slug, «имя (единица)»,
+    username), а в PostgreSQL строки записываются командой COPY.
+    В режиме update параллельный загрузчик обновляет все поля записей.
 
     Пример вызова:
     python manage.py import_json --path '/Dev/test.json' --model Ingredient
     При таком вызове произойдет запись данных в модель Ingredient.
     """
     help = (
-        'Load data from a json file into Django model records. '
+        'Load data from a json, ndjson or csv file into Django model records.'
     )
 
     def add_arguments(self, parser):
         parser.add_argument('--path', type=str)
         parser.add_argument('--model', type=str)
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--conflicts', choices=CONFLICTS, default=CONFLICTS_ERROR
+        )
+        parser.add_argument('--workers', type=int, default=1)
 
     def handle(self, *args, **kwargs):
+        self.verbosity = kwargs['verbosity']
         path = kwargs.get('path')
         if not path:
-            raise KeyError(EMPTY_ARGS_MESSAGE.format(arg='path'))
+            raise CommandError(EMPTY_ARGS_MESSAGE.format(arg='path'))
         model_name = kwargs.get('model')
         if not model_name:
-            raise KeyError(EMPTY_ARGS_MESSAGE.format(arg='model'))
-        import_model = getattr(models, model_name, None)
+            raise CommandError(EMPTY_ARGS_MESSAGE.format(arg='model'))
+        import_model = get_import_model(model_name)
         if not import_model:
-            raise KeyError(EMPTY_ARGS_MESSAGE.format(arg='model'))
-        with open(path, 'r', encoding='utf-8') as json_file:
-            json_data = json.load(json_file)
-        objects = [
-            import_model(**data) for data in json_data
+            raise CommandError(UNKNOW_MODEL_MESSAGE.format(model=model_name))
+        try:
+            file_format = get_format(path, kwargs.get('format'))
+            if kwargs['workers'] > 1:
+                total, elapsed = ParallelLoader(
+                    import_model,
+                    workers=kwargs['workers'],
+                    batch_size=kwargs['batch_size'],
+                    conflicts=kwargs['conflicts']
+                ).load(path, file_format, progress=self.write_progress)
+            else:
+                with open(path, 'r', encoding='utf-8', newline='') as file:
+                    total, elapsed = import_records(
+                        import_model,
+                        iter_records(file, file_format),
+                        batch_size=kwargs['batch_size'],
+                        conflicts=kwargs['conflicts'],
+                        progress=self.write_progress
+                    )
+        except (DataImportError, IntegrityError, OSError) as error:
+            raise CommandError(str(error))
+        finally:
+            self.invalidate(import_model)
+        self.stdout.write(self.style.SUCCESS(
+            f'{import_model.__name__}: imported {total} records '
+            f'in {elapsed:.2f} s'
+        ))
+
+    def write_progress(self, total, elapsed):
+        """Вывод количества импортированных записей и скорости импорта."""
+        if self.verbosity:
+            self.stdout.write(
+                f'{total} records, {total / max(elapsed, 1e-6):.0f} records/s'
+            )
+
+    def invalidate(self, import_model):
+        """
+        Сброс кешей и пересчет счетчиков, зависящих от данных
+        импортированной модели: записи импортируются массово без сигналов.
+        """
+        counters = [
+            counter for counter in COUNTERS if counter.related is import_model
         ]
-        import_model.objects.bulk_create(objects)
+        if counters:
+            reconcile_counters(counters)
+        if import_model is models.Ingredient:
+            ingredient_index.invalidate()
+        if import_model in (models.Ingredient, models.Tag):
+            bump_catalogue_version(import_model)
+        else:
+            bump_count_version(models.Recipe)
@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+
+from core.counters import REFRESH_BATCH_SIZE, reconcile_counters
+
+
+class Command(BaseCommand):
+    """
+    Команда исправления счетчиков избранного и списков покупок рецептов,
+    рецептов и подписчиков пользователей, значения которых разошлись
+    с фактическим количеством связанных записей после массовых
+    операций без сигналов (импорт, удаление запросами, каскадное
+    удаление).
+
+    Пример вызова:
+    python manage.py reconcile_counters --dry-run
+    """
+    help = 'Repair denormalized counters of recipes and users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--batch', type=int, default=REFRESH_BATCH_SIZE)
+
+    def handle(self, *args, **kwargs):
+        result = reconcile_counters(
+            dry_run=kwargs['dry_run'], batch_size=kwargs['batch']
+        )
+        action = 'drifted' if kwargs['dry_run'] else 'repaired'
+        for label, amount in result.items():
+            self.stdout.write(f'{label}: {amount} {action}')
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from core.scores import refresh_recipe_scores
+
+
+class Command(BaseCommand):
+    """
+    Команда периодического пересчета оценок популярности рецептов
+    для сортировки списка рецептов ?ordering=popular и ?ordering=trending.
+    С параметром --once выполняет один пересчет (например, из cron).
+
+    Пример вызова:
+    python manage.py refresh_recipe_scores --interval 300
+    """
+    help = 'Refresh recipe popularity and trending scores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            default=settings.RECIPE_SCORE_REFRESH_INTERVAL
+        )
+        parser.add_argument('--once', action='store_true')
+
+    def handle(self, *args, **kwargs):
+        while True:
+            updated = refresh_recipe_scores()
+            self.stdout.write(f'Refreshed scores: {updated}')
+            if kwargs['once']:
+                return
+            time.sleep(kwargs['interval'])
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from core.images import process_pending_images
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Команда создания уменьшенных копий картинок рецептов, для которых
+    они еще не созданы: при RECIPE_IMAGE_BACKEND = 'db', после импорта
+    рецептов и изменения RECIPE_IMAGE_RENDITIONS (с параметром --all).
+
+    Пример вызова:
+    python manage.py run_image_worker --once --all
+    """
+    help = 'Create resized WebP renditions of recipe images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            default=settings.RECIPE_IMAGE_POLL_INTERVAL
+        )
+        parser.add_argument('--batch', type=int, default=10)
+        parser.add_argument('--once', action='store_true')
+        parser.add_argument('--all', action='store_true')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['all']:
+            Recipe.objects.update(renditions_ready=False)
+        after = 0
+        while True:
+            processed, last = process_pending_images(
+                kwargs['batch'], after, kwargs['all']
+            )
+            if processed:
+                self.stdout.write(f'Processed: {processed}')
+            if last is not None:
+                after = last
+                continue
+            if kwargs['once']:
+                return
+            after = 0
+            time.sleep(kwargs['interval'])
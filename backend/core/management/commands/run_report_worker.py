@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from api.jobs import delete_expired_jobs, fail_stale_jobs, process_pending_jobs
+
+
+class Command(BaseCommand):
+    """
+    Команда выполнения заданий формирования pdf файлов списков покупок,
+    поставленных в очередь при REPORT_JOB_BACKEND = 'db'.
+    Задания берутся в работу атомарно, поэтому допускается запуск
+    нескольких обработчиков одновременно.
+
+    Пример вызова:
+    python manage.py run_report_worker --interval 2
+    """
+    help = 'Render queued shopping list reports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            default=settings.REPORT_JOB_POLL_INTERVAL
+        )
+        parser.add_argument('--batch', type=int, default=10)
+        parser.add_argument('--once', action='store_true')
+
+    def handle(self, *args, **kwargs):
+        while True:
+            fail_stale_jobs()
+            deleted = delete_expired_jobs()
+            processed = process_pending_jobs(kwargs['batch'])
+            if processed or deleted:
+                self.stdout.write(
+                    f'Processed: {processed}, deleted expired: {deleted}'
+                )
+            if kwargs['once']:
+                return
+            if not processed:
+                time.sleep(kwargs['interval'])
@@ -0,0 +1,111 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+COUNT_VERSION_KEY = 'count-version:{label}'
+COUNT_KEY = 'count:{label}:{version}:{signature}'
+
+
+def _get_count_version(model):
+    """Возвращает текущую версию кешированных количеств записей модели."""
+    return cache.get_or_set(
+        COUNT_VERSION_KEY.format(label=model._meta.label_lower), 1, None
+    )
+
+
+def bump_count_version(model):
+    """Сброс кешированных количеств записей модели сменой версии."""
+    key = COUNT_VERSION_KEY.format(label=model._meta.label_lower)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def get_count_query(queryset):
+    """
+    Возвращает копию запроса выборки без сортировки, связанных таблиц
+    select_related и аннотаций без агрегации, которые не влияют
+    на количество записей. Условия по аннотациям остаются в WHERE,
+    поэтому одинаковые условия с разными аннотациями пользователя
+    (is_favorited, is_in_shopping_cart) и сортировками дают один запрос.
+    """
+    query = queryset.query.chain()
+    query.clear_ordering(True)
+    query.select_related = False
+    for alias, annotation in list(query.annotations.items()):
+        if not annotation.contains_aggregate:
+            del query.annotations[alias]
+    if query.annotation_select_mask is not None:
+        query.set_annotation_mask(
+            query.annotation_select_mask & set(query.annotations)
+        )
+    return query
+
+
+def get_count_cache_key(queryset):
+    """
+    Возвращает ключ кеша количества записей выборки
+    по тексту и параметрам SQL запроса ее количества.
+    """
+    sql, params = get_count_query(queryset).sql_with_params()
+    return COUNT_KEY.format(
+        label=queryset.model._meta.label_lower,
+        version=_get_count_version(queryset.model),
+        signature=hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+    )
+
+
+def get_estimated_count(queryset):
+    """
+    Возвращает оценку количества записей по статистике планировщика
+    PostgreSQL для выборки без условий, если оценка не меньше
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD. Иначе возвращает None.
+    """
+    threshold = settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+    query = queryset.query
+    connection = connections[queryset.db]
+    if (not threshold or connection.vendor != 'postgresql'
+            or query.where or query.distinct or query.combinator
+            or query.low_mark or query.high_mark is not None):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < threshold:
+        return None
+    return row[0]
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Пагинатор с кешированием количества записей выборки на
+    PAGINATION_COUNT_CACHE_TTL секунд. Ключ кеша определяется SQL запросом
+    выборки без сортировки и аннотаций и версией, которая меняется
+    сигналами изменения записей модели. Для выборок без условий
+    с большим количеством записей используется оценка планировщика
+    PostgreSQL.
+    """
+    @cached_property
+    def count(self):
+        """Возвращает количество записей выборки."""
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        estimated = get_estimated_count(queryset)
+        if estimated is not None:
+            return estimated
+        key = get_count_cache_key(queryset)
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TTL)
+        return count
@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (ExpressionWrapper, F, FloatField, Max, OuterRef,
+                              Q, Subquery)
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.importers import batched
+from core.utils import bulk_create_batched
+from recipes.models import Recipe, RecipeScore
+
+POPULAR = 'popular'
+TRENDING = 'trending'
+ORDERINGS = (POPULAR, TRENDING)
+
+SCORE_FLOOR = 1e-3
+SCORE_BATCH_SIZE = 1000
+
+
+def get_decay(elapsed, half_life):
+    """Возвращает множитель затухания оценки за elapsed секунд."""
+    return 0.5 ** (max(elapsed, 0) / half_life)
+
+
+def create_missing_scores(now, batch_size=SCORE_BATCH_SIZE):
+    """
+    Создает нулевые оценки рецептов, добавленных в избранное или список
+    покупок, для которых оценок еще нет. Рецепты без добавлений оценок
+    не имеют и выводятся в конце сортировки по популярности.
+    Возвращает количество созданных оценок.
+    """
+    recipe_ids = list(
+        Recipe.objects.filter(
+            Q(favorites_count__gt=0) | Q(shopping_carts_count__gt=0),
+            score__isnull=True
+        ).values_list('pk', flat=True)
+    )
+    for batch in batched(recipe_ids, batch_size):
+        bulk_create_batched(
+            RecipeScore,
+            [
+                RecipeScore(recipe_id=recipe_id, refreshed_at=now)
+                for recipe_id in batch
+            ],
+            batch_size
+        )
+    return len(recipe_ids)
+
+
+def refresh_recipe_scores(now=None, batch_size=SCORE_BATCH_SIZE):
+    """
+    Пересчитывает оценки популярности рецептов по счетчикам избранного
+    и списков покупок. Оценки popular и trending уменьшаются в 2 раза
+    за RECIPE_SCORE_POPULAR_HALF_LIFE и RECIPE_SCORE_TRENDING_HALF_LIFE
+    секунд, к ним прибавляются изменения счетчиков с последнего пересчета
+    с весами RECIPE_SCORE_FAVORITE_WEIGHT и RECIPE_SCORE_CART_WEIGHT.
+    Пересчет выполняется одним запросом без агрегации связей только
+    для ненулевых оценок и оценок с изменившимися счетчиками, оценки
+    меньше SCORE_FLOOR обнуляются и больше не пересчитываются.
+    Возвращает количество пересчитанных оценок.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        last = RecipeScore.objects.aggregate(
+            last=Max('refreshed_at')
+        )['last']
+        elapsed = (now - last).total_seconds() if last else 0
+        create_missing_scores(now, batch_size)
+        recipe = Recipe.objects.filter(pk=OuterRef('pk'))
+        favorites = Subquery(recipe.values('favorites_count'))
+        carts = Subquery(recipe.values('shopping_carts_count'))
+        added = ExpressionWrapper(
+            (favorites - F('favorites_count'))
+            * settings.RECIPE_SCORE_FAVORITE_WEIGHT
+            + (carts - F('shopping_carts_count'))
+            * settings.RECIPE_SCORE_CART_WEIGHT,
+            output_field=FloatField()
+        )
+        changed = RecipeScore.objects.filter(
+            Q(popular__gt=0)
+            | Q(trending__gt=0)
+            | ~Q(favorites_count=F('recipe__favorites_count'))
+            | ~Q(shopping_carts_count=F('recipe__shopping_carts_count'))
+        ).values('pk')
+        updated = RecipeScore.objects.filter(pk__in=changed).update(
+            popular=Greatest(
+                F('popular') * get_decay(
+                    elapsed, settings.RECIPE_SCORE_POPULAR_HALF_LIFE
+                ) + added,
+                0.0
+            ),
+            trending=Greatest(
+                F('trending') * get_decay(
+                    elapsed, settings.RECIPE_SCORE_TRENDING_HALF_LIFE
+                ) + added,
+                0.0
+            ),
+            favorites_count=favorites,
+            shopping_carts_count=carts,
+            refreshed_at=now
+        )
+        for field in ORDERINGS:
+            RecipeScore.objects.filter(
+                **{f'{field}__gt': 0, f'{field}__lt': SCORE_FLOOR}
+            ).update(**{field: 0})
+    return updated
+
+
+def order_by_score(queryset, ordering):
+    """
+    Сортирует выборку рецептов по оценке ordering (popular или trending)
+    из таблицы оценок, рецепты без оценок и с равными оценками -
+    по дате публикации.
+    """
+    return queryset.order_by(
+        F(f'score__{ordering}').desc(nulls_last=True), '-pub_date', '-id'
+    )
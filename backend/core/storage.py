@@ -0,0 +1,55 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+DIGEST_PREFIX_LENGTH = 2
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором имя файла определяется хешем SHA-256
+    его содержимого: dir/ab/abcd...ef.ext. Одинаковое содержимое
+    хранится в одном файле, повторное сохранение не перезаписывает
+    существующий файл, а обновляет время его изменения, чтобы команда
+    delete_orphan_images не удалила его до фиксации записи. Файлы могут
+    использоваться несколькими записями, поэтому удаляются не вместе
+    с записями, а командой delete_orphan_images.
+    """
+    def get_digest(self, content):
+        """Возвращает хеш содержимого content."""
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        return digest.hexdigest()
+
+    def get_content_name(self, name, content):
+        """Возвращает имя файла по каталогу и расширению name и хешу."""
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = self.get_digest(content)
+        return '/'.join(filter(None, (
+            directory, digest[:DIGEST_PREFIX_LENGTH], f'{digest}{extension}'
+        )))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                return self._save(name, content)
+            return name
+        return self._save(name, content)
+
+
+recipe_image_storage = ContentAddressedStorage()
@@ -1,9 +1,12 @@
 from collections import OrderedDict
 
+from django.db import connections
 from django.shortcuts import _get_queryset
 from django.utils.translation import gettext_lazy as _
 from rest_framework.exceptions import ParseError, PermissionDenied
 
+_db_extensions = {}
+
 
 def get_field_values_from_object(obj, *fields, **kwargs):
     """
@@ -100,3 +103,81 @@ def is_exists_user_info(queryset, user):
     if user.is_anonymous:
         return False
     return queryset.filter(pk=user.pk).exists()
+
+
+def get_annotated_value(obj, annotation, default, *args):
+    """
+    Возвращает значение аннотации annotation объекта obj,
+    при ее отсутствии результат вызова default(*args).
+    """
+    value = getattr(obj, annotation, None)
+    if value is None:
+        return default(*args)
+    return value
+
+
+def bulk_create_batched(model, objs, batch_size=None, **kwargs):
+    """
+    Массовое создание записей модели пакетами размера batch_size,
+    не превышающего ограничения backend БД на количество параметров.
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+    queryset = model.objects.all()
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    limit = max(connections[queryset.db].ops.bulk_batch_size(fields, objs), 1)
+    batch_size = min(batch_size, limit) if batch_size else limit
+    return queryset.bulk_create(objs, batch_size=batch_size, **kwargs)
+
+
+def has_db_extension(using, name):
+    """
+    Проверяет, установлено ли в БД using расширение PostgreSQL name.
+    Результат запоминается для процесса, для остальных БД
+    возвращается False.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    key = (using, name)
+    if key not in _db_extensions:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM pg_extension WHERE extname = %s', [name]
+            )
+            _db_extensions[key] = cursor.fetchone() is not None
+    return _db_extensions[key]
+
+
+class CounterFieldsMixin:
+    """
+    Примесь модели со счетчиками counter_fields, которые изменяются
+    только запросами UPDATE с выражениями F. При сохранении существующей
+    записи без update_fields счетчики не записываются, чтобы устаревшие
+    значения загруженного объекта не затирали изменения счетчиков.
+    """
+    counter_fields = ()
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        """Сохранение записи без полей счетчиков."""
+        if update_fields is None and not force_insert and not (
+            self._state.adding
+        ):
+            deferred_fields = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred_fields
+            ]
+        super().save(
+            force_insert=force_insert,
+            force_update=force_update,
+            using=using,
+            update_fields=update_fields
+        )
@@ -3,6 +3,8 @@ from django.template.loader import get_template
 from django.utils.html import mark_safe
 from django.utils.translation import gettext_lazy as _
 
+from core.counters import RECIPES_COUNT, refresh_counters
+from core.images import set_recipe_image
 from recipes.models import Ingredient, Recipe, Tag
 
 
@@ -68,7 +70,7 @@ class RecipeAdmin(admin.ModelAdmin):
 
     def amount_favorites(self, recipe):
         """Общее число добавлений в избранное."""
-        return recipe.favorites.count()
+        return recipe.favorites_count
 
     amount_favorites.short_description = _('amount_favorites')
 
@@ -93,6 +95,22 @@ class RecipeAdmin(admin.ModelAdmin):
 
     ingredients_inline.short_description = _('ingredients')
 
+    def save_model(self, request, obj, form, change):
+        """
+        Сохранение рецепта с созданием копий измененной картинки
+        и пересчетом счетчиков рецептов прежнего и нового автора.
+        """
+        if 'image' in form.changed_data and obj.image:
+            previous = form.initial.get('image')
+            set_recipe_image(
+                obj, obj.image.file, getattr(previous, 'name', '')
+            )
+        super().save_model(request, obj, form, change)
+        if change and 'author' in form.changed_data:
+            refresh_counters(
+                RECIPES_COUNT, [form.initial.get('author'), obj.author_id]
+            )
+
     def render_change_form(self, request, *args, **kwargs):
         """Рендер формы редактирования рецепта."""
         self.request = request
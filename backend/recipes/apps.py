@@ -6,3 +6,7 @@ class RecipesConfig(AppConfig):
     """Класс конфигурирующий приложение recipes."""
     name = 'recipes'
     verbose_name = _('recipes')
+
+    def ready(self):
+        """Подключение обработчиков сигналов приложения."""
+        import recipes.signals  # noqa: F401
@@ -0,0 +1,98 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:10
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('{config}', coalesce({row}name, '')), 'A') || "
+    "setweight(to_tsvector('{config}', coalesce({row}text, '')), 'B')"
+)
+
+CREATE_TRIGRAM_SQL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS recipe_name_trgm_idx
+    ON recipes_recipe USING gin (name gin_trgm_ops);
+"""
+
+CREATE_SEARCH_SQL = """
+CREATE INDEX IF NOT EXISTS recipe_search_vector_idx
+    ON recipes_recipe USING gin (search_vector);
+CREATE OR REPLACE FUNCTION recipes_recipe_search_vector_update()
+RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {new_vector};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger
+    ON recipes_recipe;
+CREATE TRIGGER recipes_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update();
+UPDATE recipes_recipe SET search_vector = {vector};
+"""
+
+DROP_SEARCH_SQL = """
+DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger
+    ON recipes_recipe;
+DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update();
+DROP INDEX IF EXISTS recipe_name_trgm_idx;
+DROP INDEX IF EXISTS recipe_search_vector_idx;
+"""
+
+
+def is_extension_available(schema_editor, name):
+    """Проверяет, доступно ли для установки расширение PostgreSQL name."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_available_extensions WHERE name = %s', [name]
+        )
+        return cursor.fetchone() is not None
+
+
+def create_search(apps, schema_editor):
+    """
+    Создание индексов и триггера поиска рецептов в PostgreSQL.
+    Индекс по триграммам названия создается, только если доступно
+    расширение pg_trgm (из пакета contrib), иначе поиск выполняется
+    только по search_vector.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    if is_extension_available(schema_editor, 'pg_trgm'):
+        schema_editor.execute(CREATE_TRIGRAM_SQL)
+    config = settings.RECIPE_SEARCH_CONFIG
+    schema_editor.execute(
+        CREATE_SEARCH_SQL.format(
+            new_vector=SEARCH_VECTOR_SQL.format(config=config, row='NEW.'),
+            vector=SEARCH_VECTOR_SQL.format(config=config, row='')
+        )
+    )
+
+
+def drop_search(apps, schema_editor):
+    """Удаление индексов и триггера поиска рецептов в PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_SEARCH_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_auto_20221003_2053'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_text_idx',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='search vector'),
+        ),
+        migrations.RunPython(create_search, drop_search),
+    ]
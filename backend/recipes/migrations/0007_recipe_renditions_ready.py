@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions_ready',
+            field=models.BooleanField(default=False, editable=False, help_text='Resized WebP copies of the image are created.', verbose_name='image renditions ready'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:52
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_renditions_ready'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=core.storage.ContentAddressedStorage(), upload_to='recipes/', verbose_name='image'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'Recipe', 'favorites_count', 'recipes', 'Recipe_favorites',
+     'recipe'),
+    ('recipes', 'Recipe', 'shopping_carts_count', 'recipes',
+     'Recipe_shopping_carts', 'recipe'),
+    ('users', 'CustomUser', 'recipes_count', 'recipes', 'Recipe', 'author'),
+    ('users', 'CustomUser', 'followers_count', 'users', 'Subscriber',
+     'author'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    """Заполнение счетчиков по фактическому количеству связанных записей."""
+    for label, name, field, related_label, related_name, related_field in (
+        COUNTERS
+    ):
+        related = apps.get_model(related_label, related_name)
+        apps.get_model(label, name).objects.update(
+            **{field: Coalesce(
+                Subquery(
+                    related.objects.filter(
+                        **{related_field: OuterRef('pk')}
+                    ).order_by().values(related_field).annotate(
+                        count=Count('pk')
+                    ).values('count')
+                ),
+                0
+            )}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_counters'),
+        ('recipes', '0008_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='favorites count'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='shopping carts count'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
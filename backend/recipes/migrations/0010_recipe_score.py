@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeScore',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='recipes.Recipe', verbose_name='recipe')),
+                ('popular', models.FloatField(default=0, verbose_name='popularity score')),
+                ('trending', models.FloatField(default=0, verbose_name='trending score')),
+                ('favorites_count', models.PositiveIntegerField(default=0, help_text='Favorites count at the last refresh.', verbose_name='favorites count')),
+                ('shopping_carts_count', models.PositiveIntegerField(default=0, help_text='Shopping carts count at the last refresh.', verbose_name='shopping carts count')),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='refreshed at')),
+            ],
+            options={
+                'verbose_name': 'recipe score',
+                'verbose_name_plural': 'recipe scores',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipescore',
+            index=models.Index(fields=['-popular'], name='recipe_score_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipescore',
+            index=models.Index(fields=['-trending'], name='recipe_score_trending_idx'),
+        ),
+    ]
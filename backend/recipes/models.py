@@ -1,11 +1,17 @@
 from colorfield.fields import ColorField
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVectorField,
+                                            TrigramSimilarity)
 from django.core.validators import MinValueValidator, validate_slug
-from django.db import models
+from django.db import connections, models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from core.utils import is_exists_user_info
+from core.storage import recipe_image_storage
+from core.utils import (CounterFieldsMixin, has_db_extension,
+                        is_exists_user_info)
 from core.validators import (validate_color_hex_code, validate_only_letters,
                              validate_simple_name, validate_tag)
 
@@ -100,8 +106,110 @@ class Ingredient(models.Model):
         return f'{self.name} ({self.measurement_unit})'
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """QuerySet рецептов."""
+    def with_user_info(self, user):
+        """
+        Аннотирует признаки favorited_by_user и in_user_shopping_cart
+        наличия рецепта в избранном и списке покупок пользователя user.
+        """
+        if user.is_anonymous:
+            return self.annotate(
+                favorited_by_user=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                in_user_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            favorited_by_user=models.Exists(
+                Recipe.favorites.through.objects.filter(
+                    customuser_id=user.pk,
+                    recipe_id=models.OuterRef('pk')
+                )
+            ),
+            in_user_shopping_cart=models.Exists(
+                Recipe.shopping_carts.through.objects.filter(
+                    customuser_id=user.pk,
+                    recipe_id=models.OuterRef('pk')
+                )
+            ),
+        )
+
+    def search(self, query):
+        """
+        Поиск рецептов по названию и тексту с ранжированием результатов.
+        В PostgreSQL используется полнотекстовый поиск по полю
+        search_vector с GIN индексом, дополненный поиском по триграммам
+        названия для запросов с опечатками, если установлено расширение
+        pg_trgm. Для остальных БД выполняется поиск вхождения строки
+        в название или текст рецепта.
+        """
+        if connections[self.db].vendor == 'postgresql':
+            search_query = SearchQuery(
+                query, config=settings.RECIPE_SEARCH_CONFIG
+            )
+            condition = models.Q(search_vector=search_query)
+            search_rank = SearchRank(models.F('search_vector'), search_query)
+            if has_db_extension(self.db, 'pg_trgm'):
+                condition |= models.Q(name__trigram_similar=query)
+                search_rank += TrigramSimilarity('name', query)
+            return self.filter(condition).annotate(
+                search_rank=search_rank
+            ).order_by('-search_rank', '-pub_date')
+        return self.filter(
+            models.Q(name__icontains=query) | models.Q(text__icontains=query)
+        ).annotate(
+            search_rank=models.Case(
+                models.When(name__istartswith=query, then=models.Value(3)),
+                models.When(name__icontains=query, then=models.Value(2)),
+                default=models.Value(1),
+                output_field=models.IntegerField()
+            )
+        ).order_by('-search_rank', '-pub_date')
+
+    def latest_by_author(self, limit=None):
+        """
+        Выборка не более limit последних рецептов каждого автора.
+        Ограничение задается коррелированным подзапросом по автору,
+        так как фильтрация по оконным функциям в Django 2.2 недоступна.
+        """
+        if not limit:
+            return self
+        return self.filter(
+            pk__in=models.Subquery(
+                self.model.objects.filter(
+                    author_id=models.OuterRef('author_id')
+                ).order_by('-pub_date', '-id').values('pk')[:limit]
+            )
+        )
+
+    def for_read(self, user):
+        """
+        Выборка рецептов со всеми связанными данными для чтения.
+        Число запросов к БД не зависит от количества рецептов.
+        """
+        return self.with_user_info(user).defer(
+            'search_vector'
+        ).prefetch_related(
+            'tags',
+            models.Prefetch(
+                'author',
+                queryset=User.objects.with_subscribed(user)
+            ),
+            models.Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                )
+            ),
+        )
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     """Модель рецепта."""
+    counter_fields = ('favorites_count', 'shopping_carts_count')
     name = models.CharField(
         _('name'),
         max_length=200,
@@ -117,6 +225,13 @@ class Recipe(models.Model):
     image = models.ImageField(
         _('image'),
         upload_to='recipes/',
+        storage=recipe_image_storage,
+    )
+    renditions_ready = models.BooleanField(
+        _('image renditions ready'),
+        default=False,
+        editable=False,
+        help_text=_('Resized WebP copies of the image are created.')
     )
     text = models.TextField(
         _('recipe text'),
@@ -161,12 +276,27 @@ class Recipe(models.Model):
         blank=True,
         related_name='shopping_cart_recipes',
     )
+    favorites_count = models.PositiveIntegerField(
+        _('favorites count'),
+        default=0,
+        editable=False,
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        _('shopping carts count'),
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        _('search vector'),
+        null=True,
+        editable=False,
+    )
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         """Метаданные модели рецептов."""
         indexes = [
             models.Index(fields=['name'], name='recipe_name_idx'),
-            models.Index(fields=['text'], name='recipe_text_idx'),
             models.Index(fields=['pub_date'], name='recipe_pub_date_idx'),
         ]
         ordering = ['-pub_date']
@@ -186,6 +316,61 @@ class Recipe(models.Model):
         return self.name
 
 
+class RecipeScore(models.Model):
+    """
+    Модель оценок популярности рецепта, пересчитываемых периодически
+    командой refresh_recipe_scores по счетчикам избранного и списков
+    покупок. Добавления учитываются с весами и затухают со временем:
+    popular - медленно, trending - быстро.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name=_('recipe'),
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+    )
+    popular = models.FloatField(
+        _('popularity score'),
+        default=0,
+    )
+    trending = models.FloatField(
+        _('trending score'),
+        default=0,
+    )
+    favorites_count = models.PositiveIntegerField(
+        _('favorites count'),
+        default=0,
+        help_text=_('Favorites count at the last refresh.')
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        _('shopping carts count'),
+        default=0,
+        help_text=_('Shopping carts count at the last refresh.')
+    )
+    refreshed_at = models.DateTimeField(
+        _('refreshed at'),
+        default=timezone.now,
+    )
+
+    class Meta:
+        """Метаданные модели оценок рецептов."""
+        indexes = [
+            models.Index(
+                fields=['-popular'], name='recipe_score_popular_idx'
+            ),
+            models.Index(
+                fields=['-trending'], name='recipe_score_trending_idx'
+            ),
+        ]
+        verbose_name = _('recipe score')
+        verbose_name_plural = _('recipe scores')
+
+    def __str__(self):
+        """Метод возвращает рецепт и его оценки."""
+        return f'{self.recipe_id}: {self.popular:.2f} / {self.trending:.2f}'
+
+
 class RecipeIngredient(models.Model):
     """Модель ингридиентов рецепта."""
     recipe = models.ForeignKey(
@@ -0,0 +1,91 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+class IngredientSearchIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+    Возвращает сначала ингредиенты, название которых начинается
+    со строки поиска (без учета регистра), затем ингредиенты,
+    название которых содержит строку поиска. Внутри каждой группы
+    сохраняется порядок сортировки модели по названию.
+    Индекс строится при первом обращении и сбрасывается сигналами
+    изменения ингредиентов, а также по истечении времени жизни
+    INGREDIENT_INDEX_TTL для синхронизации между процессами.
+    """
+    def __init__(self):
+        """Инициализация пустого индекса."""
+        self._lock = threading.Lock()
+        self._rows = None
+        self._keys = None
+        self._positions = None
+        self._built_at = None
+
+    def invalidate(self):
+        """Сброс индекса, он будет перестроен при следующем поиске."""
+        with self._lock:
+            self._rows = None
+
+    def _is_actual(self):
+        """Проверка актуальности построенного индекса."""
+        ttl = getattr(settings, 'INGREDIENT_INDEX_TTL', None)
+        return self._rows is not None and (
+            not ttl or time.monotonic() - self._built_at < ttl
+        )
+
+    def _build(self):
+        """Построение индекса по данным модели ингредиентов."""
+        from recipes.models import Ingredient
+        rows = list(
+            Ingredient.objects.order_by('name', 'pk').values_list(
+                'pk', 'name', 'measurement_unit'
+            )
+        )
+        order = sorted(
+            range(len(rows)), key=lambda position: rows[position][1].lower()
+        )
+        self._keys = [rows[position][1].lower() for position in order]
+        self._positions = order
+        self._rows = rows
+        self._built_at = time.monotonic()
+
+    def _get_index(self):
+        """Возвращает актуальные данные индекса."""
+        with self._lock:
+            if not self._is_actual():
+                self._build()
+            return self._rows, self._keys, self._positions
+
+    def search(self, value, limit=None):
+        """Поиск ингредиентов по началу и вхождению строки value."""
+        from recipes.models import Ingredient
+        if limit is None:
+            limit = getattr(settings, 'INGREDIENT_SEARCH_LIMIT', None)
+        rows, keys, positions = self._get_index()
+        prefix = value.lower()
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_right(keys, prefix + PREFIX_UPPER_BOUND)
+        found = sorted(positions[start:end])
+        if not limit or len(found) < limit:
+            prefix_found = set(found)
+            found.extend(
+                position for position, row in enumerate(rows)
+                if value in row[1] and position not in prefix_found
+            )
+        if limit:
+            found = found[:limit]
+        field_names = ('id', 'name', 'measurement_unit')
+        return [
+            Ingredient.from_db(
+                Ingredient.objects.db, field_names, rows[position]
+            )
+            for position in found
+        ]
+
+
+ingredient_index = IngredientSearchIndex()
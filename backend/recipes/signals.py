@@ -0,0 +1,78 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save)
+from django.dispatch import receiver
+
+from core.catalogue import bump_catalogue_version
+from core.counters import RECIPES_COUNT, change_counter, update_m2m_counter
+from core.paginator import bump_count_version
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.search_index import ingredient_index
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    """
+    Сброс индекса поиска и версии справочника ингредиентов
+    при изменении ингредиента.
+    """
+    ingredient_index.invalidate()
+    bump_catalogue_version(Ingredient)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_catalogue(sender, **kwargs):
+    """Сброс версии справочника тегов при изменении тега."""
+    bump_catalogue_version(Tag)
+
+
+@receiver(post_migrate)
+def invalidate_ingredient_index_after_migrate(sender, **kwargs):
+    """
+    Сброс индекса поиска ингредиентов, версий справочников
+    и кешированных количеств рецептов после миграций и очистки БД.
+    """
+    ingredient_index.invalidate()
+    bump_catalogue_version(Ingredient)
+    bump_catalogue_version(Tag)
+    bump_count_version(Recipe)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_counts(sender, **kwargs):
+    """
+    Сброс кешированных количеств рецептов при сохранении и удалении
+    рецепта, в том числе при изменении его тегов через API и админку.
+    Изменения избранного и списков покупок через API сбрасывают кеш
+    в CountVersionMixin.
+    """
+    bump_count_version(Recipe)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    """Увеличение счетчика рецептов автора при создании рецепта."""
+    if created:
+        change_counter(RECIPES_COUNT, instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    """Уменьшение счетчика рецептов автора при удалении рецепта."""
+    change_counter(RECIPES_COUNT, instance.author_id, -1)
+
+
+@receiver(m2m_changed, sender=Recipe.favorites.through)
+@receiver(m2m_changed, sender=Recipe.shopping_carts.through)
+def update_recipe_user_counters(sender, **kwargs):
+    """
+    Пересчет счетчиков избранного и списков покупок рецептов
+    при изменении связей методами add, remove, set и clear, в том числе
+    в админке. Связи, созданные и удаленные через API, изменяют счетчики
+    в CounterMixin. Обработчик отключает быстрое каскадное удаление
+    связей, поэтому массовое удаление выполняется запросами
+    без выборки записей (см. core.datasets.delete_dataset).
+    """
+    update_m2m_counter(sender, **kwargs)
@@ -6,3 +6,7 @@ class UsersConfig(AppConfig):
     """Класс конфигурирующий приложение users."""
     name = 'users'
     verbose_name = _('users')
+
+    def ready(self):
+        """Подключение обработчиков сигналов приложения."""
+        import users.signals  # noqa: F401
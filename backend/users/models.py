@@ -4,12 +4,35 @@ from django.core.validators import EmailValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
-from core.utils import is_exists_user_info
+from core.utils import CounterFieldsMixin, is_exists_user_info
 from core.validators import validate_only_letters
 from users.settings import USER_ME
 
 
-class CustomUserManager(BaseUserManager):
+class CustomUserQuerySet(models.QuerySet):
+    """QuerySet пользователей."""
+    def with_subscribed(self, user):
+        """
+        Аннотирует признак followed_by_user наличия подписки
+        пользователя user на каждого пользователя выборки.
+        """
+        if user.is_anonymous:
+            return self.annotate(
+                followed_by_user=models.Value(
+                    False, output_field=models.BooleanField()
+                )
+            )
+        return self.annotate(
+            followed_by_user=models.Exists(
+                Subscriber.objects.filter(
+                    user_id=user.pk,
+                    author_id=models.OuterRef('pk')
+                )
+            )
+        )
+
+
+class CustomUserManager(BaseUserManager.from_queryset(CustomUserQuerySet)):
     def create_user(
         self, email, username, first_name, last_name, password=None
     ):
@@ -49,8 +72,9 @@ class CustomUserManager(BaseUserManager):
         return user
 
 
-class CustomUser(AbstractUser):
+class CustomUser(CounterFieldsMixin, AbstractUser):
     """Модель CustomUser управления пользователями."""
+    counter_fields = ('recipes_count', 'followers_count')
     first_name = models.CharField(
         _('first name'),
         max_length=150,
@@ -96,6 +120,16 @@ class CustomUser(AbstractUser):
         related_name='my_subscribers',
         help_text=_('Subscribed for this user.'),
     )
+    recipes_count = models.PositiveIntegerField(
+        _('recipes count'),
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        _('followers count'),
+        default=0,
+        editable=False,
+    )
     objects = CustomUserManager()
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.dispatch import receiver
+
+from core.counters import (get_user_relation_pks, refresh_counters,
+                           update_m2m_counter)
+from users.models import Subscriber
+
+User = get_user_model()
+
+
+@receiver(m2m_changed, sender=Subscriber)
+def update_followers_count(sender, **kwargs):
+    """
+    Пересчет счетчиков подписчиков авторов при изменении подписок
+    методами add, remove, set и clear. Подписки, созданные и удаленные
+    через API, изменяют счетчики в CounterMixin.
+    """
+    update_m2m_counter(sender, **kwargs)
+
+
+@receiver(pre_delete, sender=User)
+def collect_user_relations(sender, instance, **kwargs):
+    """
+    Сохранение ключей рецептов и авторов, счетчики которых зависят
+    от связей удаляемого пользователя.
+    """
+    instance._relation_pks = get_user_relation_pks(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def refresh_user_relation_counters(sender, instance, **kwargs):
+    """
+    Пересчет счетчиков избранного, списков покупок и подписчиков
+    после каскадного удаления связей пользователя.
+    """
+    for counter, pks in instance.__dict__.pop('_relation_pks', {}).items():
+        refresh_counters(counter, pks)
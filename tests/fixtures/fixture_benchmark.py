@@ -0,0 +1,54 @@
+import pytest
+
+from core.benchmark import (APIBenchmark, build_context, load_baseline,
+                            save_baseline)
+from core.datasets import seed_dataset
+
+BENCHMARK_PAGE_SIZE = 5
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark')
+    group.addoption(
+        '--benchmark-scale',
+        type=int,
+        default=1,
+        help='Множитель размера синтетического набора данных замеров.'
+    )
+    group.addoption(
+        '--benchmark-update-baseline',
+        action='store_true',
+        default=False,
+        help='Сохранить результаты замеров как базовые показатели.'
+    )
+
+
+@pytest.fixture(scope='session')
+def benchmark_baseline(request):
+    baseline = load_baseline()
+    results = {}
+    yield baseline, results
+    if request.config.getoption('--benchmark-update-baseline') and results:
+        save_baseline(results, baseline=baseline)
+
+
+@pytest.fixture
+def benchmark_dataset(request, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    scale = request.config.getoption('--benchmark-scale')
+    return seed_dataset(
+        users=(BENCHMARK_PAGE_SIZE + 2) * scale,
+        recipes=30 * scale,
+        ingredients=50 * scale,
+        subscriptions=20 * scale,
+        favorites=30 * scale,
+        carts=20 * scale,
+    )
+
+
+@pytest.fixture
+def api_benchmark(benchmark_dataset):
+    return APIBenchmark(
+        build_context(benchmark_dataset, BENCHMARK_PAGE_SIZE),
+        page_size=BENCHMARK_PAGE_SIZE
+    )
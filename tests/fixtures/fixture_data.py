@@ -125,3 +125,45 @@ def subscription_user_to_another_user(another_user, user):
         user=user,
         author=another_user
     )
+
+
+@pytest.fixture
+def many_recipes(user, another_user, ingredient_1, ingredient_2, tag1, tag2):
+    recipes = []
+    for number in range(6):
+        recipe = Recipe.objects.create(
+            name=f'Рецепт много {number}',
+            image=tempfile.NamedTemporaryFile(suffix=".jpg").name,
+            text=f'Текст рецепта много {number}',
+            cooking_time=10,
+            author=another_user if number % 2 else user
+        )
+        Recipe.ingredients.through.objects.create(
+            recipe=recipe,
+            ingredient=ingredient_1,
+            amount=number + 1
+        )
+        Recipe.ingredients.through.objects.create(
+            recipe=recipe,
+            ingredient=ingredient_2,
+            amount=number + 2
+        )
+        recipe.tags.add(tag1, tag2)
+        recipe.favorites.add(user)
+        recipe.shopping_carts.add(user)
+        recipes.append(recipe)
+    Subscriber.objects.create(user=user, author=another_user)
+    return recipes
+
+
+@pytest.fixture
+def many_ingredients():
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингридиент много {number:02}', measurement_unit='г')
+        for number in range(82)
+    )
+    return list(
+        Ingredient.objects.filter(
+            name__startswith='Ингридиент много'
+        ).order_by('name')
+    )
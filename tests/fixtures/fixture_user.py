@@ -37,3 +37,13 @@ def user_client(token):
     client = APIClient()
     client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
     return client
+
+
+@pytest.fixture
+def another_user_client(another_user):
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+    token, _ = Token.objects.get_or_create(user=another_user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
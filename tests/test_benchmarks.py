@@ -0,0 +1,34 @@
+import pytest
+
+from core.benchmark import ENDPOINTS, find_regressions
+
+
+class TestBenchmarksAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize(
+        'endpoint', ENDPOINTS, ids=[endpoint.name for endpoint in ENDPOINTS]
+    )
+    def test_endpoint_queries(
+        self, api_benchmark, benchmark_baseline, endpoint
+    ):
+        baseline, results = benchmark_baseline
+        result = api_benchmark.measure(endpoint)
+        results[endpoint.name] = result
+        assert result['status'] < 400, (
+            f'Убедитесь, что запрос к эндпоинту `{endpoint.url}` '
+            f'выполняется успешно, получен код {result["status"]}'
+        )
+        problems = find_regressions({endpoint.name: result}, baseline)
+        assert not problems, (
+            'Убедитесь, что количество запросов к БД не растет '
+            f'с размером страницы и не превышает базовое: {problems}'
+        )
+
+    def test_failed_status_is_regression(self):
+        result = {'status': 404, 'queries': 1, 'scales': False}
+        assert find_regressions({'endpoint': result}, {}) == [
+            'endpoint: status 404'
+        ], 'Убедитесь, что ответ с кодом ошибки считается регрессией'
+        result['status'] = 201
+        assert find_regressions({'endpoint': result}, {}) == []
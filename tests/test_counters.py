@@ -0,0 +1,134 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from recipes.models import Recipe
+from users.models import Subscriber
+
+User = get_user_model()
+
+
+def get_counters(recipe, user):
+    recipe.refresh_from_db()
+    user.refresh_from_db()
+    return (
+        recipe.favorites_count,
+        recipe.shopping_carts_count,
+        user.recipes_count,
+        user.followers_count,
+    )
+
+
+class TestCounters:
+    url_recipes = '/api/recipes/'
+    url_users = '/api/users/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_api_counters(self, user_client, another_user,
+                          recipe_another_user):
+        recipe_url = f'{self.url_recipes}{recipe_another_user.pk}/'
+        subscribe_url = f'{self.url_users}{another_user.pk}/subscribe/'
+        assert get_counters(recipe_another_user, another_user) == (
+            0, 0, 1, 0
+        ), 'Убедитесь, что создание рецепта увеличивает счетчик рецептов'
+        user_client.post(f'{recipe_url}favorite/')
+        user_client.post(f'{recipe_url}shopping_cart/')
+        user_client.post(subscribe_url)
+        assert get_counters(recipe_another_user, another_user) == (
+            1, 1, 1, 1
+        ), 'Убедитесь, что добавление связей через API увеличивает счетчики'
+        user_client.post(f'{recipe_url}favorite/')
+        assert get_counters(recipe_another_user, another_user)[0] == 1, (
+            'Убедитесь, что повторное добавление не изменяет счетчик'
+        )
+        user_client.delete(f'{recipe_url}favorite/')
+        user_client.delete(f'{recipe_url}shopping_cart/')
+        user_client.delete(subscribe_url)
+        assert get_counters(recipe_another_user, another_user) == (
+            0, 0, 1, 0
+        ), 'Убедитесь, что удаление связей через API уменьшает счетчики'
+        response = user_client.get(f'{self.url_users}subscriptions/')
+        assert response.status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_m2m_counters(self, user, another_user, recipe_another_user):
+        recipe_another_user.favorites.add(user, another_user)
+        user.shopping_cart_recipes.add(recipe_another_user)
+        user.subscribed.add(another_user)
+        assert get_counters(recipe_another_user, another_user) == (
+            2, 1, 1, 1
+        ), 'Убедитесь, что методы связей многие ко многим изменяют счетчики'
+        user.favorite_recipes.remove(recipe_another_user)
+        user.shopping_cart_recipes.clear()
+        another_user.my_subscribers.clear()
+        assert get_counters(recipe_another_user, another_user) == (
+            1, 0, 1, 0
+        )
+        recipe_another_user.favorites.set([user])
+        assert get_counters(recipe_another_user, another_user)[0] == 1
+        user.subscribed.add(another_user)
+        user.delete()
+        assert get_counters(recipe_another_user, another_user) == (
+            0, 0, 1, 0
+        ), 'Убедитесь, что удаление пользователя уменьшает счетчики'
+        recipe_another_user.delete()
+        another_user.refresh_from_db()
+        assert another_user.recipes_count == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_save_keeps_counters(self, user_client, user, another_user,
+                                 recipe_another_user):
+        stale_user = User.objects.get(pk=another_user.pk)
+        stale_recipe = Recipe.objects.get(pk=recipe_another_user.pk)
+        user.subscribed.add(another_user)
+        recipe_another_user.favorites.add(user)
+        stale_user.first_name = 'Новое'
+        stale_user.save()
+        stale_recipe.name = 'Новое название'
+        stale_recipe.save()
+        assert get_counters(recipe_another_user, another_user) == (
+            1, 0, 1, 1
+        ), 'Убедитесь, что сохранение записи не затирает счетчики'
+        assert another_user.first_name == 'Новое'
+        assert recipe_another_user.name == 'Новое название'
+        user_client.post(f'{self.url_recipes}{recipe_another_user.pk}/'
+                         'favorite/')
+        another_user.subscribed.add(user)
+        response = user_client.post(
+            f'{self.url_users}set_password/',
+            {'new_password': 'Qwerty123@$@Qwerty756',
+             'current_password': '1234567'}
+        )
+        assert response.status_code == 204
+        user.refresh_from_db()
+        assert user.followers_count == 1, (
+            'Убедитесь, что смена пароля не затирает счетчики'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_subscriptions_recipes_count(self, user_client, another_user,
+                                         recipe_another_user,
+                                         subscription_user_to_another_user):
+        Recipe.objects.filter(pk=recipe_another_user.pk).delete()
+        response = user_client.get(f'{self.url_users}subscriptions/')
+        assert response.json()['results'][0]['recipes_count'] == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reconcile_counters(self, capsys, user, another_user,
+                                recipe_user):
+        Subscriber.objects.create(user=another_user, author=user)
+        expected = (1, 2, 1, 1)
+        assert get_counters(recipe_user, user) != expected
+        call_command('reconcile_counters', dry_run=True)
+        output = capsys.readouterr().out
+        assert 'recipes.recipe.favorites_count: 1 drifted' in output
+        assert get_counters(recipe_user, user) != expected, (
+            'Убедитесь, что --dry-run не изменяет счетчики'
+        )
+        call_command('reconcile_counters')
+        assert 'repaired' in capsys.readouterr().out
+        assert get_counters(recipe_user, user) == expected, (
+            'Убедитесь, что команда исправляет расхождения счетчиков'
+        )
+        call_command('reconcile_counters', dry_run=True)
+        assert '1 drifted' not in capsys.readouterr().out
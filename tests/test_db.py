@@ -0,0 +1,63 @@
+import pytest
+from django.db import connection
+from django.db.backends.sqlite3 import base
+
+from core.db.backends.mixins import PersistentConnectionMixin
+
+
+class DatabaseWrapper(PersistentConnectionMixin, base.DatabaseWrapper):
+    pass
+
+
+@pytest.fixture
+def wrapper(tmp_path):
+    settings_dict = dict(
+        connection.settings_dict,
+        NAME=str(tmp_path / 'health.sqlite3'),
+        CONN_MAX_AGE=None,
+        CONN_HEALTH_CHECKS=True
+    )
+    wrapper = DatabaseWrapper(settings_dict, alias='health')
+    yield wrapper
+    wrapper.close()
+
+
+def execute(wrapper):
+    with wrapper.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+class TestPersistentConnection:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_connection_reused(self, wrapper):
+        execute(wrapper)
+        wrapper.close_if_unusable_or_obsolete()
+        execute(wrapper)
+        execute(wrapper)
+        metrics = wrapper.metrics.as_dict()
+        assert metrics['connections'] == 1
+        assert metrics['reused'] == 1
+        assert metrics['health_check_failures'] == 0
+        assert metrics['acquire_time'] >= metrics['max_acquire_time'] > 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unusable_connection_replaced(self, wrapper, monkeypatch):
+        execute(wrapper)
+        old_connection = wrapper.connection
+        monkeypatch.setattr(wrapper, 'is_usable', lambda: False)
+        wrapper.close_if_unusable_or_obsolete()
+        execute(wrapper)
+        assert wrapper.connection is not old_connection
+        assert wrapper.metrics.connections == 2
+        assert wrapper.metrics.health_check_failures == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_health_checks_disabled(self, wrapper, monkeypatch):
+        wrapper.health_check_enabled = False
+        execute(wrapper)
+        monkeypatch.setattr(wrapper, 'is_usable', lambda: False)
+        wrapper.close_if_unusable_or_obsolete()
+        execute(wrapper)
+        assert wrapper.metrics.connections == 1
+        assert wrapper.metrics.reused == 1
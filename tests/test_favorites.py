@@ -1,5 +1,10 @@
 import pytest
 from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.relations import FAVORITES, get_user_relations
+from api.views import FavoriteViewSet
 
 from .serializers import RecipeShortInfoSerializer
 from .utils import (check_bad_request, check_not_authorized,
@@ -71,3 +76,26 @@ class TestFavoritesAPI:
             'delete',
             url
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_favorite_user_relations(
+        self, user, recipe_another_user, favorite_recipe_another_user
+    ):
+        request = Request(APIRequestFactory().delete('/'))
+        request.user = user
+        relations = get_user_relations(request)
+        assert relations.contains(FAVORITES, recipe_another_user.pk)
+        view = FavoriteViewSet(
+            request=request, kwargs={'id': str(recipe_another_user.pk)},
+            format_kwarg=None, action='destroy'
+        )
+        view.perform_destroy(view.get_object())
+        assert not relations.contains(FAVORITES, recipe_another_user.pk), (
+            'Убедитесь, что удаление связи удаляет идентификатор объекта '
+            'из множества связей пользователя'
+        )
+        view.action = 'create'
+        serializer = view.get_serializer()
+        serializer.is_valid(raise_exception=True)
+        view.perform_create(serializer)
+        assert relations.get(FAVORITES) == {recipe_another_user.pk}
@@ -0,0 +1,136 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from core.datasets import delete_dataset, get_dataset_users
+from core.scores import refresh_recipe_scores
+from recipes.models import Recipe, RecipeScore
+from users.models import Subscriber
+
+User = get_user_model()
+
+
+def get_dataset_state():
+    return (
+        sorted(
+            Subscriber.objects.filter(
+                user__username__startswith='loadgen'
+            ).values_list('user__username', 'author__username')
+        ),
+        sorted(
+            Recipe.objects.filter(
+                name__startswith='loadgen '
+            ).values_list('name', 'author__username', 'cooking_time')
+        ),
+        sorted(
+            Recipe.favorites.through.objects.filter(
+                customuser__username__startswith='loadgen'
+            ).values_list('customuser__username', 'recipe__name')
+        ),
+    )
+
+
+class TestGenerateData:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_generate_data(self, recipe_user):
+        options = {
+            'users': 30, 'recipes': 60, 'ingredients': 40, 'tags': 4,
+            'follows': 5, 'favorites': 4, 'carts': 2, 'batch_size': 25,
+            'seed': 7,
+        }
+        call_command('generate_data', **options)
+        first_state = get_dataset_state()
+        subscriptions, recipes, favorites = first_state
+        assert len(recipes) == options['recipes']
+        assert subscriptions and favorites, (
+            'Убедитесь, что команда создает подписки и избранное'
+        )
+        assert all(user != author for user, author in subscriptions)
+        assert all(
+            1 <= recipe.recipe_ingredients.count() <= 30
+            for recipe in Recipe.objects.filter(name__startswith='loadgen ')
+        ), 'Убедитесь, что у каждого рецепта есть ингредиенты'
+        assert all(
+            recipe.favorites_count == recipe.favorites.count()
+            and recipe.author.recipes_count
+            == recipe.author.author_recipes.count()
+            for recipe in Recipe.objects.filter(name__startswith='loadgen ')
+        ), 'Убедитесь, что счетчики пересчитываются после генерации'
+        call_command('generate_data', clear=True, **options)
+        assert get_dataset_state() == first_state, (
+            'Убедитесь, что набор данных определяется параметром seed'
+        )
+        call_command('generate_data', clear=True, seed=8, **{
+            key: value for key, value in options.items() if key != 'seed'
+        })
+        assert get_dataset_state() != first_state
+        assert Recipe.objects.filter(pk=recipe_user.pk).exists(), (
+            'Убедитесь, что очистка не удаляет записи вне набора данных'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_clear_after_score_refresh(self):
+        call_command(
+            'generate_data', users=20, recipes=30, ingredients=10, tags=2,
+            favorites=4, carts=2, batch_size=25
+        )
+        refresh_recipe_scores()
+        assert RecipeScore.objects.exists()
+        call_command(
+            'generate_data', users=5, recipes=5, ingredients=5, tags=2,
+            clear=True
+        )
+        assert not RecipeScore.objects.exists(), (
+            'Убедитесь, что очистка набора данных удаляет оценки рецептов'
+        )
+        assert Recipe.objects.filter(name__startswith='loadgen ').count() == 5
+
+    @pytest.mark.django_db(transaction=True)
+    def test_clear_keeps_real_users(self, user):
+        real_user = User.objects.create_user(
+            username='loadgen_fan', email='fan@example.com',
+            first_name='Имя', last_name='Фамилия', password='1234567'
+        )
+        recipe = Recipe.objects.create(
+            name='loadgen рецепт', text='Текст', cooking_time=1,
+            image='recipes/test.png', author=real_user
+        )
+        call_command(
+            'generate_data', users=5, recipes=5, ingredients=5, tags=2
+        )
+        assert get_dataset_users('loadgen').count() == 5
+        delete_dataset()
+        assert User.objects.filter(pk=real_user.pk).exists(), (
+            'Убедитесь, что очистка не удаляет пользователей '
+            'вне набора данных с тем же префиксом имени'
+        )
+        assert Recipe.objects.filter(pk=recipe.pk).exists()
+        assert not get_dataset_users('loadgen').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_clear_without_loading_users(self, user):
+        call_command(
+            'generate_data', users=40, recipes=20, ingredients=10, tags=2,
+            batch_size=25
+        )
+        loadgen_user = User.objects.filter(
+            username__startswith='loadgen'
+        ).first()
+        Token.objects.create(user=loadgen_user)
+        Subscriber.objects.create(user=user, author=loadgen_user)
+        with CaptureQueriesContext(connection) as queries:
+            delete_dataset()
+        assert len(queries) < 40, (
+            'Убедитесь, что число запросов очистки не зависит '
+            'от количества пользователей'
+        )
+        assert not User.objects.filter(
+            username__startswith='loadgen'
+        ).exists()
+        assert not Token.objects.exists()
+        assert not Subscriber.objects.exists()
+        assert User.objects.filter(pk=user.pk).exists()
@@ -0,0 +1,172 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+
+def write_file(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content, encoding='utf-8')
+    return str(path)
+
+
+class TestImportJson:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_json_array(self, tmp_path, ingredient_1):
+        records = [
+            {'name': f'Продукт{number}', 'measurement_unit': 'г'}
+            for number in range(5)
+        ]
+        path = write_file(tmp_path, 'data.json', json.dumps(records))
+        call_command(
+            'import_json', path=path, model='Ingredient', batch_size=2
+        )
+        assert Ingredient.objects.count() == len(records) + 1, (
+            'Убедитесь, что импортируются все записи json массива'
+        )
+        with pytest.raises(CommandError):
+            call_command('import_json', path=path, model='Ingredient')
+        call_command(
+            'import_json', path=path, model='Ingredient', conflicts='ignore'
+        )
+        assert Ingredient.objects.count() == len(records) + 1, (
+            'Убедитесь, что при `--conflicts ignore` '
+            'совпадающие записи пропускаются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_ndjson_update(self, tmp_path, recipe_user, ingredient_1,
+                                  ingredient_3):
+        lines = [
+            {'recipe': recipe_user.pk, 'ingredient': ingredient_1.pk,
+             'amount': 7},
+            {'recipe_id': recipe_user.pk, 'ingredient_id': ingredient_3.pk,
+             'amount': 3},
+        ]
+        path = write_file(
+            tmp_path, 'data.ndjson',
+            '\n'.join(json.dumps(line) for line in lines)
+        )
+        call_command(
+            'import_json', path=path, model='RecipeIngredient',
+            conflicts='update'
+        )
+        amounts = dict(
+            RecipeIngredient.objects.filter(
+                recipe=recipe_user
+            ).values_list('ingredient_id', 'amount')
+        )
+        assert amounts[ingredient_1.pk] == 7, (
+            'Убедитесь, что при `--conflicts update` '
+            'поля совпадающих записей обновляются'
+        )
+        assert amounts[ingredient_3.pk] == 3
+        assert len(amounts) == 3
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_csv(self, tmp_path, recipe_user, tag3):
+        path = write_file(
+            tmp_path, 'tags.csv',
+            'name,color,slug\nПолдник,#123456,snack\n'
+        )
+        call_command('import_json', path=path, model='Tag')
+        assert Tag.objects.filter(slug='snack').exists(), (
+            'Убедитесь, что импортируются записи csv файла'
+        )
+        path = write_file(
+            tmp_path, 'recipe_tags.csv', f'recipe,tag\n{recipe_user.pk},'
+            f'{tag3.pk}\n'
+        )
+        call_command('import_json', path=path, model='Recipe_tags')
+        assert recipe_user.tags.filter(pk=tag3.pk).exists(), (
+            'Убедитесь, что импортируются связи многие ко многим'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_counters(self, tmp_path, user, another_user,
+                             recipe_another_user):
+        recipes = [
+            {'name': f'Рецепт{number}', 'text': 'Текст', 'cooking_time': 5,
+             'image': 'recipes/test.png', 'author': user.pk}
+            for number in range(3)
+        ]
+        path = write_file(tmp_path, 'recipes.json', json.dumps(recipes))
+        call_command('import_json', path=path, model='Recipe')
+        user.refresh_from_db()
+        assert user.recipes_count == len(recipes), (
+            'Убедитесь, что после импорта пересчитываются счетчики'
+        )
+        path = write_file(
+            tmp_path, 'favorites.csv',
+            f'recipe,customuser\n{recipe_another_user.pk},{user.pk}\n'
+        )
+        call_command('import_json', path=path, model='Recipe_favorites')
+        recipe_another_user.refresh_from_db()
+        assert recipe_another_user.favorites_count == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_bad_data(self, tmp_path):
+        path = write_file(tmp_path, 'data.json', '[{"unknown": 1}]')
+        with pytest.raises(CommandError):
+            call_command('import_json', path=path, model='Ingredient')
+        with pytest.raises(CommandError):
+            call_command('import_json', path=path, model='CustomUser')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_parallel_loader(self, tmp_path, user, recipe_user, ingredient_1,
+                             ingredient_2, ingredient_3):
+        from core.loaders import ParallelLoader
+        recipes = [
+            {'name': f'Рецепт{number}', 'text': 'Текст', 'cooking_time': 5,
+             'image': 'recipes/test.png', 'author': user.username}
+            for number in range(10)
+        ]
+        path = write_file(
+            tmp_path, 'recipes.ndjson',
+            '\n'.join(json.dumps(recipe) for recipe in recipes) + '\n'
+        )
+        total, _ = ParallelLoader(
+            Recipe, workers=2, partition_size=64
+        ).load(path, 'ndjson')
+        assert total == len(recipes)
+        assert Recipe.objects.filter(
+            author=user, name__startswith='Рецепт'
+        ).count() == len(recipes) + 1, (
+            'Убедитесь, что параллельный загрузчик импортирует все записи '
+            'и определяет автора по имени пользователя'
+        )
+        path = write_file(
+            tmp_path, 'ingredients.csv',
+            f'recipe,ingredient,amount\n'
+            f'{recipe_user.pk},{ingredient_1.pk},9\n'
+            f'{recipe_user.pk},"{ingredient_3}",4\n'
+        )
+        call_command(
+            'import_json', path=path, model='RecipeIngredient', workers=2,
+            conflicts='update'
+        )
+        amounts = dict(
+            RecipeIngredient.objects.filter(
+                recipe=recipe_user
+            ).values_list('ingredient_id', 'amount')
+        )
+        assert amounts == {
+            ingredient_1.pk: 9, ingredient_2.pk: 2, ingredient_3.pk: 4
+        }, (
+            'Убедитесь, что параллельный загрузчик определяет ингредиенты '
+            'по естественному ключу и обновляет совпадающие записи'
+        )
+        path = write_file(
+            tmp_path, 'bad.ndjson', json.dumps({
+                'recipe': recipe_user.pk, 'ingredient': ['Нет', 'г'],
+                'amount': 1
+            })
+        )
+        with pytest.raises(CommandError):
+            call_command(
+                'import_json', path=path, model='RecipeIngredient',
+                workers=2
+            )
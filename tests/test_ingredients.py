@@ -1,5 +1,7 @@
 import pytest
 
+from recipes.models import Ingredient
+
 from .serializers import IngredientListField, IngredientSerializer
 from .utils import check_with_validate_data
 
@@ -25,3 +27,40 @@ class TestIngredintsAPI:
             url,
             serializer=IngredientSerializer
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_ingredients(
+        self, client, ingredient_1, ingredient_2, ingredient_3
+    ):
+        url = self.url_ingredients
+        results = check_with_validate_data(
+            client,
+            'get',
+            url,
+            data={'name': 'ингридиент'},
+            serializer=IngredientListField
+        )
+        assert [ingredient['id'] for ingredient in results] == [
+            ingredient_1.pk, ingredient_2.pk, ingredient_3.pk
+        ], (
+            f'Убедитесь, что при GET запросе на `{url}` с параметром `name` '
+            'возвращаются ингредиенты, начинающиеся со значения параметра'
+        )
+        ingredient = Ingredient.objects.create(
+            name='Сахар Ингридиент2',
+            measurement_unit='г'
+        )
+        results = check_with_validate_data(
+            client,
+            'get',
+            url,
+            data={'name': 'Ингридиент2'},
+            serializer=IngredientListField
+        )
+        assert [ingredient['id'] for ingredient in results] == [
+            ingredient_2.pk, ingredient.pk
+        ], (
+            f'Убедитесь, что при GET запросе на `{url}` с параметром `name` '
+            'после ингредиентов, начинающихся со значения параметра, '
+            'возвращаются ингредиенты, содержащие его'
+        )
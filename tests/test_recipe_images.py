@@ -0,0 +1,243 @@
+import base64
+import os
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from PIL import Image
+from rest_framework import status
+
+from api.serializers import RecipesWriteSerializer
+from core.storage import recipe_image_storage
+from recipes.models import Recipe
+
+
+def get_image_data(width, height, image_format='JPEG'):
+    """Возвращает картинку заданного размера в base64."""
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), '#458B74').save(buffer, image_format)
+    return (
+        f'data:image/{image_format.lower()};base64,'
+        f'{base64.b64encode(buffer.getvalue()).decode()}'
+    )
+
+
+def get_media_files(path):
+    """Возвращает пути всех файлов каталога path."""
+    return [
+        os.path.join(directory, name)
+        for directory, _, names in os.walk(path) for name in names
+    ]
+
+
+class TestRecipeImages:
+    url_recipes = '/api/recipes/'
+
+    def get_recipe_data(self, ingredient, tag, image):
+        return {
+            'name': 'string',
+            'text': 'string',
+            'cooking_time': 1,
+            'ingredients': [{'id': ingredient.pk, 'amount': 1}],
+            'tags': [tag.pk],
+            'image': image,
+        }
+
+    @pytest.mark.django_db(transaction=True)
+    def test_image_renditions(
+        self, user_client, ingredient_1, tag1, settings, tmp_path
+    ):
+        settings.RECIPE_IMAGE_BACKEND = 'db'
+        settings.MEDIA_ROOT = str(tmp_path)
+        response = user_client.post(
+            self.url_recipes,
+            data=self.get_recipe_data(
+                ingredient_1, tag1, get_image_data(1600, 900)
+            ),
+            format='json'
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        original = response.data['image']
+        assert set(response.data['images'].values()) == {original}, (
+            'До создания уменьшенных копий должен отдаваться оригинал'
+        )
+        call_command('run_image_worker', once=True)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        assert recipe.renditions_ready
+        url = f'{self.url_recipes}{recipe.pk}/'
+        detail = user_client.get(url).data
+        assert detail['image'] == original, (
+            'Убедитесь, что рецепт отдает ссылку на оригинал картинки'
+        )
+        images = detail['images']
+        for rendition, size in settings.RECIPE_IMAGE_RENDITIONS.items():
+            assert images[rendition].endswith(f'.{rendition}.webp')
+            path = os.path.join(
+                settings.MEDIA_ROOT, images[rendition].split('/media/')[1]
+            )
+            with Image.open(path) as image:
+                assert image.format == 'WEBP'
+                assert image.width <= size[0] and image.height <= size[1]
+                assert image.width / image.height == pytest.approx(
+                    16 / 9, 0.02
+                )
+        card = user_client.get(self.url_recipes).data['results'][0]['image']
+        assert card == images['card'], (
+            'Убедитесь, что в списке рецептов отдается уменьшенная копия'
+        )
+        response = user_client.patch(
+            url,
+            data=self.get_recipe_data(
+                ingredient_1, tag1, get_image_data(800, 800, 'PNG')
+            ),
+            format='json'
+        )
+        assert response.status_code == status.HTTP_200_OK
+        recipe.refresh_from_db()
+        assert not recipe.renditions_ready, (
+            'Убедитесь, что при изменении картинки копии создаются заново'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_image_limits(
+        self, user_client, ingredient_1, tag1, settings, tmp_path
+    ):
+        settings.RECIPE_IMAGE_BACKEND = 'db'
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.RECIPE_IMAGE_MAX_SIZE = 100
+        data = self.get_recipe_data(
+            ingredient_1, tag1, get_image_data(1000, 1000, 'PNG')
+        )
+        response = user_client.post(self.url_recipes, data=data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'image' in response.data['error']
+        settings.RECIPE_IMAGE_MAX_SIZE = 1024 * 1024
+        settings.RECIPE_IMAGE_MAX_PIXELS = 100 * 100
+        data['image'] = get_image_data(101, 100, 'PNG')
+        response = user_client.post(self.url_recipes, data=data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'image' in response.data['error']
+        data['image'] = get_image_data(100, 100, 'PNG')
+        response = user_client.post(self.url_recipes, data=data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+
+    @pytest.mark.django_db(transaction=True)
+    def test_image_deduplication(
+        self, user_client, ingredient_1, tag1, settings, tmp_path
+    ):
+        settings.RECIPE_IMAGE_BACKEND = 'db'
+        settings.MEDIA_ROOT = str(tmp_path)
+        image = get_image_data(640, 480)
+        data = self.get_recipe_data(ingredient_1, tag1, image)
+        first_id = user_client.post(
+            self.url_recipes, data=data, format='json'
+        ).data['id']
+        call_command('run_image_worker', once=True)
+        second_id = user_client.post(
+            self.url_recipes, data=data, format='json'
+        ).data['id']
+        first, second = Recipe.objects.get(pk=first_id), Recipe.objects.get(
+            pk=second_id
+        )
+        assert first.image.name == second.image.name, (
+            'Убедитесь, что одинаковые картинки хранятся в одном файле'
+        )
+        assert second.renditions_ready, (
+            'Убедитесь, что для загруженной ранее картинки используются '
+            'созданные копии'
+        )
+        path = first.image.path
+        inode = os.stat(path).st_ino
+        url = f'{self.url_recipes}{first_id}/'
+        user_client.patch(url, data=data, format='json')
+        first.refresh_from_db()
+        assert first.image.path == path and first.renditions_ready
+        assert os.stat(path).st_ino == inode, (
+            'Убедитесь, что неизмененная картинка не перезаписывается'
+        )
+        data['image'] = get_image_data(480, 640)
+        user_client.patch(url, data=data, format='json')
+        first.refresh_from_db()
+        assert first.image.path != path and not first.renditions_ready
+        call_command('run_image_worker', once=True)
+        call_command('delete_orphan_images', min_age=0)
+        assert os.path.exists(path), (
+            'Убедитесь, что картинка другого рецепта не удаляется'
+        )
+        user_client.delete(f'{self.url_recipes}{second_id}/')
+        assert len(get_media_files(tmp_path)) == 8
+        call_command('delete_orphan_images', min_age=0, dry_run=True)
+        call_command('delete_orphan_images', min_age=3600)
+        assert os.path.exists(path)
+        call_command('delete_orphan_images', min_age=0)
+        remaining = get_media_files(tmp_path)
+        assert len(remaining) == 4 and path not in remaining, (
+            'Убедитесь, что удаляются картинки без рецептов и их копии'
+        )
+        assert first.image.path in remaining
+
+    @pytest.mark.django_db(transaction=True)
+    def test_orphan_image_saved_again(
+        self, user_client, ingredient_1, tag1, settings, tmp_path
+    ):
+        settings.RECIPE_IMAGE_BACKEND = 'db'
+        settings.MEDIA_ROOT = str(tmp_path)
+        data = self.get_recipe_data(
+            ingredient_1, tag1, get_image_data(640, 480)
+        )
+        recipe_id = user_client.post(
+            self.url_recipes, data=data, format='json'
+        ).data['id']
+        call_command('run_image_worker', once=True)
+        recipe = Recipe.objects.get(pk=recipe_id)
+        with open(recipe.image.path, 'rb') as image_file:
+            content = image_file.read()
+        user_client.delete(f'{self.url_recipes}{recipe_id}/')
+        files = get_media_files(tmp_path)
+        for path in files:
+            os.utime(path, (0, 0))
+        name = recipe_image_storage.save(
+            'recipes/image.jpg', ContentFile(content)
+        )
+        assert name == recipe.image.name
+        call_command('delete_orphan_images', min_age=3600)
+        assert sorted(get_media_files(tmp_path)) == sorted(files), (
+            'Убедитесь, что повторно сохраненная картинка и ее копии '
+            'не удаляются до истечения min_age'
+        )
+        call_command('delete_orphan_images', min_age=0)
+        assert not get_media_files(tmp_path)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_embed_image(
+        self, user_client, ingredient_1, tag1, settings, tmp_path
+    ):
+        settings.RECIPE_IMAGE_BACKEND = 'db'
+        settings.MEDIA_ROOT = str(tmp_path)
+        image = get_image_data(640, 480)
+        response = user_client.post(
+            self.url_recipes,
+            data=self.get_recipe_data(ingredient_1, tag1, image),
+            format='json'
+        )
+        assert response.data['image'].startswith('http'), (
+            'Убедитесь, что рецепт отдает ссылку на картинку, '
+            'а не ее содержимое'
+        )
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        assert RecipesWriteSerializer().fields['image'].to_representation(
+            recipe.image
+        ) == recipe.image.url
+        url = f'{self.url_recipes}{recipe.pk}/'
+        assert user_client.get(url, {'embed_image': 1}).data['image'] == image
+        call_command('run_image_worker', once=True)
+        embedded = user_client.get(
+            self.url_recipes, {'embed_image': 1}
+        ).data['results'][0]['image']
+        assert embedded.startswith('data:image/webp;base64,'), (
+            'Убедитесь, что в списке рецептов встраивается уменьшенная копия'
+        )
+        assert user_client.get(url, {'embed_image': 2}).status_code == (
+            status.HTTP_400_BAD_REQUEST
+        )
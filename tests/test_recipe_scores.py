@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from core.scores import refresh_recipe_scores
+from recipes.models import RecipeScore
+
+
+class TestRecipeScores:
+    url_recipes = '/api/recipes/'
+
+    def get_ordering(self, client, ordering):
+        response = client.get(self.url_recipes, {'ordering': ordering})
+        assert response.status_code == 200
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_recipe_scores(self, settings, user_client, user, another_user,
+                           recipe_user, recipe_another_user):
+        settings.RECIPE_SCORE_FAVORITE_WEIGHT = 1
+        settings.RECIPE_SCORE_CART_WEIGHT = 0.5
+        settings.RECIPE_SCORE_POPULAR_HALF_LIFE = 30 * 24 * 60 * 60
+        settings.RECIPE_SCORE_TRENDING_HALF_LIFE = 24 * 60 * 60
+        now = timezone.now()
+        recipe_user.favorites.clear()
+        recipe_user.shopping_carts.clear()
+        recipe_another_user.favorites.add(user, another_user)
+        assert refresh_recipe_scores(now) == 1, (
+            'Убедитесь, что оценки создаются только для рецептов '
+            'с добавлениями в избранное и списки покупок'
+        )
+        score = RecipeScore.objects.get(recipe=recipe_another_user)
+        assert (score.popular, score.trending) == (2, 2)
+        recipe_user.favorites.add(user)
+        recipe_user.shopping_carts.add(another_user)
+        refresh_recipe_scores(now + timedelta(days=2))
+        score.refresh_from_db()
+        assert score.trending == pytest.approx(0.5), (
+            'Убедитесь, что оценка trending затухает со временем'
+        )
+        assert score.popular == pytest.approx(2 * 0.5 ** (2 / 30))
+        assert RecipeScore.objects.get(recipe=recipe_user).trending == 1.5
+        assert self.get_ordering(user_client, 'popular') == [
+            recipe_another_user.pk, recipe_user.pk
+        ]
+        assert self.get_ordering(user_client, 'trending') == [
+            recipe_user.pk, recipe_another_user.pk
+        ], 'Убедитесь, что рецепты сортируются по оценке trending'
+        recipe_another_user.favorites.remove(user)
+        refresh_recipe_scores(now + timedelta(days=3))
+        assert RecipeScore.objects.get(
+            recipe=recipe_another_user
+        ).trending == 0, 'Убедитесь, что оценка не становится отрицательной'
+        refresh_recipe_scores(now + timedelta(days=30))
+        assert not RecipeScore.objects.filter(trending__gt=0).exists(), (
+            'Убедитесь, что малые оценки обнуляются'
+        )
+        assert refresh_recipe_scores(now + timedelta(days=31)) == 2
+        assert refresh_recipe_scores(now + timedelta(days=600)) == 2
+        assert refresh_recipe_scores(now + timedelta(days=601)) == 0, (
+            'Убедитесь, что нулевые оценки без изменений не пересчитываются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_recipes_without_score(self, user_client, user, recipe_user,
+                                   recipe_another_user):
+        recipe_user.favorites.add(user)
+        refresh_recipe_scores()
+        assert self.get_ordering(user_client, 'trending') == [
+            recipe_user.pk, recipe_another_user.pk
+        ], 'Убедитесь, что рецепты без оценок выводятся в конце списка'
+        assert self.get_ordering(user_client, '') == [
+            recipe_another_user.pk, recipe_user.pk
+        ]
+        response = user_client.get(self.url_recipes, {'ordering': 'name'})
+        assert response.status_code == 400
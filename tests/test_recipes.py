@@ -1,9 +1,19 @@
+import base64
+import json
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 
+from api.serializers import RecipesWriteSerializer
+from core.paginator import get_count_cache_key
+from recipes.models import Recipe
+
 from .serializers import RecipesResponseListField, RecipesResponseSerializer
-from .utils import (check_bad_request, check_not_authorized,
-                    check_with_validate_data)
+from .utils import (check_bad_request, check_cursor_pagination,
+                    check_not_authorized, check_with_validate_data,
+                    get_queries_count)
 
 
 class TestRecipesAPI:
@@ -20,6 +30,117 @@ class TestRecipesAPI:
             serializer=RecipesResponseListField
         )
 
+    @pytest.mark.django_db(transaction=True)
+    def test_list_recipes_constant_queries(self, user_client, many_recipes):
+        url = self.url_recipes
+        user_client.get(url)
+        one_recipe_queries = get_queries_count(
+            user_client, 'get', url, data={'limit': 1}
+        )
+        page_queries = get_queries_count(
+            user_client, 'get', url, data={'limit': len(many_recipes)}
+        )
+        assert one_recipe_queries == page_queries, (
+            f'Убедитесь, что количество запросов к БД при GET запросе '
+            f'на `{url}` не зависит от размера страницы'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_list_recipes_cursor(self, user_client, many_recipes):
+        url = self.url_recipes
+        expected = [
+            recipe['id'] for recipe in user_client.get(
+                url, {'limit': len(many_recipes)}
+            ).data['results']
+        ]
+        assert check_cursor_pagination(user_client, url, 4) == expected
+        for cursor in (
+            'invalid',
+            {'v': [None, None]},
+            {'v': ['invalid', 1]},
+            {'v': [[], {}]},
+            {'v': 'ab'},
+            ['v'],
+        ):
+            if not isinstance(cursor, str):
+                cursor = base64.b64encode(json.dumps(cursor).encode()).decode()
+            response = user_client.get(url, {'cursor': cursor})
+            assert response.status_code == status.HTTP_404_NOT_FOUND, (
+                f'Убедитесь, что некорректный курсор {cursor} '
+                'возвращает ошибку 404'
+            )
+        response = user_client.get(
+            url, {'cursor': '', 'search': many_recipes[0].name}
+        )
+        assert response.data['count'] == 1, (
+            'Убедитесь, что при поиске используется пагинация '
+            'по номерам страниц'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_list_recipes_cached_count(self, user_client, many_recipes):
+        url = self.url_recipes
+        user_client.get('/api/users/me/')
+        first_queries = get_queries_count(user_client, 'get', url)
+        cached_queries = get_queries_count(user_client, 'get', url)
+        assert cached_queries == first_queries - 1, (
+            f'Убедитесь, что при повторном GET запросе на `{url}` '
+            'количество рецептов берется из кеша'
+        )
+        response = user_client.get(url, {'is_favorited': 1})
+        assert response.data['count'] == len(many_recipes)
+        user_client.delete(f'{url}{many_recipes[0].pk}/favorite/')
+        response = user_client.get(url, {'is_favorited': 1})
+        assert response.data['count'] == len(many_recipes) - 1, (
+            'Убедитесь, что кеш количества рецептов сбрасывается '
+            'при изменении избранного'
+        )
+        user_client.delete(f'{url}{many_recipes[2].pk}/')
+        response = user_client.get(url)
+        assert response.data['count'] == len(many_recipes) - 1, (
+            'Убедитесь, что кеш количества рецептов сбрасывается '
+            'при удалении рецепта'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_count_cache_key(self, user, another_user, many_recipes):
+        queryset = Recipe.objects.filter(cooking_time__gt=0)
+        key = get_count_cache_key(queryset.with_user_info(user))
+        assert get_count_cache_key(
+            queryset.with_user_info(another_user).order_by('name')
+        ) == key, (
+            'Убедитесь, что ключ кеша количества рецептов не зависит '
+            'от аннотаций пользователя и сортировки'
+        )
+        favorited = queryset.with_user_info(user).filter(
+            favorited_by_user=True
+        )
+        assert get_count_cache_key(favorited) != key
+        assert get_count_cache_key(favorited) != get_count_cache_key(
+            queryset.with_user_info(another_user).filter(
+                favorited_by_user=True
+            )
+        )
+        assert favorited.count() == len(many_recipes)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_recipes(self, client, recipe_user, recipe_another_user):
+        url = self.url_recipes
+        results = check_with_validate_data(
+            client,
+            'get',
+            url,
+            data={'search': recipe_another_user.name},
+            pagination=True,
+            serializer=RecipesResponseListField
+        )
+        assert [recipe['id'] for recipe in results] == [
+            recipe_another_user.pk
+        ], (
+            f'Убедитесь, что при GET запросе на `{url}` с параметром '
+            '`search` возвращаются только найденные рецепты'
+        )
+
     @pytest.mark.django_db(transaction=True)
     def test_get_recipe(self, client, recipe_another_user):
         url = f'{self.url_recipes}{recipe_another_user.pk}/'
@@ -63,6 +184,67 @@ class TestRecipesAPI:
             serializer=RecipesResponseSerializer
         )
 
+    @pytest.mark.django_db(transaction=True)
+    def test_create_recipe_constant_queries(
+        self, user_client, many_ingredients, tag1, tag2, tag3
+    ):
+        url = self.url_recipes
+        user_client.get('/api/users/me/')
+        queries = []
+        for size in (1, 40):
+            data = {
+                'name': f'Рецепт из {size}',
+                'text': 'string',
+                'cooking_time': 1,
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': 1}
+                    for ingredient in many_ingredients[:size]
+                ],
+                'tags': [tag1.pk, tag2.pk, tag3.pk][:size],
+                'image': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAA'
+                'AEAAAABAgMAAABieywaAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWX'
+                'MAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAA'
+                'AAggCByxOyYQAAAABJRU5ErkJggg==',
+            }
+            queries.append(
+                get_queries_count(user_client, 'post', url, data=data)
+            )
+        assert queries[0] == queries[1], (
+            f'Убедитесь, что количество запросов к БД при POST запросе '
+            f'на `{url}` не зависит от количества ингредиентов и тегов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_create_recipe_missing_ids(
+        self, user_client, ingredient_1, tag1
+    ):
+        url = self.url_recipes
+        data = {
+            'name': 'string',
+            'text': 'string',
+            'cooking_time': 1,
+            'ingredients': [
+                {'id': ingredient_1.pk, 'amount': 1},
+                {'id': 9998, 'amount': 2},
+                {'id': 9999, 'amount': 3},
+            ],
+            'tags': [tag1.pk],
+            'image': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAA'
+            'AEAAAABAgMAAABieywaAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWX'
+            'MAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAA'
+            'AAggCByxOyYQAAAABJRU5ErkJggg==',
+        }
+        response = user_client.post(url, data=data, format='json')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert '9998, 9999' in response.data['message'], (
+            'Убедитесь, что в ответе перечислены все ненайденные ингредиенты'
+        )
+        data['ingredients'] = data['ingredients'][:1]
+        data['tags'] = [tag1.pk, 9997]
+        response = user_client.post(url, data=data, format='json')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert '9997' in response.data['message']
+
     @pytest.mark.django_db(transaction=True)
     def test_create_recipe_bad_request_400(
         self, user_client, ingredient_1, tag1
@@ -207,6 +389,44 @@ class TestRecipesAPI:
             serializer=RecipesResponseSerializer
         )
 
+    @pytest.mark.django_db(transaction=True)
+    def test_update_recipe_constant_queries(
+        self, recipe_user, many_ingredients, tag1, tag2, tag3
+    ):
+        def update_recipe(ingredients, amount, tags):
+            validated_data = {
+                'ingredients': [
+                    {'ingredient': ingredient, 'amount': amount}
+                    for ingredient in ingredients
+                ],
+                'tags': tags,
+            }
+            with CaptureQueriesContext(connection) as context:
+                RecipesWriteSerializer().update(recipe_user, validated_data)
+            assert sorted(
+                recipe_user.recipe_ingredients.values_list(
+                    'ingredient', 'amount'
+                )
+            ) == sorted((ingredient.pk, amount) for ingredient in ingredients)
+            assert set(recipe_user.tags.all()) == set(tags)
+            return len(context.captured_queries)
+
+        queries = {}
+        for size in (1, 40):
+            ingredients = many_ingredients[:size]
+            update_recipe(ingredients, 1, [tag1])
+            queries[size] = (
+                update_recipe(ingredients, 2, [tag1]),
+                update_recipe(many_ingredients[size:size * 2], 2, [tag2]),
+                update_recipe(
+                    many_ingredients[size:size * 2 + 1], 3, [tag2, tag3]
+                ),
+            )
+        assert queries[1] == queries[40], (
+            'Убедитесь, что количество запросов к БД при обновлении рецепта '
+            'не зависит от количества ингредиентов'
+        )
+
     @pytest.mark.django_db(transaction=True)
     def test_patch_recipe_bad_request_400(
         self, user_client, recipe_user,
@@ -1,6 +1,17 @@
+import json
+import os
+from datetime import timedelta
+
 import pytest
+from django.core.cache import caches
+from django.utils import timezone, translation
 from rest_framework import status
 
+from api import jobs
+from api.jobs import process_pending_jobs
+from api.models import ReportJob
+from api.report import REPORT_CACHE_KEY
+
 from .serializers import RecipeShortInfoSerializer
 from .utils import (check_bad_request, check_not_authorized,
                     check_with_validate_data)
@@ -19,6 +30,214 @@ class TestShoppingCartAPI:
             url
         )
 
+    @pytest.mark.django_db(transaction=True)
+    def test_download_shopping_cart_streaming(self, user_client, many_recipes):
+        response = user_client.get(self.url_download_shopping_cart)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming, (
+            'Список покупок должен отдаваться потоковым ответом'
+        )
+        assert response['Content-Type'] == 'application/pdf'
+        assert 'shoping.pdf' in response['Content-Disposition']
+        content = b''.join(response.streaming_content)
+        assert content.startswith(b'%PDF')
+        assert len(content) == int(response['Content-Length'])
+
+    @pytest.mark.django_db(transaction=True)
+    def test_download_shopping_cart_cache_size(self, user_client,
+                                               many_recipes, settings):
+        cache = caches[settings.REPORT_CACHE_ALIAS]
+        cache.clear()
+        settings.REPORT_CACHE_MAX_SIZE = 0
+        response = user_client.get(self.url_download_shopping_cart)
+        key = REPORT_CACHE_KEY.format(digest=response['ETag'].strip('"'))
+        content = b''.join(response.streaming_content)
+        assert content.startswith(b'%PDF')
+        assert cache.get(key) is None, (
+            'Убедитесь, что документы больше REPORT_CACHE_MAX_SIZE '
+            'не сохраняются в кеш отчетов'
+        )
+        settings.REPORT_CACHE_MAX_SIZE = len(content)
+        response = user_client.get(self.url_download_shopping_cart)
+        assert cache.get(key) == b''.join(response.streaming_content)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_download_shopping_cart_etag(self, user_client, many_recipes):
+        url = self.url_download_shopping_cart
+        response = user_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+        assert etag, 'Список покупок должен возвращать заголовок ETag'
+        content = b''.join(response.streaming_content)
+        response = user_client.get(url)
+        assert response['ETag'] == etag
+        assert b''.join(response.streaming_content) == content, (
+            'Повторная выгрузка неизмененного списка покупок '
+            'должна возвращать тот же файл'
+        )
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        many_recipes[0].shopping_carts.clear()
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK, (
+            'Изменение списка покупок должно менять ETag'
+        )
+        assert response['ETag'] != etag
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('report_format,content_type', [
+        ('csv', 'text/csv'),
+        ('txt', 'text/plain'),
+        ('json', 'application/json'),
+    ])
+    def test_download_shopping_cart_formats(
+        self, user_client, many_recipes, ingredient_1, report_format,
+        content_type
+    ):
+        url = self.url_download_shopping_cart
+        for response in (
+            user_client.get(url, {'format': report_format}),
+            user_client.get(url, HTTP_ACCEPT=content_type),
+        ):
+            assert response.status_code == status.HTTP_200_OK
+            assert response.streaming
+            assert response['Content-Type'].startswith(content_type)
+            assert f'shoping.{report_format}' in (
+                response['Content-Disposition']
+            )
+            content = b''.join(response.streaming_content).decode()
+            assert ingredient_1.name in content
+            assert str(sum(range(1, 7))) in content, (
+                'Список покупок должен содержать суммарное количество '
+                'ингредиента по всем рецептам'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_download_shopping_cart_json(
+        self, user_client, many_recipes, ingredient_1, ingredient_2
+    ):
+        response = user_client.get(
+            self.url_download_shopping_cart, {'format': 'json'}
+        )
+        content = json.loads(b''.join(response.streaming_content))
+        assert sorted(content, key=lambda row: row['name']) == sorted(
+            [
+                {
+                    'name': ingredient_1.name,
+                    'measurement_unit': ingredient_1.measurement_unit,
+                    'amount': sum(range(1, 7)),
+                },
+                {
+                    'name': ingredient_2.name,
+                    'measurement_unit': ingredient_2.measurement_unit,
+                    'amount': sum(range(2, 8)),
+                },
+            ],
+            key=lambda row: row['name']
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_download_shopping_cart_unknown_format(self, user_client):
+        response = user_client.get(
+            self.url_download_shopping_cart, {'format': 'xml'}
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        response = user_client.get(
+            self.url_download_shopping_cart, HTTP_ACCEPT='image/png'
+        )
+        assert response.status_code == status.HTTP_406_NOT_ACCEPTABLE
+
+    @pytest.mark.django_db(transaction=True)
+    def test_download_shopping_cart_background(
+        self, user_client, another_user_client, many_recipes, settings,
+        tmp_path
+    ):
+        settings.REPORT_JOB_BACKEND = 'db'
+        settings.MEDIA_ROOT = str(tmp_path)
+        url = self.url_download_shopping_cart
+        response = user_client.get(url, {'background': 1})
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job_url = response['Location']
+        assert job_url == response.json()['url']
+        assert response.json()['status'] == 'pending'
+        response = user_client.get(url, {'background': 1})
+        assert response['Location'] == job_url, (
+            'Повторный запрос неизмененного списка покупок '
+            'должен возвращать существующее задание'
+        )
+        response = user_client.get(job_url)
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert another_user_client.get(job_url).status_code == (
+            status.HTTP_404_NOT_FOUND
+        ), 'Задание должно быть доступно только его автору'
+        assert process_pending_jobs() == 1
+        response = user_client.get(job_url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/pdf'
+        assert b''.join(response.streaming_content).startswith(b'%PDF')
+        response.close()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_download_shopping_cart_background_language(
+        self, user_client, many_recipes, settings, tmp_path, monkeypatch
+    ):
+        settings.REPORT_JOB_BACKEND = 'db'
+        settings.MEDIA_ROOT = str(tmp_path)
+        languages = []
+        get_pdf_print = jobs.get_pdf_print
+
+        def get_pdf_print_spy(pagesize):
+            languages.append(translation.get_language())
+            return get_pdf_print(pagesize)
+
+        monkeypatch.setattr(jobs, 'get_pdf_print', get_pdf_print_spy)
+        user_client.get(
+            self.url_download_shopping_cart, {'background': 1},
+            HTTP_ACCEPT_LANGUAGE='en'
+        )
+        assert ReportJob.objects.get().language == 'en'
+        with translation.override(settings.LANGUAGE_CODE):
+            assert process_pending_jobs() == 1
+        assert languages == ['en'], (
+            'Убедитесь, что фоновое задание формирует pdf файл '
+            'на языке запроса'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_download_shopping_cart_stale_job(
+        self, user_client, many_recipes, settings, tmp_path
+    ):
+        settings.REPORT_JOB_BACKEND = 'db'
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.REPORT_JOB_CLEANUP_INTERVAL = 0
+        url = self.url_download_shopping_cart
+        job_url = user_client.get(url, {'background': 1})['Location']
+        now = timezone.now()
+        ReportJob.objects.update(
+            created=now - timedelta(seconds=settings.REPORT_JOB_TIMEOUT + 1)
+        )
+        response = user_client.get(url, {'background': 1})
+        assert response['Location'] != job_url, (
+            'Повторный запрос должен создавать новое задание '
+            'вместо зависшего'
+        )
+        assert user_client.get(job_url).json()['status'] == 'failed', (
+            'Убедитесь, что зависшие задания отмечаются как ошибочные'
+        )
+        assert process_pending_jobs() == 1
+        job = ReportJob.objects.get(status=ReportJob.DONE)
+        path = job.file.path
+        ReportJob.objects.update(
+            created=now - timedelta(seconds=settings.REPORT_JOB_TTL + 1)
+        )
+        response = user_client.get(url, {'background': 1})
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert not ReportJob.objects.filter(pk=job.pk).exists(), (
+            'Убедитесь, что просроченные задания удаляются '
+            'при постановке новых заданий'
+        )
+        assert not os.path.exists(path)
+
     @pytest.mark.django_db(transaction=True)
     def test_download_shopping_cart_not_authorized(
         self, client, recipe_another_user
@@ -2,8 +2,9 @@ import pytest
 from rest_framework import status
 
 from .serializers import SubscribeInfoListField, SubscribeInfoSerializer
-from .utils import (check_bad_request, check_not_authorized,
-                    check_with_validate_data)
+from .utils import (check_bad_request, check_cursor_pagination,
+                    check_not_authorized, check_with_validate_data,
+                    get_queries_count)
 
 
 class TestSubscriptionsAPI:
@@ -22,6 +23,75 @@ class TestSubscriptionsAPI:
             serializer=SubscribeInfoListField
         )
 
+    @pytest.mark.django_db(transaction=True)
+    def test_list_user_subscriptions_cursor(
+        self, user_client, user, django_user_model
+    ):
+        from users.models import Subscriber
+        authors = [
+            django_user_model.objects.create_user(
+                username=f'Author{number}',
+                password='1234567',
+                email=f'author{number}@g.com',
+                first_name='first_name',
+                last_name='last_name'
+            )
+            for number in range(5)
+        ]
+        for author in authors:
+            Subscriber.objects.create(user=user, author=author)
+        url = self.url_users_subscriptions
+        assert check_cursor_pagination(user_client, url, 2) == [
+            author.pk for author in reversed(authors)
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_list_user_subscriptions_constant_queries(
+        self, user_client, user, django_user_model
+    ):
+        from recipes.models import Recipe
+        from users.models import Subscriber
+        for number in range(3):
+            author = django_user_model.objects.create_user(
+                username=f'Author{number}',
+                password='1234567',
+                email=f'author{number}@g.com',
+                first_name='first_name',
+                last_name='last_name'
+            )
+            for recipe_number in range(number + 2):
+                Recipe.objects.create(
+                    name=f'Рецепт {number} {recipe_number}',
+                    image='recipes/test.png',
+                    text='Текст рецепта',
+                    cooking_time=10,
+                    author=author
+                )
+            Subscriber.objects.create(user=user, author=author)
+        url = self.url_users_subscriptions
+        user_client.get(url)
+        one_author_queries = get_queries_count(
+            user_client, 'get', url, data={'limit': 1, 'recipes_limit': 2}
+        )
+        page_queries = get_queries_count(
+            user_client, 'get', url, data={'limit': 3, 'recipes_limit': 2}
+        )
+        assert one_author_queries == page_queries, (
+            f'Убедитесь, что количество запросов к БД при GET запросе '
+            f'на `{url}` не зависит от размера страницы'
+        )
+        response = user_client.get(url, {'recipes_limit': 2})
+        for author in response.data['results']:
+            recipes = Recipe.objects.filter(author_id=author['id'])
+            assert author['recipes_count'] == recipes.count()
+            assert [recipe['id'] for recipe in author['recipes']] == [
+                recipe.pk for recipe in recipes[:2]
+            ], (
+                'Убедитесь, что в подписках выводятся последние рецепты '
+                'автора с учетом параметра `recipes_limit`'
+            )
+            assert author['is_subscribed'] is True
+
     @pytest.mark.django_db(transaction=True)
     def test_list_user_subscriptions_not_autorize(self, client):
         url = self.url_users_subscriptions
@@ -1,7 +1,10 @@
+import json
+
 import pytest
+from rest_framework import status
 
 from .serializers import TagListField, TagSerializer
-from .utils import check_with_validate_data
+from .utils import check_with_validate_data, get_queries_count
 
 
 class TestTagsAPI:
@@ -25,3 +28,30 @@ class TestTagsAPI:
             url,
             serializer=TagSerializer
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_list_tags_cache(self, client, tag1, tag2):
+        url = self.url_tags
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+        assert etag and response['Last-Modified'], (
+            f'Убедитесь, что ответ `{url}` содержит заголовки '
+            '`ETag` и `Last-Modified`'
+        )
+        assert get_queries_count(client, 'get', url) == 0, (
+            f'Убедитесь, что повторный запрос `{url}` берется из кеша'
+        )
+        cached = client.get(url)
+        assert cached.data == response.data
+        assert json.loads(cached.content) == response.data
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        tag1.name = 'Новое имя'
+        tag1.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK, (
+            'Убедитесь, что кеш тегов сбрасывается при изменении тега'
+        )
+        assert response['ETag'] != etag
+        assert tag1.name in [tag['name'] for tag in response.data]
@@ -8,7 +8,7 @@ from .serializers import (UserCreateRequestSerializer,
                           UserRequestNewPasswordSerializer,
                           UserResponseLoginSerializer, UserResponseSerializer)
 from .utils import (check_bad_request, check_not_authorized,
-                    check_with_validate_data)
+                    check_with_validate_data, get_queries_count)
 
 
 class TestUsersAPI:
@@ -37,6 +37,52 @@ class TestUsersAPI:
             '`rest_framework.authentication.TokenAuthentication`'
         )
 
+    @pytest.mark.django_db(transaction=True)
+    def test_list_users_relations(
+        self, user_client, another_user, django_user_model, settings
+    ):
+        settings.USER_RELATIONS_CACHE_TTL = 60
+        url = self.url_users
+        django_user_model.objects.create_user(
+            username='ThirdUser',
+            password='1234567',
+            email='third@g.com',
+            first_name='first_name',
+            last_name='last_name'
+        )
+        user_client.get(url)
+        one_user_queries = get_queries_count(
+            user_client, 'get', url, data={'limit': 1}
+        )
+        page_queries = get_queries_count(
+            user_client, 'get', url, data={'limit': 3}
+        )
+        assert one_user_queries == page_queries, (
+            f'Убедитесь, что количество запросов к БД при GET запросе '
+            f'на `{url}` не зависит от размера страницы'
+        )
+
+        def is_subscribed():
+            users = user_client.get(url, {'limit': 3}).data['results']
+            return next(
+                item['is_subscribed'] for item in users
+                if item['id'] == another_user.pk
+            )
+
+        assert is_subscribed() is False
+        response = user_client.post(f'{url}{another_user.pk}/subscribe/')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['is_subscribed'] is True
+        assert is_subscribed() is True, (
+            'Убедитесь, что кеш подписок пользователя обновляется '
+            'при подписке на автора'
+        )
+        user_client.delete(f'{url}{another_user.pk}/subscribe/')
+        assert is_subscribed() is False, (
+            'Убедитесь, что кеш подписок пользователя обновляется '
+            'при отписке от автора'
+        )
+
     @pytest.mark.django_db(transaction=True)
     def test_list_users(self, client, user, another_user):
         check_with_validate_data(
@@ -183,3 +229,44 @@ class TestUsersAPI:
             'post',
             url
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_token_authentication_cache(self, user_client, user, settings):
+        url = self.url_me
+        queries = get_queries_count(user_client, 'get', url)
+        assert get_queries_count(user_client, 'get', url) == queries, (
+            'Убедитесь, что кеш аутентификации по умолчанию отключен'
+        )
+        settings.AUTH_TOKEN_CACHE_TTL = 60
+        first_queries = get_queries_count(user_client, 'get', url)
+        cached_queries = get_queries_count(user_client, 'get', url)
+        assert cached_queries == first_queries - 1, (
+            f'Убедитесь, что при повторном GET запросе на `{url}` '
+            'пользователь токена берется из кеша'
+        )
+        user_client.post(
+            self.url_set_password,
+            data={
+                'new_password': 'Qwerty123@$@Qwerty756',
+                'current_password': '1234567'
+            }
+        )
+        assert get_queries_count(user_client, 'get', url) == first_queries, (
+            'Убедитесь, что кеш аутентификации сбрасывается '
+            'при смене пароля'
+        )
+        user.is_active = False
+        user.save()
+        response = user_client.get(url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED, (
+            'Убедитесь, что кеш аутентификации сбрасывается '
+            'при деактивации пользователя'
+        )
+        user.is_active = True
+        user.save()
+        user_client.get(url)
+        user_client.post(self.url_logout)
+        response = user_client.get(url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED, (
+            'Убедитесь, что кеш аутентификации сбрасывается при выходе'
+        )
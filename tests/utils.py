@@ -1,3 +1,5 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import serializers, status
 
 VALID_METHODS = ('get', 'head', 'options', 'patch', 'post', 'put', 'delete')
@@ -15,6 +17,52 @@ def get_response_data(client, method, url, **kwargs):
     return request_method(url, data=data, params=params, format='json')
 
 
+def get_queries_count(client, method, url, **kwargs):
+    """Возвращает количество запросов к БД при обращении к эндпоинту."""
+    with CaptureQueriesContext(connection) as context:
+        response = get_response_data(client, method, url, **kwargs)
+    assert response.status_code < status.HTTP_400_BAD_REQUEST, (
+        f'Убедитесь, что запрос `{url}` выполняется успешно'
+    )
+    return len(context.captured_queries)
+
+
+def check_cursor_pagination(client, url, limit, **kwargs):
+    """
+    Тест-кейс пагинации по курсору: проходит страницы вперед
+    по ссылкам next, затем назад по ссылкам previous.
+    Возвращает идентификаторы записей в порядке выдачи.
+    """
+    key = kwargs.get('key', 'id')
+    response = client.get(url, {'cursor': '', 'limit': limit})
+    pages = []
+    while True:
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] is None, (
+            f'Убедитесь, что при пагинации по курсору `{url}` '
+            'не вычисляется количество записей'
+        )
+        pages.append([item[key] for item in response.data['results']])
+        assert len(pages[-1]) <= limit
+        if response.data['next'] is None:
+            break
+        response = client.get(response.data['next'])
+    previous = response.data['previous']
+    back_pages = [pages[-1]]
+    while previous is not None:
+        response = client.get(previous)
+        assert response.status_code == status.HTTP_200_OK
+        back_pages.append(
+            [item[key] for item in response.data['results']]
+        )
+        previous = response.data['previous']
+    assert back_pages[::-1] == pages, (
+        f'Убедитесь, что при пагинации по курсору `{url}` '
+        'страницы назад совпадают со страницами вперед'
+    )
+    return [item for page in pages for item in page]
+
+
 def get_fields_serializer(serializer):
     """Возвращает список с наименованиями полей сариалайзера."""
     return list((serializer.child if isinstance(